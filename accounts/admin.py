@@ -218,7 +218,9 @@ class AuthorsAdmin(admin.ModelAdmin):
     ]
     list_select_related = ['user']
     readonly_fields = [
-        'user_info_display', 'content_published', 'total_views'
+        'user_info_display', 'content_published', 'total_views',
+        'videos_count', 'videos_published', 'audios_count',
+        'audios_published', 'texts_count', 'texts_published'
     ]
     fieldsets = (
         (_('Основная информация'), {
@@ -231,7 +233,12 @@ class AuthorsAdmin(admin.ModelAdmin):
             'fields': ('is_verified_author', 'show_in_authors_list')
         }),
         (_('Статистика'), {
-            'fields': ('content_published', 'total_views')
+            'fields': (
+                'content_published', 'total_views',
+                ('videos_count', 'videos_published'),
+                ('audios_count', 'audios_published'),
+                ('texts_count', 'texts_published'),
+            )
         }),
     )
     
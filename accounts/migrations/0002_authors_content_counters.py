@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='authors',
+            name='audios_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Аудио'),
+        ),
+        migrations.AddField(
+            model_name='authors',
+            name='audios_published',
+            field=models.PositiveIntegerField(default=0, verbose_name='Опубликовано аудио'),
+        ),
+        migrations.AddField(
+            model_name='authors',
+            name='texts_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Статей'),
+        ),
+        migrations.AddField(
+            model_name='authors',
+            name='texts_published',
+            field=models.PositiveIntegerField(default=0, verbose_name='Опубликовано статей'),
+        ),
+        migrations.AddField(
+            model_name='authors',
+            name='videos_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Видео'),
+        ),
+        migrations.AddField(
+            model_name='authors',
+            name='videos_published',
+            field=models.PositiveIntegerField(default=0, verbose_name='Опубликовано видео'),
+        ),
+    ]
@@ -123,6 +123,17 @@ class User(AbstractUser):
         related_query_name='accounts_user',
     )
     
+    # Имя на момент загрузки из БД: кэш страниц автора сбрасывается,
+    # только если оно изменилось (main.signals)
+    _loaded_name = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        loaded = instance.__dict__
+        instance._loaded_name = (loaded.get('first_name'), loaded.get('last_name'))
+        return instance
+
     def get_full_name(self):
         """Возвращает полное имя пользователя"""
         return f"{self.first_name} {self.last_name}".strip()
@@ -288,7 +299,8 @@ class Authors(models.Model):
         verbose_name="Показывать в списке авторов"
     )
     
-    # Статистика
+    # Статистика (поддерживается materials.counters, пересчёт —
+    # manage.py recount_counters)
     content_published = models.PositiveIntegerField(
         default=0,
         verbose_name="Опубликованных материалов"
@@ -297,6 +309,21 @@ class Authors(models.Model):
         default=0,
         verbose_name="Всего просмотров"
     )
+    videos_count = models.PositiveIntegerField(default=0, verbose_name="Видео")
+    videos_published = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Опубликовано видео"
+    )
+    audios_count = models.PositiveIntegerField(default=0, verbose_name="Аудио")
+    audios_published = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Опубликовано аудио"
+    )
+    texts_count = models.PositiveIntegerField(default=0, verbose_name="Статей")
+    texts_published = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Опубликовано статей"
+    )
 
     @property
     def videos(self):
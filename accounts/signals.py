@@ -2,13 +2,20 @@ from django.db.models.signals import post_save
 from django.dispatch import receiver
 from .models import User, Employee, SiteUser, Authors
 
+# Поля пользователя, от которых зависит профиль: тип и имя (имя автора
+# попадает в подсказки поиска при сохранении профиля)
+PROFILE_FIELDS = frozenset(("user_type", "first_name", "last_name"))
+
 
 @receiver(post_save, sender=User)
-def handle_user_profile(sender, instance, created, **kwargs):
+def handle_user_profile(sender, instance, created, update_fields=None, **kwargs):
     """
     При создании пользователя или изменении его типа (user_type)
     создаёт/обновляет соответствующий профиль.
     """
+    if update_fields is not None and PROFILE_FIELDS.isdisjoint(update_fields):
+        # Например, вход обновляет только last_login — профиль не меняется
+        return
     if instance.user_type == "employee":
         profile, _ = Employee.objects.get_or_create(user=instance)
         profile.save()  # сохраняем на случай, если профиль уже был, но данные изменились
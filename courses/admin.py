@@ -10,7 +10,7 @@ class LessonInline(admin.TabularInline):
 
 @admin.register(Course)
 class CourseAdmin(admin.ModelAdmin):
-    list_display = ["title", "author", "status", "published_at"]
+    list_display = ["title", "author", "status", "published_at", "lessons_count"]
     list_filter = ["status", "author"]
     search_fields = ["title"]
     prepopulated_fields = {"slug": ("title",)}
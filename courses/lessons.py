@@ -0,0 +1,190 @@
+"""Порядок уроков и сохранение уроков курса пачками.
+
+``Lesson.order`` — ключ сортировки с промежутками (шаг ``ORDER_STEP``), а
+не номер урока: номер на странице курса — позиция в списке. Перенос урока
+меняет ключ только у него самого (он получает ключ посередине между новыми
+соседями), весь курс перенумеровывается, лишь когда промежуток кончился.
+
+Сохранение формсета уроков и перестановка выполняются запросами на весь
+курс (``bulk_create``, ``bulk_update``, один ``DELETE``), а не на каждый
+урок. Сигналы отдельных уроков (счётчик ``lessons_count``, кэш страниц) на
+это время отключаются (``bulk_changes``): счётчик обновляется одним
+запросом, а кэш сбрасывает получатель сигнала ``lessons_changed``
+(``main.signals``).
+"""
+
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from materials.counters import increment_counters
+
+from .models import Course, Lesson
+
+ORDER_STEP = 1024
+LESSON_FIELDS = ["title", "description", "order", "video", "audio", "text"]
+
+# Аргумент ``course`` — курс, уроки которого изменены пачкой
+lessons_changed = Signal()
+
+_bulk = threading.local()
+
+
+@contextmanager
+def bulk_changes():
+    """Внутри блока сигналы отдельных уроков не обновляют счётчики и кэш"""
+    previous = getattr(_bulk, "active", False)
+    _bulk.active = True
+    try:
+        yield
+    finally:
+        _bulk.active = previous
+
+
+def in_bulk():
+    return getattr(_bulk, "active", False)
+
+
+def _increasing_positions(keys):
+    """Позиции наибольшей строго возрастающей подпоследовательности ``keys``"""
+    tails = []  # ключ, на котором кончается возрастающая цепочка длины i + 1
+    tail_positions = []
+    previous = [None] * len(keys)
+    for position, key in enumerate(keys):
+        index = bisect_left(tails, key)
+        if index == len(tails):
+            tails.append(key)
+            tail_positions.append(position)
+        else:
+            tails[index] = key
+            tail_positions[index] = position
+        previous[position] = tail_positions[index - 1] if index else None
+
+    positions = set()
+    position = tail_positions[-1] if tail_positions else None
+    while position is not None:
+        positions.add(position)
+        position = previous[position]
+    return positions
+
+
+def plan_order(items):
+    """
+    Ключи для порядка ``items`` — пар ``(id, текущий ключ)`` в новом
+    порядке. Возвращает ``{id: ключ}`` только для уроков, чей ключ меняется.
+    """
+    keys = [key for _, key in items]
+    kept = _increasing_positions(keys)
+    new_keys = list(keys)
+
+    position = 0
+    while position < len(items):
+        if position in kept:
+            position += 1
+            continue
+        # Подряд идущие уроки без места, между оставленными соседями
+        end = position
+        while end < len(items) and end not in kept:
+            end += 1
+        low = new_keys[position - 1] if position else 0
+        count = end - position
+        if end < len(items):
+            high = keys[end]
+            if high - low <= count:
+                return _renumber(items)
+            for offset in range(count):
+                new_keys[position + offset] = low + (high - low) * (offset + 1) // (
+                    count + 1
+                )
+        else:
+            for offset in range(count):
+                new_keys[position + offset] = low + ORDER_STEP * (offset + 1)
+        position = end
+
+    return {
+        pk: new_key for (pk, key), new_key in zip(items, new_keys) if new_key != key
+    }
+
+
+def _renumber(items):
+    return {
+        pk: ORDER_STEP * (position + 1)
+        for position, (pk, key) in enumerate(items)
+        if key != ORDER_STEP * (position + 1)
+    }
+
+
+def reorder_lessons(course, lesson_ids):
+    """
+    Ставит уроки курса в порядок ``lesson_ids`` (все уроки курса). Возвращает
+    ``{id: ключ}`` изменённых уроков.
+    """
+    lesson_ids = [int(pk) for pk in lesson_ids]
+    with transaction.atomic():
+        current = dict(
+            Lesson.objects.select_for_update()
+            .filter(course=course)
+            .values_list("pk", "order")
+        )
+        if len(lesson_ids) != len(current) or set(lesson_ids) != set(current):
+            raise ValueError("The new order must list every lesson of the course once")
+        changes = plan_order([(pk, current[pk]) for pk in lesson_ids])
+        if changes:
+            now = timezone.now()
+            Lesson.objects.bulk_update(
+                [
+                    Lesson(pk=pk, order=key, updated_at=now)
+                    for pk, key in changes.items()
+                ],
+                ["order", "updated_at"],
+            )
+            lessons_changed.send(sender=Course, course=course)
+    return changes
+
+
+def save_lesson_formset(formset, course):
+    """
+    Сохраняет проверенный формсет уроков ``course``: новые — одной
+    вставкой, изменённые — ``bulk_update``, удалённые — одним ``DELETE``.
+    Новые уроки без ключа порядка встают в конец курса.
+    """
+    lessons = formset.save(commit=False)
+    created = [lesson for lesson in lessons if lesson.pk is None]
+    changed = [lesson for lesson in lessons if lesson.pk is not None]
+    deleted = [lesson.pk for lesson in formset.deleted_objects]
+
+    now = timezone.now()
+    last = max(
+        (
+            form.instance.order
+            for form in formset.forms
+            if form.instance.pk is not None and form.instance.pk not in deleted
+        ),
+        default=0,
+    )
+    for lesson in created:
+        lesson.course = course
+        if not lesson.order:
+            last += ORDER_STEP
+            lesson.order = last
+    for lesson in changed:
+        lesson.course = course
+        lesson.updated_at = now
+
+    with transaction.atomic(), bulk_changes():
+        if created:
+            Lesson.objects.bulk_create(created)
+        if changed:
+            Lesson.objects.bulk_update(changed, [*LESSON_FIELDS, "updated_at"])
+        if deleted:
+            Lesson.objects.filter(pk__in=deleted).delete()
+        increment_counters(
+            Course, course.pk, {"lessons_count": len(created) - len(deleted)}
+        )
+        if created or changed or deleted:
+            lessons_changed.send(sender=Course, course=course)
+    return lessons
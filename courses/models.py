@@ -1,11 +1,31 @@
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.utils import timezone
 from accounts.models import Authors
 from materials.models import VideoContent, AudioContent, TextContent
 
 
+class CourseQuerySet(models.QuerySet):
+    def published(self):
+        return self.filter(status="published")
+
+    def with_tree(self):
+        """
+        Курсы вместе с автором, уроками по порядку и материалами уроков:
+        два запроса на любое число курсов и уроков.
+        """
+        lessons = Lesson.objects.select_related("video", "audio", "text").order_by(
+            "order", "pk"
+        )
+        return self.select_related("author__user").prefetch_related(
+            models.Prefetch("lessons", queryset=lessons)
+        )
+
+
 class Course(models.Model):
     STATUS_CHOICES = [
         ("draft", "Черновик"),
+        ("scheduled", "Запланирован"),
         ("published", "Опубликован"),
         ("archived", "В архиве"),
     ]
@@ -27,15 +47,76 @@ class Course(models.Model):
     published_at = models.DateTimeField(
         null=True, blank=True, verbose_name="Дата публикации"
     )
+    lessons_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Уроков"
+    )
+
+    objects = CourseQuerySet.as_manager()
+
+    # Автор на момент загрузки из БД: при смене автора кэш страниц
+    # сбрасывается и у прежнего (main.signals)
+    _loaded_state = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if "author_id" in instance.__dict__:
+            instance._loaded_state = {"author_id": instance.author_id}
+        return instance
 
     class Meta:
         verbose_name = "Курс"
         verbose_name_plural = "Курсы"
         ordering = ["-published_at", "-created_at"]
+        indexes = [
+            # Публичный список курсов и главная страница
+            models.Index(
+                fields=["-published_at", "-created_at"],
+                condition=models.Q(status="published"),
+                name="course_published_idx",
+            ),
+            # Курсы автора в студии
+            models.Index(
+                fields=["author", "-updated_at"], name="course_author_updated_idx"
+            ),
+            # Курсы, ждущие публикации (manage.py publish_scheduled)
+            models.Index(
+                fields=["published_at"],
+                condition=models.Q(status="scheduled"),
+                name="course_scheduled_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
+    def clean(self):
+        super().clean()
+        if self.status == "scheduled" and not self.published_at:
+            raise ValidationError(
+                {"published_at": "Укажите дату, на которую запланирована публикация."}
+            )
+
+    def save(self, *args, **kwargs):
+        if self.status == "published":
+            if not self.published_at:
+                self.published_at = timezone.now()
+            elif self.published_at > timezone.now():
+                # Дата в будущем — опубликует manage.py publish_scheduled
+                self.status = "scheduled"
+        super().save(*args, **kwargs)
+
+    def publish_materials(self):
+        """Публикует все материалы уроков курса (materials.publishing)"""
+        from materials.publishing import publish
+
+        course = Course.objects.with_tree().get(pk=self.pk)
+        return publish(
+            material
+            for lesson in course.lessons.all()
+            for material in (lesson.video, lesson.audio, lesson.text)
+        )
+
 
 class Lesson(models.Model):
     course = models.ForeignKey(
@@ -69,10 +150,23 @@ class Lesson(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Курс на момент загрузки из БД: при переносе урока счётчики
+    # обновляются у обоих курсов (courses.signals)
+    _loaded_course_id = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_course_id = instance.__dict__.get("course_id")
+        return instance
+
     class Meta:
         verbose_name = "Урок"
         verbose_name_plural = "Уроки"
         ordering = ["course", "order"]
+        indexes = [
+            models.Index(fields=["course", "order"], name="lesson_course_order_idx")
+        ]
 
     def __str__(self):
         return f"{self.course.title} — {self.title}"
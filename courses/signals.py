@@ -0,0 +1,30 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from materials.counters import increment_counters
+
+from .lessons import in_bulk
+from .models import Course, Lesson
+
+
+@receiver(post_save, sender=Lesson)
+def update_lessons_count_on_save(sender, instance, created, raw=False, **kwargs):
+    """Поддерживает ``Course.lessons_count`` при добавлении и переносе урока"""
+    if raw or in_bulk():
+        return
+    previous = instance._loaded_course_id
+    if created:
+        increment_counters(Course, instance.course_id, {"lessons_count": 1})
+    elif previous is not None and previous != instance.course_id:
+        increment_counters(Course, previous, {"lessons_count": -1})
+        increment_counters(Course, instance.course_id, {"lessons_count": 1})
+    instance._loaded_course_id = instance.course_id
+
+
+@receiver(post_delete, sender=Lesson)
+def update_lessons_count_on_delete(sender, instance, **kwargs):
+    if in_bulk():
+        # Счётчик обновит save_lesson_formset одним запросом
+        return
+    course_id = instance._loaded_course_id or instance.course_id
+    increment_counters(Course, course_id, {"lessons_count": -1})
@@ -1,3 +1,215 @@
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
-# Create your tests here.
+from accounts.models import User
+from materials.models import AudioContent, TextContent, VideoContent
+
+from .lessons import ORDER_STEP, plan_order, reorder_lessons
+from .models import Course, Lesson
+
+
+def make_author(email):
+    user = User.objects.create_user(email=email, password="pass", user_type="author")
+    return user.author_profile
+
+
+def lesson_data(lessons, new=0, deleted=()):
+    """POST-данные формы курса со всеми ``lessons`` и ``new`` новыми уроками"""
+    data = {
+        "title": "Курс",
+        "description": "Описание",
+        "status": "draft",
+        "published_at": "",
+        "lessons-TOTAL_FORMS": len(lessons) + new,
+        "lessons-INITIAL_FORMS": len(lessons),
+        "lessons-MIN_NUM_FORMS": 0,
+        "lessons-MAX_NUM_FORMS": 1000,
+    }
+    for i, lesson in enumerate([*lessons, *[None] * new]):
+        prefix = f"lessons-{i}-"
+        data.update(
+            {
+                prefix + "id": lesson.pk if lesson else "",
+                prefix + "title": lesson.title if lesson else f"Новый {i}",
+                prefix + "description": "",
+                prefix + "order": lesson.order if lesson else 0,
+                prefix + "video": "",
+                prefix + "audio": "",
+                prefix + "text": "",
+            }
+        )
+        if lesson in deleted:
+            data[prefix + "DELETE"] = "on"
+    return data
+
+
+class PlanOrderTests(TestCase):
+    def items(self, count):
+        return [(pk, (pk + 1) * ORDER_STEP) for pk in range(count)]
+
+    def test_unchanged_order(self):
+        self.assertEqual(plan_order(self.items(5)), {})
+
+    def test_single_move_touches_one_row(self):
+        items = self.items(10)
+        moved = items[:2] + [items[7]] + items[2:7] + items[8:]
+        changes = plan_order(moved)
+        self.assertEqual(list(changes), [7])
+        self.assertTrue(items[1][1] < changes[7] < items[2][1])
+
+    def test_move_to_end_and_start(self):
+        items = self.items(4)
+        self.assertEqual(plan_order(items[1:] + items[:1]), {0: 5 * ORDER_STEP})
+        changes = plan_order(items[3:] + items[:3])
+        self.assertEqual(list(changes), [3])
+        self.assertTrue(0 < changes[3] < items[0][1])
+
+    def test_renumbers_when_gap_is_exhausted(self):
+        items = [(1, 1), (2, 2), (3, 3)]
+        self.assertEqual(
+            plan_order([items[2], items[0], items[1]]),
+            {3: ORDER_STEP, 1: 2 * ORDER_STEP, 2: 3 * ORDER_STEP},
+        )
+
+
+class LessonOrderTests(TestCase):
+    def setUp(self):
+        self.author = make_author("author@example.com")
+        self.course = Course.objects.create(
+            title="Курс", slug="kurs", author=self.author
+        )
+        for position in range(1, 21):
+            Lesson.objects.create(
+                course=self.course,
+                title=f"Урок {position}",
+                order=position * ORDER_STEP,
+            )
+        self.client.force_login(self.author.user)
+
+    def lesson_ids(self):
+        return list(self.course.lessons.order_by("order").values_list("pk", flat=True))
+
+    def test_reorder_lessons(self):
+        ids = self.lesson_ids()
+        ids.insert(2, ids.pop(15))
+        changes = reorder_lessons(self.course, ids)
+        self.assertEqual(list(changes), [ids[2]])
+        self.assertEqual(self.lesson_ids(), ids)
+
+    def test_reorder_requires_every_lesson(self):
+        ids = self.lesson_ids()
+        with self.assertRaises(ValueError):
+            reorder_lessons(self.course, ids[:-1])
+        with self.assertRaises(ValueError):
+            reorder_lessons(self.course, [*ids[:-1], ids[0]])
+
+    def test_reorder_view(self):
+        ids = self.lesson_ids()[::-1]
+        url = reverse("studio_lesson_reorder", args=[self.course.pk])
+        response = self.client.post(
+            url, {"order": ids}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["success"])
+        self.assertEqual(self.lesson_ids(), ids)
+
+        response = self.client.post(
+            url, {"order": ids[1:]}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_edit_saves_lessons_in_bulk(self):
+        lessons = list(self.course.lessons.order_by("order"))
+        deleted = lessons[3:6]
+        url = reverse("studio_course_edit", args=[self.course.pk])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                url, lesson_data(lessons, new=2, deleted=deleted)
+            )
+        self.assertEqual(response.status_code, 302)
+        self.assertLess(len(queries), 30)
+
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.lessons.count(), 19)
+        self.assertEqual(self.course.lessons_count, 19)
+        last = self.course.lessons.order_by("order").last()
+        self.assertEqual(last.title, "Новый 21")
+        self.assertEqual(last.order, 22 * ORDER_STEP)
+
+    def test_create_does_not_load_other_lessons(self):
+        url = reverse("studio_course_create")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, lesson_data([], new=2))
+        self.assertEqual(response.status_code, 302)
+        lesson_selects = [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith("SELECT") and "courses_lesson" in query["sql"]
+        ]
+        self.assertEqual(lesson_selects, [])
+        course = Course.objects.exclude(pk=self.course.pk).get()
+        self.assertEqual(course.lessons_count, 2)
+
+
+class CourseTreeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = make_author("author@example.com")
+
+    def make_course(self, slug, lessons):
+        course = Course.objects.create(
+            title="Курс", slug=slug, author=self.author, status="published"
+        )
+        for position in range(1, lessons + 1):
+            fields = {"author": self.author, "status": "published"}
+            Lesson.objects.create(
+                course=course,
+                title=f"Урок {position}",
+                order=position * ORDER_STEP,
+                video=VideoContent.objects.create(
+                    title=f"Видео {slug} {position}",
+                    embed_code="<iframe></iframe>",
+                    **fields,
+                ),
+                audio=AudioContent.objects.create(
+                    title=f"Аудио {slug} {position}",
+                    audio_file="audio/lecture.mp3",
+                    **fields,
+                ),
+                text=TextContent.objects.create(
+                    title=f"Статья {slug} {position}", **fields
+                ),
+            )
+        return course
+
+    def test_with_tree_loads_everything_in_two_queries(self):
+        self.make_course("first", 3)
+        self.make_course("second", 5)
+        with self.assertNumQueries(2):
+            courses = list(Course.objects.with_tree())
+            titles = [
+                (course.author.user.email, lesson.video.title, lesson.text.title)
+                for course in courses
+                for lesson in course.lessons.all()
+            ]
+        self.assertEqual(len(titles), 8)
+
+    def test_course_detail_queries_do_not_grow_with_lessons(self):
+        small = self.make_course("small", 2)
+        large = self.make_course("large", 12)
+
+        def queries(course):
+            cache.clear()
+            url = reverse("course_detail", args=[course.slug])
+            with CaptureQueriesContext(connection) as captured:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertContains(response, f"Урок {course.lessons.count()}")
+            return len(captured)
+
+        # Первый запрос ещё загружает меню категорий в кэш процесса
+        queries(small)
+        self.assertEqual(queries(small), queries(large))
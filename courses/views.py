@@ -1,15 +1,26 @@
 from django.shortcuts import render, get_object_or_404
+from main.cache import anonymous_page_cache, tag_page
 from .models import Course
 
 
+@anonymous_page_cache("courses")
 def course_list(request):
-    courses = Course.objects.filter(status="published").order_by("-published_at")
+    # Число уроков — поле lessons_count (courses.signals), без подсчёта в запросе
+    courses = Course.objects.published().order_by("-published_at")
     return render(request, "courses/course_list.html", {"courses": courses})
 
 
+@anonymous_page_cache()
 def course_detail(request, slug):
-    course = get_object_or_404(Course, slug=slug, status="published")
+    course = get_object_or_404(Course.objects.published().with_tree(), slug=slug)
     lessons = course.lessons.all()
+    # Страница показывает материалы уроков
+    tag_page(request, f"course:{course.pk}")
+    for lesson in lessons:
+        for kind in ("video", "audio", "text"):
+            material_id = getattr(lesson, f"{kind}_id")
+            if material_id:
+                tag_page(request, f"{kind}:{material_id}")
     return render(
         request,
         "courses/course_detail.html",
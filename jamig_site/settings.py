@@ -42,9 +42,11 @@ INSTALLED_APPS = [
     "materials",
     "courses",
     "studio",
+    "search",
 ]
 
 MIDDLEWARE = [
+    "main.middleware.QueryBudgetMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -123,6 +125,89 @@ STATICFILES_DIRS = [BASE_DIR / "static"]
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Отдача файлов фронт-сервером: None (Django сам), "nginx" (X-Accel-Redirect)
+# или "apache"/"lighttpd" (X-Sendfile). Для nginx MEDIA_SENDFILE_PREFIX должен
+# указывать на internal-location, смотрящий в MEDIA_ROOT.
+MEDIA_SENDFILE_BACKEND = None
+MEDIA_SENDFILE_PREFIX = "/protected-media/"
+
+# Кэш готовых файлов экспорта статей (TXT/PDF/EPUB)
+EXPORT_CACHE_DIR = MEDIA_ROOT / "exports"
+EXPORT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+# Базовый адрес для ссылок на изображения при рендере PDF вне запроса;
+# без DEBUG его нужно задать (адрес сайта), иначе воркер экспорта не запустится
+EXPORT_BASE_URL = "http://127.0.0.1:8000/" if DEBUG else None
+# Прогресс чтения копится в памяти и пишется в БД пакетами
+READING_PROGRESS_FLUSH_INTERVAL = 2.0  # секунд
+READING_PROGRESS_FLUSH_SIZE = 200
+
+# Просмотры и прослушивания копятся в памяти и пишутся пакетами
+HIT_FLUSH_INTERVAL = 10.0  # секунд
+HIT_FLUSH_SIZE = 500  # материалов
+HIT_DEDUPE_WINDOW = 30 * 60  # повторный просмотр того же посетителя не считается
+# Заголовок с адресом посетителя от обратного прокси, например
+# "HTTP_X_FORWARDED_FOR". Включать, только если прокси перезаписывает его:
+# иначе посетитель подставит любой адрес и обойдёт дедупликацию. None —
+# REMOTE_ADDR (сайт без прокси)
+CLIENT_IP_HEADER = None
+
+# Статистика по интервалам (materials.stats), свёртка — manage.py compact_stats
+STATS_HOURLY = True  # вести почасовые строки
+STATS_HOURLY_RETENTION = 7  # дней
+STATS_DAILY_RETENTION = 90  # дней, затем — в недельные и месячные
+
+# Сколько секунд хранить в кэше общее число строк списков (materials.pagination)
+PAGINATION_COUNT_TIMEOUT = 300
+
+# Таблицы-справочники, полный просмотр которых manage.py explain_queries не отмечает
+QUERY_PLAN_IGNORED_TABLES = ["materials_category", "accounts_authors"]
+
+# Бэкенд полнотекстового поиска (search.backends): "auto" — по типу базы,
+# "sqlite" (FTS5), "postgresql" (tsvector) или "basic"
+SEARCH_BACKEND = "auto"
+
+# Подсказки при наборе (search.suggest): сколько лучших записей хранит узел
+# префиксного дерева и как часто (сек) сверять версию с другими процессами
+SUGGEST_NODE_SIZE = 20
+SUGGEST_CHECK_INTERVAL = 5.0
+
+# Сколько объектов за раз публикует manage.py publish_scheduled
+SCHEDULED_PUBLISH_BATCH_SIZE = 100
+
+# Фоновый рендер экспорта (manage.py run_export_worker)
+EXPORT_WORKER_CONCURRENCY = 2
+EXPORT_JOB_MAX_ATTEMPTS = 5
+EXPORT_JOB_RETENTION = 7  # дней хранить выполненные задания
+
+# Кэш Django: меню категорий и страницы для анонимных посетителей.
+# При нескольких процессах нужен общий бэкенд (Redis, Memcached),
+# иначе сброс кэша по сигналу дойдёт только до одного процесса.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    }
+}
+# Кэш публичных страниц для анонимных посетителей (main.cache)
+PAGE_CACHE_ENABLED = True
+PAGE_CACHE_TIMEOUT = 600  # секунд
+
+# Как часто процесс сверяет версию кэша категорий меню с общим кэшем, секунд
+CATEGORY_CACHE_CHECK_INTERVAL = 2.0
+
+# Бюджет SQL-запросов на страницу (main.middleware.QueryBudgetMiddleware).
+# Превышение пишется в лог main.query_budget; сводка по страницам —
+# manage.py query_budget_report. VIEWS переопределяет лимиты по имени URL.
+QUERY_BUDGET = {
+    "ENABLED": DEBUG,
+    "APPS": ("materials", "courses", "main", "studio"),
+    "MAX_QUERIES": 20,
+    "MAX_DUPLICATES": 3,  # один и тот же запрос больше N раз — вероятно N+1
+    "MAX_DB_TIME": 0.5,  # секунд
+    "VIEWS": {},
+    "RAISE": False,  # True — исключение вместо предупреждения (для тестов)
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
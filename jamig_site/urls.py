@@ -8,6 +8,7 @@ urlpatterns = [
     path("accounts/", include("accounts.urls")),
     path("studio/", include("studio.urls")),
     path("courses/", include("courses.urls")),
+    path("search/", include("search.urls")),
     path("", include("materials.urls")), 
     path("", include("main.urls")),
 ]
@@ -0,0 +1,185 @@
+"""Прогон страниц сайта через тестовый клиент с замером производительности.
+
+``discover_urls`` собирает адреса публичных страниц и студии (для страниц
+объектов берётся первый подходящий объект из БД), ``run_benchmark``
+запрашивает каждый адрес несколько раз и возвращает по каждому view
+p50/p95 времени ответа, число SQL-запросов и пиковую память Python.
+Используется командами ``benchmark`` и ``query_budget_report``.
+"""
+
+import statistics
+import time
+import tracemalloc
+
+from django.apps import apps
+from django.conf import settings
+from django.test import Client, override_settings
+from django.urls import NoReverseMatch, resolve, reverse
+
+from .query_budget import QueryRecorder, view_label
+
+# Публичные страницы без параметров
+PUBLIC_PAGES = [
+    "home",
+    "author_list",
+    "video_list",
+    "audio_list",
+    "text_list",
+    "course_list",
+]
+# Страницы объектов: имя URL -> (модель, фильтр, {аргумент URL: поле})
+OBJECT_PAGES = {
+    "author_detail": ("accounts.Authors", {"show_in_authors_list": True}, {"pk": "pk"}),
+    "video_detail": (
+        "materials.VideoContent",
+        {"status": "published"},
+        {"slug": "slug"},
+    ),
+    "audio_detail": (
+        "materials.AudioContent",
+        {"status": "published"},
+        {"slug": "slug"},
+    ),
+    "audio_file": ("materials.AudioContent", {"status": "published"}, {"slug": "slug"}),
+    "text_reader": ("materials.TextContent", {"status": "published"}, {"slug": "slug"}),
+    "text_pages": ("materials.TextContent", {"status": "published"}, {"slug": "slug"}),
+    "category_detail": ("materials.Category", {"is_active": True}, {"slug": "slug"}),
+    "course_detail": ("courses.Course", {"status": "published"}, {"slug": "slug"}),
+}
+# Страницы студии без параметров
+STUDIO_PAGES = [
+    "studio_dashboard",
+    "studio_video_list",
+    "studio_audio_list",
+    "studio_text_list",
+    "studio_course_list",
+    "studio_video_create",
+    "studio_audio_create",
+    "studio_text_create",
+    "studio_course_create",
+]
+# Формы редактирования студии: имя URL -> модель (объект автора)
+STUDIO_OBJECT_PAGES = {
+    "studio_video_edit": "materials.VideoContent",
+    "studio_audio_edit": "materials.AudioContent",
+    "studio_text_edit": "materials.TextContent",
+    "studio_course_edit": "courses.Course",
+}
+
+
+def discover_urls(user=None):
+    """Адреса для прогона; страницы студии — если передан автор ``user``"""
+    urls = [reverse(name) for name in PUBLIC_PAGES]
+    for name, (model_label, filters, kwargs_map) in OBJECT_PAGES.items():
+        obj = apps.get_model(model_label).objects.filter(**filters).first()
+        if obj is None:
+            continue
+        kwargs = {arg: getattr(obj, field) for arg, field in kwargs_map.items()}
+        try:
+            urls.append(reverse(name, kwargs=kwargs))
+        except NoReverseMatch:
+            continue
+
+    if user is not None and getattr(user, "user_type", None) == "author":
+        urls += [reverse(name) for name in STUDIO_PAGES]
+        for name, model_label in STUDIO_OBJECT_PAGES.items():
+            obj = (
+                apps.get_model(model_label)
+                .objects.filter(author__user=user)
+                .only("pk")
+                .first()
+            )
+            if obj is not None:
+                urls.append(reverse(name, kwargs={"pk": obj.pk}))
+    return urls
+
+
+def percentile(values, percent):
+    """Перцентиль с линейной интерполяцией (как в numpy по умолчанию)"""
+    values = sorted(values)
+    if not values:
+        return 0.0
+    position = (len(values) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def measure_url(client, url, repeat=10, warmup=1):
+    """
+    Запрашивает ``url`` ``warmup + repeat`` раз и ещё один раз под
+    tracemalloc (он замедляет код, поэтому в замер времени не входит).
+    """
+    for _ in range(warmup):
+        _consume(client.get(url))
+
+    timings = []
+    queries = []
+    status_code = None
+    for _ in range(repeat):
+        with QueryRecorder() as recorder:
+            start = time.perf_counter()
+            response = client.get(url)
+            _consume(response)
+            timings.append((time.perf_counter() - start) * 1000)
+        queries.append(recorder.count)
+        status_code = response.status_code
+
+    tracemalloc.start()
+    try:
+        _consume(client.get(url))
+        _current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "url": url,
+        "status": status_code,
+        "requests": repeat,
+        "p50_ms": round(percentile(timings, 50), 2),
+        "p95_ms": round(percentile(timings, 95), 2),
+        "mean_ms": round(statistics.fmean(timings), 2),
+        "queries": max(queries),
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+
+def run_benchmark(urls, user=None, repeat=10, warmup=1, on_result=None):
+    """
+    Прогоняет адреса и возвращает ``{view: результат}``. Если несколько
+    адресов ведут к одному view, в результат попадает самый медленный.
+    """
+    client = Client()
+    if user is not None:
+        client.force_login(user)
+
+    results = {}
+    with benchmark_environment():
+        for url in urls:
+            result = measure_url(client, url, repeat=repeat, warmup=warmup)
+            view_name = view_label(resolve(url.split("?", 1)[0]))
+            if on_result is not None:
+                on_result(view_name, result)
+            previous = results.get(view_name)
+            if previous is None or result["p95_ms"] > previous["p95_ms"]:
+                results[view_name] = result
+    return dict(sorted(results.items()))
+
+
+def benchmark_environment():
+    """
+    Настройки на время прогона: тестовый клиент обращается к хосту
+    testserver, а запросы считает сам прогон, а не middleware.
+    """
+    return override_settings(
+        ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"],
+        QUERY_BUDGET={**getattr(settings, "QUERY_BUDGET", {}), "ENABLED": False},
+    )
+
+
+def _consume(response):
+    """Дочитывает потоковый ответ, чтобы его отдача попала в замер"""
+    if response.streaming:
+        for _chunk in response.streaming_content:
+            pass
+    response.close()
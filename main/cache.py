@@ -0,0 +1,148 @@
+"""Кэш публичных страниц для анонимных посетителей.
+
+Страница кэшируется целиком по адресу (с query string) вместе с версиями
+«тегов», от которых она зависит: ``author:5``, ``category:3``,
+``course:12``, ``videos`` и т. п. Теги объявляются декоратором
+``anonymous_page_cache`` и, по ходу работы view, функцией ``tag_page``.
+Сигналы моделей (``main.signals``) увеличивают версии затронутых тегов,
+и при следующем обращении запись с устаревшей версией считается промахом.
+Так инвалидация стоит одной операции с кэшем на тег и не требует знать,
+какие адреса от него зависят.
+
+Кэш не используется для вошедших пользователей, запросов с сессией или
+сообщениями, не-GET запросов и ответов, устанавливающих cookie.
+Для нескольких процессов нужен общий бэкенд кэша (Redis, Memcached).
+"""
+
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+ENTRY_KEY = "page:{digest}"
+TAG_KEY = "pagetag:{tag}"
+# Теги, от которых зависит любая страница (меню категорий в base.html)
+GLOBAL_TAGS = ("categories",)
+
+
+def get_timeout():
+    return getattr(settings, "PAGE_CACHE_TIMEOUT", 600)
+
+
+def is_enabled():
+    return getattr(settings, "PAGE_CACHE_ENABLED", True)
+
+
+def tag_page(request, *tags):
+    """Добавляет теги к странице, которую сейчас строит view"""
+    page_tags = getattr(request, "_page_cache_tags", None)
+    if page_tags is not None:
+        page_tags.update(str(tag) for tag in tags)
+
+
+def invalidate_tags(*tags):
+    """Делает недействительными все страницы, помеченные любым из тегов"""
+    for tag in set(tags):
+        key = TAG_KEY.format(tag=tag)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Ключа нет — страниц с этим тегом в кэше тоже нет, но новая
+            # версия не должна совпасть с версией вытесненного ключа
+            cache.set(key, time.time_ns(), None)
+
+
+def get_tag_versions(tags):
+    """Текущие версии тегов; отсутствующие создаются"""
+    keys = {TAG_KEY.format(tag=tag): tag for tag in tags}
+    found = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in found}
+    if missing:
+        for key, version in missing.items():
+            cache.add(key, version, None)
+        found.update(cache.get_many(missing))
+    return {keys[key]: version for key, version in found.items()}
+
+
+def is_cacheable_request(request):
+    if request.method not in ("GET", "HEAD") or not is_enabled():
+        return False
+    if settings.SESSION_COOKIE_NAME in request.COOKIES:
+        return False
+    if "messages" in request.COOKIES:
+        return False
+    user = getattr(request, "user", None)
+    return user is None or not user.is_authenticated
+
+
+def page_key(request):
+    raw = f"{request.get_host()}{request.get_full_path()}"
+    return ENTRY_KEY.format(digest=hashlib.sha1(raw.encode("utf-8")).hexdigest())
+
+
+def anonymous_page_cache(*tags):
+    """
+    Декоратор view: отдаёт анонимным посетителям сохранённую страницу,
+    пока не изменилась версия ни одного из её тегов.
+    """
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not is_cacheable_request(request):
+                return view_func(request, *args, **kwargs)
+
+            key = page_key(request)
+            entry = cache.get(key)
+            if entry is not None:
+                versions = get_tag_versions(entry["tags"])
+                if versions == entry["tags"]:
+                    return _restore(entry)
+
+            # Версии заранее известных тегов берутся до рендера: правка,
+            # случившаяся во время него, сделает запись недействительной
+            static_tags = {*GLOBAL_TAGS, *tags}
+            versions = get_tag_versions(static_tags)
+            request._page_cache_tags = set(static_tags)
+            response = view_func(request, *args, **kwargs)
+            if hasattr(response, "render") and callable(response.render):
+                response = response.render()
+            if _is_cacheable_response(response):
+                dynamic_tags = request._page_cache_tags - static_tags
+                versions.update(get_tag_versions(dynamic_tags))
+                cache.set(key, _snapshot(response, versions), get_timeout())
+                response["X-Page-Cache"] = "miss"
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def _is_cacheable_response(response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and "private" not in response.get("Cache-Control", "")
+    )
+
+
+def _snapshot(response, tags):
+    return {
+        "content": response.content,
+        "status": response.status_code,
+        "headers": dict(response.items()),
+        "tags": tags,
+    }
+
+
+def _restore(entry):
+    response = HttpResponse(entry["content"], status=entry["status"])
+    for header, value in entry["headers"].items():
+        response[header] = value
+    response["X-Page-Cache"] = "hit"
+    return response
@@ -0,0 +1,108 @@
+import json
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from main.benchmark import discover_urls, run_benchmark
+
+# Модели, размер которых записывается вместе с результатами
+COUNTED_MODELS = [
+    "accounts.Authors",
+    "materials.VideoContent",
+    "materials.AudioContent",
+    "materials.TextContent",
+    "courses.Course",
+    "courses.Lesson",
+    "materials.ReadingProgress",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Прогоняет публичные страницы и страницы студии через тестовый клиент "
+        "и выводит p50/p95 времени ответа, число SQL-запросов и пиковую память "
+        "по каждому view. Каталог для замеров создаёт manage.py seed_catalogue"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "urls", nargs="*", help="Адреса для замера (по умолчанию все страницы)"
+        )
+        parser.add_argument(
+            "--user",
+            default="bench-author-0@example.com",
+            help="Email автора для страниц студии (пустая строка — без входа)",
+        )
+        parser.add_argument("--repeat", type=int, default=10)
+        parser.add_argument("--warmup", type=int, default=1)
+        parser.add_argument("--output", help="Записать результаты в JSON-файл")
+        parser.add_argument(
+            "--compare", help="JSON с прошлыми результатами для сравнения"
+        )
+
+    def handle(self, *args, **options):
+        user = None
+        if options["user"]:
+            User = apps.get_model("accounts", "User")
+            user = User.objects.filter(email=options["user"]).first()
+            if user is None:
+                self.stderr.write(
+                    f"User {options['user']} not found, studio pages are skipped"
+                )
+
+        urls = options["urls"] or discover_urls(user)
+        if not urls:
+            raise CommandError("Nothing to benchmark")
+
+        baseline = {}
+        if options["compare"]:
+            with open(options["compare"], encoding="utf-8") as fh:
+                baseline = json.load(fh).get("views", {})
+
+        self.stdout.write(
+            f"{'view':<28} {'status':>6} {'p50 ms':>8} {'p95 ms':>8} "
+            f"{'queries':>7} {'peak KB':>9}"
+        )
+        views = run_benchmark(
+            urls,
+            user=user,
+            repeat=options["repeat"],
+            warmup=options["warmup"],
+            on_result=lambda view_name, result: self.print_result(
+                view_name, result, baseline.get(view_name)
+            ),
+        )
+
+        if options["output"]:
+            report = {
+                "settings": {
+                    "repeat": options["repeat"],
+                    "warmup": options["warmup"],
+                    "database": connection.vendor,
+                    "user": user.email if user else None,
+                },
+                "catalogue": {
+                    label: apps.get_model(label).objects.count()
+                    for label in COUNTED_MODELS
+                },
+                "views": views,
+            }
+            # Отсортированные ключи и отступы — чтобы файлы удобно сравнивать diff'ом
+            with open(options["output"], "w", encoding="utf-8") as fh:
+                json.dump(report, fh, indent=2, sort_keys=True, ensure_ascii=False)
+                fh.write("\n")
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def print_result(self, view_name, result, previous):
+        line = (
+            f"{view_name:<28} {result['status']:>6} {result['p50_ms']:>8.1f} "
+            f"{result['p95_ms']:>8.1f} {result['queries']:>7} "
+            f"{result['peak_memory_kb']:>9.0f}"
+        )
+        if previous:
+            delta = result["p95_ms"] - previous["p95_ms"]
+            percent = delta / previous["p95_ms"] * 100 if previous["p95_ms"] else 0
+            queries = result["queries"] - previous["queries"]
+            line += f"  p95 {percent:+.0f}%, queries {queries:+d}"
+        self.stdout.write(line)
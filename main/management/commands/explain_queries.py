@@ -0,0 +1,99 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, override_settings
+from django.urls import resolve
+
+from main.benchmark import benchmark_environment, discover_urls
+from main.query_budget import view_label
+from main.query_plans import PlanCapture, explain, find_problems
+
+
+class Command(BaseCommand):
+    help = (
+        "Обходит страницы сайта, получает план каждого SELECT-запроса "
+        "(EXPLAIN QUERY PLAN) и отмечает полные просмотры таблиц и сортировки "
+        "без индекса"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "urls",
+            nargs="*",
+            help="Адреса для проверки (по умолчанию основные страницы сайта)",
+        )
+        parser.add_argument(
+            "--user",
+            help="Email автора, от имени которого проверить страницы студии",
+        )
+        parser.add_argument(
+            "--ignore",
+            action="append",
+            default=None,
+            help="Таблица, полный просмотр которой допустим "
+            "(по умолчанию QUERY_PLAN_IGNORED_TABLES)",
+        )
+        parser.add_argument(
+            "--show-plans", action="store_true", help="Выводить планы всех запросов"
+        )
+        parser.add_argument(
+            "--fail",
+            action="store_true",
+            help="Завершиться с ошибкой, если найдены полные просмотры",
+        )
+
+    def handle(self, *args, **options):
+        client = Client()
+        user = None
+        if options["user"]:
+            User = apps.get_model("accounts", "User")
+            try:
+                user = User.objects.get(email=options["user"])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user']} not found")
+            client.force_login(user)
+
+        urls = options["urls"] or discover_urls(user)
+        if not urls:
+            raise CommandError("Nothing to check")
+        ignored = set(options["ignore"]) if options["ignore"] is not None else None
+
+        scans = 0
+        # Страницы из кэша не выполняют запросов — проверять нечего
+        with benchmark_environment(), override_settings(PAGE_CACHE_ENABLED=False):
+            for url in urls:
+                scans += self.check_url(client, url, ignored, options["show_plans"])
+
+        if scans:
+            message = f"{scans} queries scan whole tables"
+            if options["fail"]:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS("No full table scans found"))
+
+    def check_url(self, client, url, ignored, show_plans):
+        view_name = view_label(resolve(url.split("?", 1)[0]))
+        with PlanCapture() as capture:
+            response = client.get(url)
+        self.stdout.write(
+            f"{response.status_code} {url} ({view_name}): "
+            f"{len(capture.queries)} distinct queries"
+        )
+
+        scans = 0
+        for alias, sql, params in capture.queries.values():
+            plan = explain(alias, sql, params)
+            problems = find_problems(plan, connections[alias].vendor, ignored)
+            if not problems and not show_plans:
+                continue
+            if any(kind == "scan" for kind, _detail in problems):
+                scans += 1
+            self.stdout.write(f"    {sql[:200]}")
+            for line in plan if show_plans else ():
+                self.stdout.write(f"        {line}")
+            for kind, detail in problems:
+                style = self.style.ERROR if kind == "scan" else self.style.WARNING
+                label = "full scan of" if kind == "scan" else "sort:"
+                self.stdout.write(style(f"        {label} {detail}"))
+        return scans
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from main.scheduling import get_batch_size, publish_due, run_scheduler
+
+
+class Command(BaseCommand):
+    help = "Публикует курсы и материалы, дата публикации которых наступила"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Работать постоянно, а не обработать текущие и завершиться",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=60,
+            help="Наибольшая пауза между проверками в режиме --loop, секунд",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Объектов в одной пачке (по умолчанию SCHEDULED_PUBLISH_BATCH_SIZE)",
+        )
+
+    def handle(self, *args, **options):
+        if options["loop"]:
+            self.stdout.write("Scheduler started")
+            run_scheduler(poll_interval=options["poll_interval"])
+            return
+        published = publish_due(batch_size=options["batch_size"] or get_batch_size())
+        for name, count in published.items():
+            self.stdout.write(f"{name}: {count} published")
@@ -0,0 +1,103 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import resolve
+
+from main.benchmark import benchmark_environment, discover_urls
+from main.query_budget import (
+    QueryRecorder,
+    check_budget,
+    get_stats,
+    record_stats,
+    reset_stats,
+    view_label,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Обходит страницы сайта и выводит по каждому view число SQL-запросов, "
+        "время БД и повторяющиеся запросы (N+1) с учётом QUERY_BUDGET"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "urls",
+            nargs="*",
+            help="Адреса для проверки (по умолчанию основные страницы сайта)",
+        )
+        parser.add_argument(
+            "--user",
+            help="Email пользователя, от имени которого выполнять запросы "
+            "(нужен автор, чтобы проверить студию)",
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=1, help="Сколько раз запросить каждый адрес"
+        )
+        parser.add_argument(
+            "--verbose-duplicates",
+            action="store_true",
+            help="Показать текст повторяющихся запросов",
+        )
+
+    def handle(self, *args, **options):
+        client = Client()
+        user = None
+        if options["user"]:
+            User = apps.get_model("accounts", "User")
+            try:
+                user = User.objects.get(email=options["user"])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user']} not found")
+            client.force_login(user)
+
+        urls = options["urls"] or discover_urls(user)
+        if not urls:
+            raise CommandError("Nothing to check")
+
+        reset_stats()
+        with benchmark_environment():
+            for url in urls:
+                for _ in range(options["repeat"]):
+                    self.check_url(client, url, options["verbose_duplicates"])
+        self.print_summary()
+
+    def check_url(self, client, url, show_duplicates):
+        view_name = view_label(resolve(url.split("?", 1)[0]))
+        with QueryRecorder() as recorder:
+            response = client.get(url)
+        problems = check_budget(view_name, recorder)
+        record_stats(view_name, recorder, problems)
+
+        style = self.style.WARNING if problems else self.style.SUCCESS
+        self.stdout.write(
+            style(
+                f"{response.status_code} {url}: {recorder.count} queries, "
+                f"{recorder.db_time * 1000:.1f} ms"
+            )
+        )
+        for problem in problems:
+            self.stdout.write(f"    {problem}")
+        if show_duplicates:
+            for sql, count in recorder.duplicates():
+                self.stdout.write(f"    {count}x {sql}")
+
+    def print_summary(self):
+        stats = get_stats()
+        self.stdout.write("")
+        self.stdout.write(
+            f"{'view':<28} {'req':>4} {'avg q':>6} {'max q':>6} "
+            f"{'avg ms':>7} {'dup':>4} {'over':>5}"
+        )
+        for view_name, entry in sorted(
+            stats.items(), key=lambda item: -item[1]["max_queries"]
+        ):
+            requests = entry["requests"]
+            line = (
+                f"{view_name:<28} {requests:>4} "
+                f"{entry['queries'] / requests:>6.1f} {entry['max_queries']:>6} "
+                f"{entry['db_time'] * 1000 / requests:>7.1f} "
+                f"{entry['max_duplicates']:>4} {entry['over_budget']:>5}"
+            )
+            style = self.style.WARNING if entry["over_budget"] else str
+            self.stdout.write(style(line))
@@ -0,0 +1,328 @@
+import math
+import random
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import Authors, User
+from courses.lessons import ORDER_STEP
+from courses.models import Course, Lesson
+from materials.counters import recount_authors, recount_categories, recount_courses
+from materials.models import (
+    AudioContent,
+    Category,
+    ReadingProgress,
+    TextContent,
+    TextHeading,
+    TextPage,
+    VideoContent,
+)
+from materials.reader import build_structure
+from search.indexing import index_queryset
+
+# Все созданные объекты помечены префиксом, чтобы их можно было удалить
+PREFIX = "bench-"
+PASSWORD = "bench"
+SAMPLE_AUDIO = f"audio/{PREFIX}sample.mp3"
+
+WORDS = (
+    "знание вера милость терпение молитва пост путь сердце слово истина "
+    "благодеяние община семья наставление мечеть учёный книга история "
+    "пророк сподвижник праведность искренность довольство упование память"
+).split()
+
+BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = (
+        "Создаёт синтетический каталог для нагрузочных замеров: авторов, "
+        "видео, аудио, статьи, курсы с уроками и прогресс чтения. "
+        f"Объекты помечаются префиксом «{PREFIX}», пароль пользователей — «{PASSWORD}»"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--authors", type=int, default=200)
+        parser.add_argument("--categories", type=int, default=20)
+        parser.add_argument("--videos", type=int, default=3000)
+        parser.add_argument("--audios", type=int, default=2000)
+        parser.add_argument("--texts", type=int, default=2000)
+        parser.add_argument("--courses", type=int, default=100)
+        parser.add_argument(
+            "--lessons", type=int, default=30, help="Уроков в каждом курсе"
+        )
+        parser.add_argument(
+            "--progress",
+            type=int,
+            default=1_000_000,
+            help="Строк прогресса чтения (читатели создаются по необходимости)",
+        )
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Удалить ранее созданный синтетический каталог и выйти",
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.now = timezone.now()
+
+        self.clear()
+        if options["clear"]:
+            self.stdout.write("Synthetic catalogue removed")
+            return
+
+        self.password = make_password(PASSWORD)
+        categories = self.create_categories(options["categories"])
+        authors = self.create_authors(options["authors"])
+        self.write_sample_audio()
+
+        videos = self.create_content(
+            VideoContent,
+            options["videos"],
+            authors,
+            categories,
+            lambda i: {
+                "embed_code": (
+                    f'<iframe src="https://rutube.ru/play/embed/{PREFIX}{i}"></iframe>'
+                ),
+                "duration": self.rng.randint(300, 7200),
+            },
+        )
+        audios = self.create_content(
+            AudioContent,
+            options["audios"],
+            authors,
+            categories,
+            lambda i: {
+                "audio_file": SAMPLE_AUDIO,
+                "duration": self.rng.randint(300, 7200),
+                "listens_count": self.rng.randint(0, 5000),
+            },
+        )
+        texts = self.create_content(
+            TextContent,
+            options["texts"],
+            authors,
+            categories,
+            lambda i: {
+                "content": self.article(),
+                "reading_time": self.rng.randint(3, 40),
+            },
+        )
+        self.create_reader_structure(texts)
+        self.create_courses(
+            options["courses"], options["lessons"], authors, videos, audios, texts
+        )
+        self.create_progress(options["progress"], texts)
+        # bulk_create не вызывает сигналов — индексируем поиск и
+        # пересчитываем счётчики авторов, категорий и курсов сами
+        for model in (VideoContent, AudioContent, TextContent):
+            index_queryset(model.objects.filter(slug__startswith=PREFIX))
+        with transaction.atomic():
+            recount_authors()
+            recount_categories()
+            recount_courses()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Catalogue seeded: {len(authors)} authors, {len(videos)} videos, "
+                f"{len(audios)} audios, {len(texts)} texts, {options['courses']} courses, "
+                f"{options['progress']} progress rows. "
+                f"Studio login: {PREFIX}author-0@example.com / {PASSWORD}"
+            )
+        )
+
+    # ---------- Очистка ----------
+    def clear(self):
+        # Удаляем снизу вверх, чтобы не собирать каскады в памяти
+        ReadingProgress.objects.filter(user__email__startswith=PREFIX).delete()
+        Lesson.objects.filter(course__slug__startswith=PREFIX).delete()
+        Course.objects.filter(slug__startswith=PREFIX).delete()
+        TextPage.objects.filter(text__slug__startswith=PREFIX).delete()
+        TextHeading.objects.filter(text__slug__startswith=PREFIX).delete()
+        for model in (VideoContent, AudioContent, TextContent):
+            model.objects.filter(slug__startswith=PREFIX).delete()
+        Category.objects.filter(slug__startswith=PREFIX).delete()
+        Authors.objects.filter(user__email__startswith=PREFIX).delete()
+        User.objects.filter(email__startswith=PREFIX).delete()
+
+    # ---------- Генерация ----------
+    def words(self, count):
+        return " ".join(self.rng.choice(WORDS) for _ in range(count))
+
+    def title(self):
+        return self.words(self.rng.randint(2, 6)).capitalize()
+
+    def article(self):
+        parts = []
+        for _ in range(self.rng.randint(3, 8)):
+            parts.append(f"<h2>{self.title()}</h2>")
+            for _ in range(self.rng.randint(2, 8)):
+                parts.append(
+                    f"<p>{self.words(self.rng.randint(40, 160)).capitalize()}.</p>"
+                )
+        return "".join(parts)
+
+    def published_at(self):
+        return self.now - timedelta(minutes=self.rng.randint(0, 3 * 365 * 24 * 60))
+
+    def status(self):
+        return self.rng.choices(["published", "draft", "archived"], [85, 10, 5])[0]
+
+    def create_users(self, kind, count, **fields):
+        users = [
+            User(
+                email=f"{PREFIX}{kind}-{i}@example.com",
+                password=self.password,
+                first_name=self.words(1).capitalize(),
+                last_name=self.words(1).capitalize(),
+                **fields,
+            )
+            for i in range(count)
+        ]
+        with transaction.atomic():
+            User.objects.bulk_create(users, batch_size=BATCH_SIZE)
+        return list(
+            User.objects.filter(email__startswith=f"{PREFIX}{kind}-").order_by("pk")
+        )
+
+    def create_categories(self, count):
+        Category.objects.bulk_create(
+            Category(title=self.title(), slug=f"{PREFIX}category-{i}", order=i)
+            for i in range(count)
+        )
+        return list(Category.objects.filter(slug__startswith=PREFIX))
+
+    def create_authors(self, count):
+        users = self.create_users("author", count, user_type="author")
+        with transaction.atomic():
+            Authors.objects.bulk_create(
+                Authors(user=user, specialization=self.title()) for user in users
+            )
+        return list(
+            Authors.objects.filter(user__email__startswith=PREFIX).order_by("pk")
+        )
+
+    def write_sample_audio(self):
+        path = Path(settings.MEDIA_ROOT) / SAMPLE_AUDIO
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(bytes(256 * 1024))
+
+    def create_content(self, model, count, authors, categories, extra):
+        name = model._meta.model_name
+        objs = []
+        for i in range(count):
+            status = self.status()
+            objs.append(
+                model(
+                    title=self.title(),
+                    slug=f"{PREFIX}{name}-{i}",
+                    description=self.words(30),
+                    category=self.rng.choice(categories) if categories else None,
+                    author=self.rng.choice(authors) if authors else None,
+                    status=status,
+                    views_count=self.rng.randint(0, 20000),
+                    published_at=self.published_at() if status == "published" else None,
+                    **extra(i),
+                )
+            )
+        with transaction.atomic():
+            model.objects.bulk_create(objs, batch_size=BATCH_SIZE)
+        self.stdout.write(f"{count} {model._meta.verbose_name_plural} created")
+        return list(model.objects.filter(slug__startswith=PREFIX).order_by("pk"))
+
+    def create_reader_structure(self, texts):
+        """Страницы и оглавление, которые обычно строит TextContent.save()"""
+        pages = []
+        headings = []
+        for text in texts:
+            text_pages, text_headings = build_structure(text.content)
+            text.page_count = len(text_pages)
+            pages += [
+                TextPage(text=text, number=number, content=content)
+                for number, content in enumerate(text_pages, start=1)
+            ]
+            headings += [
+                TextHeading(text=text, position=position, **heading)
+                for position, heading in enumerate(text_headings, start=1)
+            ]
+        with transaction.atomic():
+            TextContent.objects.bulk_update(
+                texts, ["page_count"], batch_size=BATCH_SIZE
+            )
+            TextPage.objects.bulk_create(pages, batch_size=BATCH_SIZE)
+            TextHeading.objects.bulk_create(headings, batch_size=BATCH_SIZE)
+
+    def create_courses(self, count, lessons_per_course, authors, videos, audios, texts):
+        courses = []
+        for i in range(count):
+            status = self.status()
+            courses.append(
+                Course(
+                    title=self.title(),
+                    slug=f"{PREFIX}course-{i}",
+                    description=self.words(50),
+                    author=self.rng.choice(authors) if authors else None,
+                    status=status,
+                    published_at=self.published_at() if status == "published" else None,
+                )
+            )
+        with transaction.atomic():
+            Course.objects.bulk_create(courses, batch_size=BATCH_SIZE)
+            courses = Course.objects.filter(slug__startswith=PREFIX)
+            materials = [
+                ("video", videos),
+                ("audio", audios),
+                ("text", texts),
+            ]
+            lessons = []
+            for course in courses:
+                for position in range(1, lessons_per_course + 1):
+                    field, pool = self.rng.choice(materials)
+                    lesson = Lesson(
+                        course=course,
+                        title=self.title(),
+                        order=position * ORDER_STEP,
+                    )
+                    if pool:
+                        setattr(lesson, field, self.rng.choice(pool))
+                    lessons.append(lesson)
+            Lesson.objects.bulk_create(lessons, batch_size=BATCH_SIZE)
+        self.stdout.write(f"{count} courses, {len(lessons)} lessons created")
+
+    def create_progress(self, count, texts):
+        if not count or not texts:
+            return
+        # Каждый читатель открывал не больше чем все статьи
+        readers = self.create_users("reader", math.ceil(count / len(texts)))
+        created = 0
+        batch = []
+        for reader in readers:
+            for text in self.rng.sample(texts, min(len(texts), count - created)):
+                batch.append(
+                    ReadingProgress(
+                        user=reader,
+                        text=text,
+                        page_number=self.rng.randint(1, max(text.page_count, 1)),
+                    )
+                )
+                created += 1
+                if len(batch) >= BATCH_SIZE * 10:
+                    self.flush_progress(batch)
+            if created >= count:
+                break
+        self.flush_progress(batch)
+        self.stdout.write(f"{created} reading progress rows created")
+
+    def flush_progress(self, batch):
+        with transaction.atomic():
+            ReadingProgress.objects.bulk_create(batch, batch_size=BATCH_SIZE)
+        batch.clear()
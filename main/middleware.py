@@ -0,0 +1,52 @@
+import logging
+
+from django.core.exceptions import MiddlewareNotUsed
+
+from .query_budget import (
+    QueryBudgetExceeded,
+    QueryRecorder,
+    check_budget,
+    get_budget,
+    get_config,
+    is_tracked,
+    record_stats,
+    view_label,
+)
+
+logger = logging.getLogger("main.query_budget")
+
+
+class QueryBudgetMiddleware:
+    """
+    Считает SQL-запросы каждого view и сообщает о превышении лимитов
+    ``QUERY_BUDGET``. Добавляет заголовок ``Server-Timing`` с числом
+    запросов и временем БД, чтобы его было видно в инструментах браузера.
+    """
+
+    def __init__(self, get_response):
+        if not get_config()["ENABLED"]:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+
+        config = get_config()
+        match = getattr(request, "resolver_match", None)
+        if not is_tracked(match, config):
+            return response
+
+        view_name = view_label(match)
+        problems = check_budget(view_name, recorder, get_budget(view_name, config))
+        record_stats(view_name, recorder, problems)
+        response["Server-Timing"] = (
+            f'db;dur={recorder.db_time * 1000:.1f};desc="{recorder.count} queries"'
+        )
+        if problems:
+            message = "Query budget exceeded for %s (%s): %s"
+            args = (view_name, request.path, "; ".join(problems))
+            if config["RAISE"]:
+                raise QueryBudgetExceeded(message % args)
+            logger.warning(message, *args)
+        return response
@@ -21,6 +21,14 @@ class Post(models.Model):
         verbose_name = "Пост"
         verbose_name_plural = "Посты"
         ordering = ["-created_at"]
+        indexes = [
+            # Последние опубликованные посты на главной
+            models.Index(
+                fields=["-created_at"],
+                condition=models.Q(is_published=True),
+                name="post_published_idx",
+            )
+        ]
 
     def __str__(self):
         return self.title
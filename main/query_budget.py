@@ -0,0 +1,167 @@
+"""Учёт SQL-запросов на один запрос к сайту.
+
+``QueryRecorder`` через ``connection.execute_wrapper`` считает запросы,
+суммарное время БД и повторы: запросы приводятся к «отпечатку» (литералы
+и списки параметров заменяются на ``?``), и один отпечаток, выполненный
+много раз, почти всегда означает N+1 в шаблоне или во view.
+
+Лимиты задаются настройкой ``QUERY_BUDGET``; проверяются только view
+из ``QUERY_BUDGET["APPS"]``. Превышение пишется в лог, а при
+``QUERY_BUDGET["RAISE"]`` (в тестах) приводит к ``QueryBudgetExceeded``.
+"""
+
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+DEFAULTS = {
+    "ENABLED": False,
+    "APPS": ("materials", "courses", "main", "studio"),
+    "MAX_QUERIES": 20,
+    "MAX_DUPLICATES": 3,
+    "MAX_DB_TIME": 0.5,
+    "VIEWS": {},
+    "RAISE": False,
+}
+
+_string_re = re.compile(r"'(?:[^']|'')*'")
+_number_re = re.compile(r"\b\d+(?:\.\d+)?\b")
+_placeholder_list_re = re.compile(r"\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)")
+_space_re = re.compile(r"\s+")
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "QUERY_BUDGET", {})}
+
+
+def fingerprint(sql):
+    """SQL без конкретных значений: одинаков для всех итераций N+1"""
+    sql = _string_re.sub("?", sql)
+    sql = _number_re.sub("?", sql)
+    sql = sql.replace("%s", "?")
+    sql = _placeholder_list_re.sub("(...)", sql)
+    return _space_re.sub(" ", sql).strip()
+
+
+class QueryRecorder:
+    """Контекстный менеджер, записывающий запросы ко всем подключениям"""
+
+    def __init__(self):
+        self.count = 0
+        self.db_time = 0.0
+        self.fingerprints = Counter()
+        self._stack = None
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for conn in connections.all():
+            self._stack.enter_context(conn.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def duplicates(self, threshold=1):
+        """Отпечатки, выполненные больше ``threshold`` раз, по убыванию"""
+        return [
+            (sql, count)
+            for sql, count in self.fingerprints.most_common()
+            if count > threshold
+        ]
+
+    @property
+    def max_duplicates(self):
+        return max(self.fingerprints.values(), default=0)
+
+
+def get_budget(view_name, config=None):
+    """Лимиты для view с учётом переопределений в ``QUERY_BUDGET["VIEWS"]``"""
+    config = config or get_config()
+    budget = {
+        key: config[key] for key in ("MAX_QUERIES", "MAX_DUPLICATES", "MAX_DB_TIME")
+    }
+    budget.update(config["VIEWS"].get(view_name, {}))
+    return budget
+
+
+def is_tracked(resolver_match, config=None):
+    if resolver_match is None:
+        return False
+    config = config or get_config()
+    app = resolver_match.func.__module__.split(".", 1)[0]
+    return app in config["APPS"]
+
+
+def view_label(resolver_match):
+    return resolver_match.view_name or resolver_match._func_path
+
+
+def check_budget(view_name, recorder, budget=None):
+    """Возвращает список нарушений лимитов (пустой, если всё в порядке)"""
+    budget = budget or get_budget(view_name)
+    problems = []
+    if budget["MAX_QUERIES"] is not None and recorder.count > budget["MAX_QUERIES"]:
+        problems.append(f"{recorder.count} queries (budget {budget['MAX_QUERIES']})")
+    if budget["MAX_DB_TIME"] is not None and recorder.db_time > budget["MAX_DB_TIME"]:
+        problems.append(
+            f"{recorder.db_time * 1000:.0f} ms in DB "
+            f"(budget {budget['MAX_DB_TIME'] * 1000:.0f} ms)"
+        )
+    if budget["MAX_DUPLICATES"] is not None:
+        for sql, count in recorder.duplicates(budget["MAX_DUPLICATES"]):
+            problems.append(f"{count}x duplicate query: {sql[:200]}")
+    return problems
+
+
+def record_stats(view_name, recorder, problems):
+    """Добавляет результаты запроса в сводку процесса по view"""
+    with _stats_lock:
+        entry = _stats.setdefault(
+            view_name,
+            {
+                "requests": 0,
+                "queries": 0,
+                "max_queries": 0,
+                "db_time": 0.0,
+                "max_duplicates": 0,
+                "over_budget": 0,
+            },
+        )
+        entry["requests"] += 1
+        entry["queries"] += recorder.count
+        entry["max_queries"] = max(entry["max_queries"], recorder.count)
+        entry["db_time"] += recorder.db_time
+        entry["max_duplicates"] = max(entry["max_duplicates"], recorder.max_duplicates)
+        if problems:
+            entry["over_budget"] += 1
+
+
+def get_stats():
+    with _stats_lock:
+        return {view: dict(entry) for view, entry in _stats.items()}
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
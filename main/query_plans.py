@@ -0,0 +1,103 @@
+"""Проверка планов SQL-запросов страниц.
+
+``PlanCapture`` запоминает SELECT-запросы, выполненные внутри блока,
+вместе с параметрами; ``explain`` получает их план у базы
+(``EXPLAIN QUERY PLAN`` в SQLite, ``EXPLAIN`` в PostgreSQL), а
+``find_problems`` ищет в плане полный просмотр таблицы и сортировку во
+временной структуре. Используется командой ``manage.py explain_queries``.
+"""
+
+import re
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .query_budget import fingerprint
+
+SQLITE_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+SQLITE_TEMP_SORT = "USE TEMP B-TREE FOR"
+# Досортировка строк с равным началом ключа, остальное берётся из индекса
+SQLITE_PARTIAL_SORT = "RIGHT PART OF"
+SQLITE_TABLE = re.compile(r"^(?:SCAN|SEARCH) (?:TABLE )?(\w+)")
+POSTGRES_SCAN = re.compile(r"Seq Scan on (\w+)")
+POSTGRES_TABLE = re.compile(r" on (\w+)")
+
+
+def get_ignored_tables():
+    """Маленькие справочники, полный просмотр которых не страшен"""
+    return set(getattr(settings, "QUERY_PLAN_IGNORED_TABLES", ()))
+
+
+class PlanCapture:
+    """Контекстный менеджер: уникальные SELECT-запросы блока по всем БД"""
+
+    def __init__(self):
+        self.queries = {}
+        self._stack = None
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(
+                connection.execute_wrapper(self._wrapper(connection.alias))
+            )
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    def _wrapper(self, alias):
+        def wrapper(execute, sql, params, many, context):
+            if not many and sql.lstrip().upper().startswith("SELECT"):
+                self.queries.setdefault(fingerprint(sql), (alias, sql, params))
+            return execute(sql, params, many, context)
+
+        return wrapper
+
+
+def explain(alias, sql, params):
+    """Строки плана запроса"""
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            return [row[-1] for row in cursor.fetchall()]
+        if connection.vendor == "postgresql":
+            cursor.execute(f"EXPLAIN {sql}", params)
+            return [row[0] for row in cursor.fetchall()]
+    raise NotImplementedError(f"EXPLAIN is not supported for {connection.vendor}")
+
+
+def find_problems(plan, vendor, ignored=None):
+    """
+    Замечания к плану: ``("scan", таблица)`` — полный просмотр таблицы,
+    ``("sort", строка плана)`` — сортировка без подходящего индекса.
+    """
+    ignored = get_ignored_tables() if ignored is None else ignored
+    problems = []
+    sorts = []
+    tables = set()
+    for line in plan:
+        detail = line.strip()
+        if vendor == "sqlite":
+            match = SQLITE_SCAN.match(detail)
+            tables.update(SQLITE_TABLE.findall(detail))
+            if match and match.group(1) not in ignored:
+                problems.append(("scan", match.group(1)))
+            elif (
+                detail.startswith(SQLITE_TEMP_SORT)
+                and SQLITE_PARTIAL_SORT not in detail
+            ):
+                sorts.append(("sort", detail))
+        elif vendor == "postgresql":
+            match = POSTGRES_SCAN.search(detail)
+            tables.update(POSTGRES_TABLE.findall(detail))
+            if match and match.group(1) not in ignored:
+                problems.append(("scan", match.group(1)))
+            elif detail.lstrip("-> ").startswith("Sort "):
+                sorts.append(("sort", detail))
+    # Сортировка строк одних лишь справочников не в счёт
+    if tables - ignored:
+        problems += sorts
+    return problems
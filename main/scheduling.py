@@ -0,0 +1,108 @@
+"""Отложенная публикация курсов и материалов.
+
+Материал или курс, сохранённый опубликованным с датой публикации в
+будущем, получает статус ``scheduled`` (см. ``BaseContent.save`` и
+``Course.save``). ``publish_due`` выбирает те, чья дата наступила, по
+индексам ``(status, published_at)`` и публикует их пачками по
+``SCHEDULED_PUBLISH_BATCH_SIZE``: материалы — через
+``materials.publishing.set_status`` (один ``UPDATE`` на пачку, сброс кэша,
+поиск и очередь экспорта только для них), курсы — обычным сохранением
+вместе с материалами их уроков. Запускается командой
+``manage.py publish_scheduled`` — разово из cron или постоянным циклом.
+"""
+
+import logging
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+from courses.models import Course
+from materials.models import AudioContent, TextContent, VideoContent
+from materials.publishing import set_status
+
+logger = logging.getLogger(__name__)
+
+CONTENT_MODELS = (VideoContent, AudioContent, TextContent)
+MIN_SLEEP = 1  # секунда: не крутить цикл вхолостую, если дата уже наступила
+
+
+def get_batch_size():
+    return getattr(settings, "SCHEDULED_PUBLISH_BATCH_SIZE", 100)
+
+
+def due(model, now):
+    """Ожидающие публикации объекты, чья дата наступила, от самых старых"""
+    return model.objects.filter(status="scheduled", published_at__lte=now).order_by(
+        "published_at", "pk"
+    )
+
+
+def publish_due(now=None, batch_size=None):
+    """
+    Публикует всё, чья дата наступила к ``now``. Возвращает
+    ``{имя модели: число опубликованных}``.
+    """
+    now = now or timezone.now()
+    batch_size = batch_size or get_batch_size()
+    published = {}
+
+    for model in CONTENT_MODELS:
+        total = 0
+        while True:
+            pks = list(due(model, now).values_list("pk", flat=True)[:batch_size])
+            if not pks:
+                break
+            total += set_status({model: pks}, "published", now)
+        published[model.__name__] = total
+
+    # Курс сохраняется целиком (его сигналы сбрасывают кэш и подсказки);
+    # save() вернёт «scheduled», если ``now`` впереди часов, — такие курсы
+    # повторно не выбираются
+    done = set()
+    while True:
+        courses = list(due(Course, now).exclude(pk__in=done)[:batch_size])
+        if not courses:
+            break
+        for course in courses:
+            course.status = "published"
+            course.save()
+            course.publish_materials()
+            done.add(course.pk)
+    published[Course.__name__] = len(done)
+    return published
+
+
+def next_due():
+    """Ближайшая дата запланированной публикации или ``None``"""
+    dates = []
+    for model in (*CONTENT_MODELS, Course):
+        date = (
+            model.objects.filter(status="scheduled", published_at__isnull=False)
+            .order_by("published_at")
+            .values_list("published_at", flat=True)
+            .first()
+        )
+        if date is not None:
+            dates.append(date)
+    return min(dates, default=None)
+
+
+def run_scheduler(poll_interval=60, once=False):
+    """
+    Цикл планировщика: публикует наступившее и спит до ближайшей даты, но
+    не дольше ``poll_interval`` секунд (новые даты появляются в любой момент).
+    """
+    while True:
+        published = publish_due()
+        if any(published.values()):
+            logger.info("Scheduled publishing: %s", published)
+        if once:
+            return published
+
+        delay = poll_interval
+        upcoming = next_due()
+        if upcoming is not None:
+            seconds = (upcoming - timezone.now()).total_seconds()
+            delay = min(delay, max(seconds, MIN_SLEEP))
+        time.sleep(delay)
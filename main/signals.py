@@ -0,0 +1,166 @@
+"""Инвалидация кэша анонимных страниц (``main.cache``) при изменении данных."""
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from accounts.models import Authors, User
+from courses.lessons import in_bulk, lessons_changed
+from courses.models import Course, Lesson
+from materials.models import AudioContent, Category, TextContent, VideoContent
+from materials.publishing import status_changed
+
+from .cache import invalidate_tags
+from .models import Post
+
+CONTENT_KINDS = {
+    VideoContent: "video",
+    AudioContent: "audio",
+    TextContent: "text",
+}
+# Поля, смена которых переносит объект на страницу другого автора/курса/категории
+TRACKED_FIELDS = {
+    VideoContent: ("author_id", "category_id"),
+    AudioContent: ("author_id", "category_id"),
+    TextContent: ("author_id", "category_id"),
+    Course: ("author_id",),
+    Lesson: ("course_id",),
+}
+# Поля пользователя, из которых складывается имя автора
+NAME_FIELDS = ("first_name", "last_name")
+
+
+def _related_tags(values):
+    tags = set()
+    if values.get("author_id"):
+        tags.add(f"author:{values['author_id']}")
+    if values.get("category_id"):
+        tags.add(f"category:{values['category_id']}")
+    if values.get("course_id"):
+        tags.add(f"course:{values['course_id']}")
+    return tags
+
+
+def _loaded_relations(sender, instance):
+    """Связи объекта на момент загрузки из БД или ``None``, если неизвестны"""
+    if sender is Lesson:
+        course_id = instance._loaded_course_id
+        return None if course_id is None else {"course_id": course_id}
+    loaded = instance._loaded_state
+    if loaded is None:
+        return None
+    return {field: loaded[field] for field in TRACKED_FIELDS[sender]}
+
+
+def _tags_for(instance):
+    """Теги объекта с учётом значений связей до сохранения"""
+    fields = TRACKED_FIELDS[type(instance)]
+    current = {field: getattr(instance, field) for field in fields}
+    tags = _related_tags(current)
+    tags |= _related_tags(getattr(instance, "_page_cache_previous", {}))
+    return tags
+
+
+@receiver(pre_save, sender=VideoContent)
+@receiver(pre_save, sender=AudioContent)
+@receiver(pre_save, sender=TextContent)
+@receiver(pre_save, sender=Course)
+@receiver(pre_save, sender=Lesson)
+def remember_relations(sender, instance, raw=False, **kwargs):
+    """Запоминает прежних автора/категорию/курс, чтобы сбросить и их страницы"""
+    if raw or instance.pk is None:
+        return
+    previous = _loaded_relations(sender, instance)
+    if previous is None:
+        # Объект создан не загрузкой из БД или загружен не полностью
+        previous = (
+            sender.objects.filter(pk=instance.pk)
+            .values(*TRACKED_FIELDS[sender])
+            .first()
+        )
+    instance._page_cache_previous = previous or {}
+
+
+@receiver(post_save, sender=VideoContent)
+@receiver(post_save, sender=AudioContent)
+@receiver(post_save, sender=TextContent)
+@receiver(post_delete, sender=VideoContent)
+@receiver(post_delete, sender=AudioContent)
+@receiver(post_delete, sender=TextContent)
+def invalidate_content(sender, instance, **kwargs):
+    kind = CONTENT_KINDS[sender]
+    invalidate_tags(f"{kind}:{instance.pk}", f"{kind}s", *_tags_for(instance))
+
+
+@receiver(status_changed)
+def invalidate_status_change(sender, changes, **kwargs):
+    """Массовая смена статуса (materials.publishing): один сброс на все материалы"""
+    tags = set()
+    for model, rows in changes.items():
+        kind = CONTENT_KINDS[model]
+        tags.add(f"{kind}s")
+        for row in rows:
+            tags.add(f"{kind}:{row['pk']}")
+            tags |= _related_tags(row)
+    invalidate_tags(*tags)
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def invalidate_course(sender, instance, **kwargs):
+    invalidate_tags(f"course:{instance.pk}", "courses", *_tags_for(instance))
+    instance._loaded_state = {"author_id": instance.author_id}
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+def invalidate_lesson(sender, instance, **kwargs):
+    if in_bulk():
+        return
+    # Список курсов показывает число уроков
+    invalidate_tags("courses", *_tags_for(instance))
+
+
+@receiver(lessons_changed)
+def invalidate_lessons(sender, course, **kwargs):
+    """Уроки курса сохранены пачкой (courses.lessons)"""
+    invalidate_tags("courses", f"course:{course.pk}")
+
+
+@receiver(post_save, sender=Authors)
+@receiver(post_delete, sender=Authors)
+def invalidate_author(sender, instance, **kwargs):
+    invalidate_tags(f"author:{instance.pk}", "authors")
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_user(
+    sender, instance, created=False, update_fields=None, **kwargs
+):
+    """Имя автора выводится на его страницах и в карточках материалов"""
+    if created or instance.user_type != "author":
+        return
+    # Вход обновляет только last_login, правка профиля — не обязательно имя
+    if update_fields is not None and set(NAME_FIELDS).isdisjoint(update_fields):
+        return
+    name = tuple(getattr(instance, field) for field in NAME_FIELDS)
+    if name == instance._loaded_name:
+        return
+    instance._loaded_name = name
+    author_ids = Authors.objects.filter(user=instance).values_list("pk", flat=True)
+    for author_id in author_ids:
+        invalidate_tags(
+            f"author:{author_id}", "authors", "videos", "audios", "texts", "courses"
+        )
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category(sender, instance, **kwargs):
+    # Меню категорий есть на каждой странице
+    invalidate_tags(f"category:{instance.pk}", "categories")
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post(sender, instance, **kwargs):
+    invalidate_tags("posts")
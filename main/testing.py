@@ -0,0 +1,53 @@
+"""Помощники для тестов: проверка бюджета SQL-запросов страницы.
+
+Пример::
+
+    class CourseViewsTests(QueryBudgetMixin, TestCase):
+        def test_course_detail(self):
+            self.assertQueryBudget(course.get_absolute_url())
+
+        def test_course_list_no_n_plus_one(self):
+            with self.assertNoDuplicateQueries():
+                self.client.get(reverse("course_list"))
+"""
+
+from contextlib import contextmanager
+
+from django.urls import resolve
+
+from .query_budget import QueryRecorder, check_budget, get_budget, view_label
+
+
+class QueryBudgetMixin:
+    """Примесь к ``django.test.TestCase``"""
+
+    def assertQueryBudget(self, url, client=None, data=None, **budget):
+        """
+        Запрашивает ``url`` и проверяет лимиты из ``QUERY_BUDGET`` для его
+        view; ``max_queries``, ``max_duplicates`` и ``max_db_time``
+        переопределяют их. Возвращает ответ.
+        """
+        client = client or self.client
+        view_name = view_label(resolve(url.split("?", 1)[0]))
+        limits = get_budget(view_name)
+        for key, value in budget.items():
+            limits[key.upper()] = value
+
+        with QueryRecorder() as recorder:
+            response = client.get(url, data)
+        problems = check_budget(view_name, recorder, limits)
+        if problems:
+            self.fail(f"{view_name} ({url}): " + "; ".join(problems))
+        return response
+
+    @contextmanager
+    def assertNoDuplicateQueries(self, threshold=1):
+        """Падает, если какой-либо запрос внутри блока повторился"""
+        with QueryRecorder() as recorder:
+            yield recorder
+        duplicates = recorder.duplicates(threshold)
+        if duplicates:
+            self.fail(
+                "Duplicate queries:\n"
+                + "\n".join(f"{count}x {sql}" for sql, count in duplicates)
+            )
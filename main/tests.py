@@ -1,3 +1,355 @@
-from django.test import TestCase
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.signals import user_logged_in
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Authors, User
+from courses.models import Course
+from materials.models import AudioContent, Category, TextContent, VideoContent
+from materials.reader import build_structure
+
+from .models import Post
+from .scheduling import next_due, publish_due
+from .testing import QueryBudgetMixin
+
+
+class SeedCatalogueTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def seed(self):
+        call_command(
+            "seed_catalogue",
+            authors=3,
+            categories=2,
+            videos=12,
+            audios=6,
+            texts=6,
+            courses=2,
+            lessons=4,
+            progress=5,
+            stdout=StringIO(),
+        )
+
+    def test_seeded_counters_match_the_data(self):
+        self.seed()
+
+        for author in Authors.objects.all():
+            videos = VideoContent.objects.filter(author=author)
+            self.assertEqual(author.videos_count, videos.count())
+            self.assertEqual(
+                author.videos_published, videos.filter(status="published").count()
+            )
+        self.assertEqual(
+            sum(Authors.objects.values_list("texts_count", flat=True)),
+            TextContent.objects.filter(author__isnull=False).count(),
+        )
+        for category in Category.objects.all():
+            published = sum(
+                model.objects.filter(category=category, status="published").count()
+                for model in (VideoContent, AudioContent, TextContent)
+            )
+            self.assertEqual(category.content_published, published)
+        self.assertEqual(
+            list(Course.objects.values_list("lessons_count", flat=True)), [4, 4]
+        )
+
+    def test_seeded_reader_structure_matches_save(self):
+        self.seed()
+        text = TextContent.objects.filter(headings__isnull=False).first()
+        # Как в TextContent.save: позиции с 1
+        _pages, headings = build_structure(text.content)
+        self.assertEqual(
+            list(text.headings.values_list("position", "anchor", "page_number")),
+            [
+                (position, heading["anchor"], heading["page_number"])
+                for position, heading in enumerate(headings, start=1)
+            ],
+        )
+
+
+def make_author(email):
+    user = User.objects.create_user(email=email, password="pass", user_type="author")
+    return user.author_profile
+
+
+class PageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = make_author("author@example.com")
+        self.other = make_author("other@example.com")
+        self.video = VideoContent.objects.create(
+            title="Тафсир суры Ясин",
+            author=self.author,
+            embed_code="<iframe></iframe>",
+            status="published",
+        )
+        self.url = reverse("author_detail", args=[self.author.pk])
+
+    def get(self, **kwargs):
+        response = self.client.get(self.url, **kwargs)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_anonymous_page_is_served_from_cache(self):
+        self.assertEqual(self.get()["X-Page-Cache"], "miss")
+        with self.assertNumQueries(0):
+            response = self.get()
+        self.assertEqual(response["X-Page-Cache"], "hit")
+        self.assertContains(response, "Тафсир суры Ясин")
+        # Другой адрес — другая запись
+        self.assertEqual(self.get(data={"after": "x"})["X-Page-Cache"], "miss")
+
+    def test_requests_that_bypass_the_cache(self):
+        self.get()
+        self.client.cookies["messages"] = "pending"
+        self.assertNotIn("X-Page-Cache", self.get())
+        del self.client.cookies["messages"]
+
+        response = self.client.post(self.url)
+        self.assertNotIn("X-Page-Cache", response)
+
+        self.client.force_login(self.other.user)
+        self.assertNotIn("X-Page-Cache", self.get())
+
+    def test_content_save_invalidates_tagged_pages(self):
+        self.get()
+        # Материал другого автора страницу не трогает
+        VideoContent.objects.create(
+            title="Чужое",
+            author=self.other,
+            embed_code="<iframe></iframe>",
+            status="published",
+        )
+        self.assertEqual(self.get()["X-Page-Cache"], "hit")
+
+        self.video.title = "Тафсир суры Мульк"
+        self.video.save()
+        response = self.get()
+        self.assertEqual(response["X-Page-Cache"], "miss")
+        self.assertContains(response, "Тафсир суры Мульк")
+
+    @override_settings(PAGE_CACHE_ENABLED=False)
+    def test_disabled(self):
+        self.get()
+        self.assertNotIn("X-Page-Cache", self.get())
+
+
+class PageCacheSignalTests(TestCase):
+    def setUp(self):
+        self.author = make_author("author@example.com")
+        self.other = make_author("other@example.com")
+        self.video = VideoContent.objects.create(
+            title="Видео", author=self.author, embed_code="<iframe></iframe>"
+        )
+
+    def invalidated(self, action):
+        with mock.patch("main.signals.invalidate_tags") as invalidate:
+            action()
+        return {tag for call in invalidate.call_args_list for tag in call.args}
+
+    def test_sign_in_keeps_author_pages(self):
+        user = User.objects.get(pk=self.author.user_id)
+        request = RequestFactory().get("/")
+        self.assertEqual(
+            self.invalidated(
+                lambda: user_logged_in.send(sender=User, request=request, user=user)
+            ),
+            set(),
+        )
+        user.bio = "Новое описание"
+        self.assertNotIn("videos", self.invalidated(user.save))
+
+    def test_renaming_an_author_resets_their_pages(self):
+        user = User.objects.get(pk=self.author.user_id)
+        user.first_name = "Имя"
+        tags = self.invalidated(user.save)
+        self.assertIn(f"author:{self.author.pk}", tags)
+        self.assertIn("videos", tags)
+
+    def test_moving_content_resets_both_authors_without_extra_select(self):
+        video = VideoContent.objects.get(pk=self.video.pk)
+        video.author = self.other
+        with CaptureQueriesContext(connection) as queries:
+            tags = self.invalidated(video.save)
+        self.assertTrue({f"author:{self.author.pk}", f"author:{self.other.pk}"} <= tags)
+        selects = [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith("SELECT") and "materials_" in query["sql"]
+        ]
+        self.assertEqual(selects, [])
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Число запросов страниц не растёт с числом строк на них"""
+
+    @classmethod
+    def setUpClass(cls):
+        media = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(media.cleanup)
+        cls.enterClassContext(override_settings(MEDIA_ROOT=media.name))
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            "seed_catalogue",
+            authors=4,
+            categories=3,
+            videos=40,
+            audios=20,
+            texts=20,
+            courses=4,
+            lessons=6,
+            progress=0,
+            stdout=StringIO(),
+        )
+
+    def setUp(self):
+        # Анонимные страницы кэшируются — считаем запросы без кэша
+        cache.clear()
+
+    def test_public_pages(self):
+        course = Course.objects.filter(status="published").first()
+        for url in (
+            reverse("home"),
+            reverse("course_list"),
+            reverse("course_detail", args=[course.slug]),
+            reverse("author_list"),
+        ):
+            with self.subTest(url=url):
+                response = self.assertQueryBudget(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_feed_pages(self):
+        author = Authors.objects.order_by("-content_published").first()
+        category = Category.objects.order_by("-content_published").first()
+        for url in (
+            reverse("author_detail", args=[author.pk]),
+            reverse("category_detail", args=[category.slug]),
+        ):
+            with self.subTest(url=url):
+                response = self.assertQueryBudget(url)
+                self.assertEqual(response.status_code, 200)
+                cursor = response.context["feed"].next_cursor
+                self.assertTrue(cursor)
+                self.assertQueryBudget(f"{url}?after={cursor}")
+
+    def test_home_page_uses_indexes(self):
+        Post.objects.bulk_create(
+            Post(title=f"Пост {i}", content="Текст", is_published=i % 3 > 0)
+            for i in range(30)
+        )
+        stdout = StringIO()
+        call_command("explain_queries", reverse("home"), fail=True, stdout=stdout)
+        self.assertIn("No full table scans found", stdout.getvalue())
+
+    def test_studio_lists(self):
+        author = Authors.objects.order_by("-videos_count").first()
+        self.client.force_login(author.user)
+        for name in (
+            "studio_video_list",
+            "studio_audio_list",
+            "studio_text_list",
+            "studio_course_list",
+        ):
+            with self.subTest(name=name):
+                response = self.assertQueryBudget(reverse(name))
+                self.assertEqual(response.status_code, 200)
+
+
+class ScheduledPublishingTests(TestCase):
+    def setUp(self):
+        self.author = make_author("author@example.com")
+        self.publish_at = timezone.now() + timedelta(days=1)
+
+    def test_future_date_schedules_instead_of_publishing(self):
+        video = VideoContent.objects.create(
+            title="Видео",
+            author=self.author,
+            embed_code="<iframe></iframe>",
+            status="published",
+            published_at=self.publish_at,
+        )
+        self.assertEqual(video.status, "scheduled")
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.videos_published, 0)
+
+    def test_publish_due(self):
+        text = TextContent.objects.create(
+            title="Статья", author=self.author, status="published"
+        )
+        TextContent.objects.filter(pk=text.pk).update(status="draft")
+        course = Course.objects.create(
+            title="Курс",
+            slug="kurs",
+            author=self.author,
+            status="published",
+            published_at=self.publish_at,
+        )
+        course.lessons.create(title="Урок", order=1, text=text)
+        video = VideoContent.objects.create(
+            title="Видео",
+            author=self.author,
+            embed_code="<iframe></iframe>",
+            status="published",
+            published_at=self.publish_at,
+        )
+
+        # Дата наступила
+        due_at = timezone.now() - timedelta(minutes=1)
+        Course.objects.update(published_at=due_at)
+        VideoContent.objects.update(published_at=due_at)
+
+        self.assertEqual(
+            publish_due(now=due_at - timedelta(minutes=1)),
+            {"VideoContent": 0, "AudioContent": 0, "TextContent": 0, "Course": 0},
+        )
+        published = publish_due()
+        self.assertEqual(published["VideoContent"], 1)
+        self.assertEqual(published["Course"], 1)
+
+        video.refresh_from_db()
+        course.refresh_from_db()
+        text.refresh_from_db()
+        self.assertEqual(
+            (video.status, course.status, text.status),
+            ("published", "published", "published"),
+        )
+        self.assertEqual(video.published_at, due_at)
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.videos_published, 1)
+
+    def test_command_publishes_what_is_due(self):
+        video = VideoContent.objects.create(
+            title="Видео",
+            author=self.author,
+            embed_code="<iframe></iframe>",
+            status="published",
+            published_at=self.publish_at,
+        )
+        VideoContent.objects.filter(pk=video.pk).update(
+            published_at=timezone.now() - timedelta(minutes=1)
+        )
+        self.assertEqual(next_due(), VideoContent.objects.get().published_at)
+
+        stdout = StringIO()
+        call_command("publish_scheduled", stdout=stdout)
+        self.assertIn("VideoContent: 1 published", stdout.getvalue())
+        video.refresh_from_db()
+        self.assertEqual(video.status, "published")
+        self.assertIsNone(next_due())
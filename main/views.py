@@ -1,9 +1,12 @@
 from django.shortcuts import render, get_object_or_404
+from .cache import anonymous_page_cache, tag_page
 from .models import Post
-from materials.models import VideoContent, AudioContent, TextContent
+from materials.feed import FEED_PAGE_SIZE, get_feed_page
+from materials.models import VideoContent
 from accounts.models import Authors
 
 
+@anonymous_page_cache("videos", "posts", "authors", "courses")
 def home(request):
     # Последнее опубликованное видео
     try:
@@ -19,12 +22,13 @@ def home(request):
     recent_posts = Post.objects.filter(is_published=True)[:5]
 
     # Популярные авторы (первые 4)
-    authors = Authors.objects.filter(show_in_authors_list=True)[:4]
+    authors = Authors.objects.filter(show_in_authors_list=True)
+    authors = authors.select_related("user")[:4]
 
     # Активные курсы (последние 3)
     from courses.models import Course
 
-    active_courses = Course.objects.filter(status="published")[:3]
+    active_courses = Course.objects.published()[:3]
 
     context = {
         "current_video": current_video,
@@ -36,23 +40,22 @@ def home(request):
     return render(request, "main/home.html", context)
 
 
+@anonymous_page_cache("authors")
 def author_list(request):
     """Список всех авторов"""
-    authors = Authors.objects.filter(show_in_authors_list=True)
+    authors = Authors.objects.filter(show_in_authors_list=True).select_related("user")
     return render(request, "main/author_list.html", {"authors": authors})
 
 
+@anonymous_page_cache()
 def author_detail(request, pk):
     """Страница конкретного автора с его материалами"""
+    tag_page(request, f"author:{pk}")
     author = get_object_or_404(Authors, pk=pk)
-    videos = VideoContent.objects.filter(author=author, status="published")
-    audios = AudioContent.objects.filter(author=author, status="published")
-    texts = TextContent.objects.filter(author=author, status="published")
+    feed = get_feed_page(FEED_PAGE_SIZE, request.GET.get("after"), author=author)
 
     context = {
         "author": author,
-        "videos": videos,
-        "audios": audios,
-        "texts": texts,
+        "feed": feed,
     }
     return render(request, "main/author_detail.html", context)
@@ -1,6 +1,18 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.utils.safestring import mark_safe
-from .models import Category, ReadingProgress, VideoContent, AudioContent, TextContent
+
+from search.indexing import SEARCH_MODELS
+from search.query import search_ids
+
+from .models import (
+    Category,
+    ExportJob,
+    ReadingProgress,
+    VideoContent,
+    AudioContent,
+    TextContent,
+)
+from .publishing import STATUSES, set_status
 
 
 class BaseContentAdmin(admin.ModelAdmin):
@@ -20,10 +32,35 @@ class BaseContentAdmin(admin.ModelAdmin):
         ("Статистика", {"fields": ("views_count", "created_at", "updated_at")}),
     )
 
+    actions = ["publish_selected", "archive_selected"]
+
+    def _set_status(self, request, queryset, status):
+        changed = set_status({self.model: queryset.values("pk")}, status)
+        self.message_user(
+            request,
+            f"Статус «{STATUSES[status]}» установлен у материалов: {changed}",
+            messages.SUCCESS,
+        )
+
+    @admin.action(description="Опубликовать выбранные", permissions=["change"])
+    def publish_selected(self, request, queryset):
+        self._set_status(request, queryset, "published")
+
+    @admin.action(description="Перенести выбранные в архив", permissions=["change"])
+    def archive_selected(self, request, queryset):
+        self._set_status(request, queryset, "archived")
+
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск по полнотекстовому индексу вместо LIKE по всей таблице"""
+        if not search_term.strip():
+            return super().get_search_results(request, queryset, search_term)
+        ids = search_ids(search_term, SEARCH_MODELS[self.model])
+        return queryset.filter(pk__in=ids), False
+
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ["title", "slug", "order", "is_active"]
+    list_display = ["title", "slug", "order", "is_active", "content_published"]
     list_filter = ["is_active"]
     search_fields = ["title"]
     prepopulated_fields = {"slug": ("title",)}
@@ -73,6 +110,7 @@ class AudioContentAdmin(BaseContentAdmin):
         "file_size_display",
     ]
     readonly_fields = BaseContentAdmin.readonly_fields + [
+        "listens_count",
         "duration_display",
         "file_size_display",
     ]
@@ -131,3 +169,12 @@ class ReadingProgressAdmin(admin.ModelAdmin):
     list_filter = ["text"]
     search_fields = ["user__email", "text__title"]
     readonly_fields = ["updated_at"]
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ["text", "status", "attempts", "run_after", "updated_at"]
+    list_filter = ["status"]
+    search_fields = ["text__title"]
+    list_select_related = ["text"]
+    readonly_fields = ["created_at", "updated_at", "last_error"]
@@ -0,0 +1,80 @@
+"""Кэш активных категорий для меню и фильтров списков.
+
+Список нужен почти каждой странице (``categories_processor``), поэтому он
+хранится в двух слоях: в памяти процесса и в общем кэше Django под ключом
+с номером версии. Сохранение или удаление категории увеличивает версию
+(см. ``materials.signals``), и все процессы перечитывают список при
+следующей проверке версии — не чаще раза в ``CATEGORY_CACHE_CHECK_INTERVAL``
+секунд. В обычном режиме меню не стоит ни одного запроса к БД.
+
+Изменения через ``QuerySet.update()`` сигналов не вызывают — после них
+нужно вызвать ``invalidate_categories()``.
+"""
+
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Category
+
+VERSION_KEY = "materials:categories:version"
+DATA_KEY = "materials:categories:{version}"
+# Общий кэш хранит список сутки; актуальность обеспечивает версия
+DATA_TIMEOUT = 24 * 60 * 60
+
+_state = {"version": None, "categories": None, "checked_at": 0.0}
+_lock = threading.Lock()
+
+
+def get_check_interval():
+    return getattr(settings, "CATEGORY_CACHE_CHECK_INTERVAL", 2.0)
+
+
+def get_active_categories():
+    """Кортеж активных категорий в порядке ``Category.Meta.ordering``"""
+    now = time.monotonic()
+    with _lock:
+        if (
+            _state["categories"] is not None
+            and now - _state["checked_at"] < get_check_interval()
+        ):
+            return _state["categories"]
+
+    version = _get_version()
+    with _lock:
+        if _state["categories"] is not None and _state["version"] == version:
+            _state["checked_at"] = now
+            return _state["categories"]
+
+    key = DATA_KEY.format(version=version)
+    categories = cache.get(key)
+    if categories is None:
+        categories = tuple(Category.objects.filter(is_active=True))
+        cache.set(key, categories, DATA_TIMEOUT)
+
+    with _lock:
+        _state.update(version=version, categories=categories, checked_at=now)
+    return categories
+
+
+def invalidate_categories():
+    """Делает кэш категорий недействительным во всех процессах"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        # Ключа нет (кэш очищен или ещё не заполнен) — начинаем новую серию
+        cache.set(VERSION_KEY, time.time_ns(), None)
+    with _lock:
+        _state.update(version=None, categories=None, checked_at=0.0)
+
+
+def _get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Время в наносекундах не совпадёт с версией, оставшейся от
+        # предыдущего заполнения кэша
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
@@ -1,5 +1,5 @@
-from .models import Category
+from .categories import get_active_categories
 
 
 def categories_processor(request):
-    return {"menu_categories": Category.objects.filter(is_active=True)}
+    return {"menu_categories": get_active_categories()}
@@ -0,0 +1,144 @@
+"""Счётчики авторов, категорий и курсов.
+
+``Authors`` хранит число материалов каждого типа (всего и опубликованных),
+``content_published`` и ``total_views``; ``Category`` — число
+опубликованных материалов; ``Course`` — число уроков. Сигналы
+(``materials.signals``, ``courses.signals``) сравнивают состояние объекта
+при загрузке из БД с новым и применяют разницу через ``F()`` в той же
+транзакции, что и сохранение. Просмотры, записанные в обход ``save()``,
+учитываются через ``add_views``.
+
+Если счётчики разошлись с данными (правки через ``QuerySet.update()``,
+загрузка фикстур), их пересчитывает ``manage.py recount_counters``.
+"""
+
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from accounts.models import Authors
+
+from .models import AudioContent, BaseContent, Category, TextContent, VideoContent
+
+# Модель материала -> префикс полей счётчиков автора
+CONTENT_COUNTERS = {
+    VideoContent: "videos",
+    AudioContent: "audios",
+    TextContent: "texts",
+}
+STATE_FIELDS = BaseContent.COUNTER_FIELDS
+
+
+def content_state(instance):
+    """Состояние материала для счётчиков: значения ``STATE_FIELDS``"""
+    return {field: getattr(instance, field) for field in STATE_FIELDS}
+
+
+def apply_content_change(model, old, new):
+    """
+    Применяет к счётчикам переход материала из состояния ``old`` в ``new``
+    (``None`` — материала не было или больше нет).
+    """
+    apply_content_changes(model, [(old, new)])
+
+
+def apply_content_changes(model, changes):
+    """
+    То же для списка переходов ``(old, new)``: разницы суммируются, и
+    каждый автор и категория обновляются одним запросом.
+    """
+    prefix = CONTENT_COUNTERS[model]
+    author_deltas = defaultdict(Counter)
+    category_deltas = Counter()
+
+    for old, new in changes:
+        for state, sign in ((old, -1), (new, 1)):
+            if state is None:
+                continue
+            published = state["status"] == "published"
+            if state["author_id"]:
+                deltas = author_deltas[state["author_id"]]
+                deltas[f"{prefix}_count"] += sign
+                deltas["total_views"] += sign * (state["views_count"] or 0)
+                if published:
+                    deltas[f"{prefix}_published"] += sign
+                    deltas["content_published"] += sign
+            if state["category_id"] and published:
+                category_deltas[state["category_id"]] += sign
+
+    for author_id, deltas in author_deltas.items():
+        increment_counters(Authors, author_id, deltas)
+    for category_id, delta in category_deltas.items():
+        increment_counters(Category, category_id, {"content_published": delta})
+
+
+def add_views(model, deltas):
+    """
+    Учитывает просмотры, уже записанные в ``views_count`` материалов
+    напрямую: ``deltas`` — ``{pk материала: прирост}``.
+    """
+    author_views = Counter()
+    rows = model.objects.filter(pk__in=deltas, author__isnull=False).values_list(
+        "pk", "author_id"
+    )
+    for pk, author_id in rows:
+        author_views[author_id] += deltas[pk]
+    for author_id, views in author_views.items():
+        increment_counters(Authors, author_id, {"total_views": views})
+
+
+def increment_counters(model, pk, deltas):
+    """Прибавляет ``{поле: разница}`` к счётчикам строки, не уходя ниже нуля"""
+    updates = {
+        field: Greatest(F(field) + delta, Value(0))
+        for field, delta in deltas.items()
+        if delta
+    }
+    if updates:
+        model.objects.filter(pk=pk).update(**updates)
+
+
+# ---------- Полный пересчёт ----------
+def _subquery(model, field, aggregate, **filters):
+    """Подзапрос агрегата по материалам, связанным с внешней строкой"""
+    queryset = (
+        model.objects.filter(**{field: OuterRef("pk")}, **filters)
+        .order_by()
+        .values(field)
+        .annotate(value=aggregate)
+        .values("value")
+    )
+    return Coalesce(Subquery(queryset, output_field=IntegerField()), Value(0))
+
+
+def recount_authors():
+    updates = {}
+    published_total = None
+    views_total = None
+    for model, prefix in CONTENT_COUNTERS.items():
+        updates[f"{prefix}_count"] = _subquery(model, "author", Count("pk"))
+        published = _subquery(model, "author", Count("pk"), status="published")
+        views = _subquery(model, "author", Sum("views_count"))
+        updates[f"{prefix}_published"] = published
+        published_total = (
+            published if published_total is None else published_total + published
+        )
+        views_total = views if views_total is None else views_total + views
+    updates["content_published"] = published_total
+    updates["total_views"] = views_total
+    return Authors.objects.update(**updates)
+
+
+def recount_categories():
+    total = None
+    for model in CONTENT_COUNTERS:
+        count = _subquery(model, "category", Count("pk"), status="published")
+        total = count if total is None else total + count
+    return Category.objects.update(content_published=total)
+
+
+def recount_courses():
+    from courses.models import Course, Lesson
+
+    return Course.objects.update(lessons_count=_subquery(Lesson, "course", Count("pk")))
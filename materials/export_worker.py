@@ -0,0 +1,175 @@
+"""Фоновый воркер, заранее рендерящий экспорт опубликованных статей.
+
+Задания берутся из таблицы ``ExportJob`` и выполняются в пуле процессов,
+размер которого ограничен ``EXPORT_WORKER_CONCURRENCY``, чтобы WeasyPrint
+не отнимал CPU у веб-воркеров. Неудачные задания повторяются с растущей
+паузой до ``EXPORT_JOB_MAX_ATTEMPTS`` раз. Выполненные задания удаляются
+через ``EXPORT_JOB_RETENTION`` дней.
+
+Пул создаёт дочерние процессы (fork) при отправке заданий, поэтому перед
+каждой отправкой родитель закрывает свои соединения с БД: унаследованное
+соединение дочерний процесс закрыл бы и для родителя. Если дочерний
+процесс погиб и пул сломался, его задания считаются неудачными, а пул
+создаётся заново.
+"""
+
+import logging
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .exports import EXPORT_FORMATS, get_base_url, get_export
+from .models import ExportJob
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_DELAY = 30  # секунд, удваивается с каждой попыткой
+PRUNE_INTERVAL = 60 * 60  # секунд между чистками выполненных заданий
+
+
+def get_concurrency():
+    return getattr(settings, "EXPORT_WORKER_CONCURRENCY", 2)
+
+
+def get_max_attempts():
+    return getattr(settings, "EXPORT_JOB_MAX_ATTEMPTS", 5)
+
+
+def get_retention():
+    return getattr(settings, "EXPORT_JOB_RETENTION", 7)
+
+
+def reset_stale_jobs():
+    """Возвращает в очередь задания, брошенные упавшим воркером"""
+    return ExportJob.objects.filter(status="running").update(status="pending")
+
+
+def claim_jobs(limit):
+    """Атомарно забирает до ``limit`` готовых к выполнению заданий"""
+    with transaction.atomic():
+        ids = list(
+            ExportJob.objects.filter(status="pending", run_after__lte=timezone.now())
+            .order_by("run_after")
+            .values_list("id", flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        ExportJob.objects.filter(id__in=ids, status="pending").update(
+            status="running", attempts=F("attempts") + 1
+        )
+    return ids
+
+
+def render_job(job_id):
+    """Выполняется в дочернем процессе: рендерит все форматы статьи"""
+    close_old_connections()
+    job = (
+        ExportJob.objects.select_related("text", "text__author__user")
+        .filter(pk=job_id)
+        .first()
+    )
+    if job is None:
+        # Статью удалили вместе с заданием
+        return
+    text = job.text
+    if text.status != "published":
+        return
+    for format in EXPORT_FORMATS:
+        get_export(text, format)
+
+
+def finish_job(job_id, error=None):
+    job = ExportJob.objects.filter(pk=job_id).first()
+    if job is None:
+        # Статью удалили, пока задание выполнялось
+        return
+    if error is None:
+        job.status = "done"
+        job.last_error = ""
+    elif job.attempts < get_max_attempts():
+        job.status = "pending"
+        job.last_error = error
+        delay = RETRY_BASE_DELAY * 2 ** (job.attempts - 1)
+        job.run_after = timezone.now() + timedelta(seconds=delay)
+    else:
+        job.status = "failed"
+        job.last_error = error
+    job.save(update_fields=["status", "last_error", "run_after", "updated_at"])
+
+
+def prune_jobs(now=None):
+    """Удаляет выполненные задания старше ``EXPORT_JOB_RETENTION`` дней"""
+    cutoff = (now or timezone.now()) - timedelta(days=get_retention())
+    deleted, _ = ExportJob.objects.filter(status="done", updated_at__lt=cutoff).delete()
+    return deleted
+
+
+def _init_child():
+    import django
+
+    # Нужно при запуске дочерних процессов через spawn (macOS, Windows)
+    django.setup()
+    # Рендер ниже по приоритету, чем обслуживание запросов
+    if hasattr(os, "nice"):
+        os.nice(10)
+
+
+def _new_pool(concurrency):
+    return ProcessPoolExecutor(max_workers=concurrency, initializer=_init_child)
+
+
+def run_worker(concurrency=None, poll_interval=5, once=False):
+    """
+    Основной цикл воркера. При ``once=True`` обрабатывает текущую очередь
+    и завершается.
+    """
+    concurrency = concurrency or get_concurrency()
+    # Ошибка настройки видна сразу, а не в каждом задании
+    get_base_url()
+    reset_stale_jobs()
+    pruned_at = None
+
+    pool = _new_pool(concurrency)
+    try:
+        while True:
+            job_ids = claim_jobs(concurrency)
+            if not job_ids:
+                if pruned_at is None or time.monotonic() - pruned_at > PRUNE_INTERVAL:
+                    prune_jobs()
+                    pruned_at = time.monotonic()
+                if once:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            # claim_jobs открыл соединение, а submit может породить процесс
+            connections.close_all()
+            futures = {job_id: pool.submit(render_job, job_id) for job_id in job_ids}
+            broken = False
+            for job_id, future in futures.items():
+                try:
+                    future.result()
+                except Exception as exc:
+                    broken = broken or isinstance(exc, BrokenProcessPool)
+                    error = traceback.format_exc()
+                    logger.warning("Export job %s failed:\n%s", job_id, error)
+                    finish_job(job_id, error)
+                else:
+                    finish_job(job_id)
+
+            if broken:
+                # Дочерний процесс убит (например, OOM при рендере PDF) —
+                # такой пул больше не принимает задания
+                logger.error("Export worker pool is broken, starting a new one")
+                pool.shutdown(wait=False)
+                pool = _new_pool(concurrency)
+    finally:
+        pool.shutdown()
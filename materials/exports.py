@@ -0,0 +1,279 @@
+"""Экспорт статей в TXT/PDF/EPUB с дисковым кэшем готовых файлов.
+
+Файлы лежат в ``EXPORT_CACHE_DIR`` (по умолчанию ``MEDIA_ROOT/exports``)
+и называются ``text-<pk>-<хеш ревизии>.<расширение>``. Хеш считается по
+заголовку, содержимому, ``updated_at`` и версии шаблонов экспорта, поэтому
+одна и та же ревизия статьи рендерится ровно один раз. Старые ревизии
+удаляются при сохранении статьи, а общий объём кэша ограничен
+``EXPORT_CACHE_MAX_BYTES`` (вытесняются давно не запрашивавшиеся файлы).
+"""
+
+import hashlib
+import io
+import os
+import re
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.template.loader import render_to_string
+from django.utils.html import escape
+
+try:
+    import fcntl
+except ImportError:  # Windows: остаётся только блокировка внутри процесса
+    fcntl = None
+
+from .reader import add_heading_anchors, split_sections
+
+# Увеличьте при изменении reader_pdf.html или структуры EPUB,
+# чтобы все ранее сохранённые файлы стали недействительными.
+EXPORT_TEMPLATE_VERSION = "2"
+
+EXPORT_FORMATS = {
+    "txt": "text/plain; charset=utf-8",
+    "pdf": "application/pdf",
+    "epub": "application/epub+zip",
+}
+
+_path_locks = {}
+_path_locks_guard = threading.Lock()
+
+
+def get_cache_dir():
+    return Path(
+        getattr(settings, "EXPORT_CACHE_DIR", Path(settings.MEDIA_ROOT) / "exports")
+    )
+
+
+def get_base_url():
+    """
+    Адрес сайта для ссылок на изображения в PDF, отрендеренном вне запроса
+    (воркером). Без DEBUG обязателен: иначе PDF молча выйдут без картинок.
+    """
+    base_url = getattr(settings, "EXPORT_BASE_URL", None)
+    if not base_url and not settings.DEBUG:
+        raise ImproperlyConfigured("EXPORT_BASE_URL must be set when DEBUG is off")
+    return base_url
+
+
+def revision_hash(text):
+    """Хеш ревизии статьи, от которого зависит содержимое экспорта"""
+    parts = [
+        EXPORT_TEMPLATE_VERSION,
+        text.title or "",
+        text.content or "",
+        text.updated_at.isoformat() if text.updated_at else "",
+    ]
+    digest = hashlib.sha1("\x00".join(parts).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def cache_path(text, format):
+    return get_cache_dir() / f"text-{text.pk}-{revision_hash(text)}.{format}"
+
+
+def get_export(text, format, base_url=None):
+    """
+    Возвращает путь к готовому файлу экспорта, создавая его при
+    необходимости. Повторные обращения к той же ревизии отдают файл с диска.
+    """
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {format}")
+
+    path = cache_path(text, format)
+    if _touch(path):
+        return path
+
+    with _render_lock(path):
+        # Пока мы ждали блокировку, файл мог отрендерить другой процесс
+        if _touch(path):
+            return path
+        data = _build(text, format, base_url)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp_path, path)
+
+    evict(keep=path)
+    return path
+
+
+def purge_stale_exports(text):
+    """Удаляет экспорты статьи, не совпадающие с её текущей ревизией"""
+    current = revision_hash(text) if text.pk else None
+    _purge(text.pk, keep_hash=current)
+
+
+def purge_exports(text_id):
+    _purge(text_id)
+
+
+def evict(max_bytes=None, keep=None):
+    """
+    Вытесняет самые давние файлы, пока кэш не уложится в лимит. Файл
+    ``keep`` (только что отданный) не трогается, даже если один больше лимита.
+    """
+    if max_bytes is None:
+        max_bytes = getattr(settings, "EXPORT_CACHE_MAX_BYTES", 512 * 1024 * 1024)
+    cache_dir = get_cache_dir()
+    if not cache_dir.is_dir():
+        return
+
+    entries = []
+    total = 0
+    for entry in os.scandir(cache_dir):
+        if not entry.is_file() or not entry.name.startswith("text-"):
+            continue
+        if keep is not None and entry.path == str(keep):
+            continue
+        stat = entry.stat()
+        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total += stat.st_size
+
+    if total <= max_bytes:
+        return
+    entries.sort()
+    for _mtime, size, file_path in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def _purge(text_id, keep_hash=None):
+    cache_dir = get_cache_dir()
+    if text_id is None or not cache_dir.is_dir():
+        return
+    prefix = f"text-{text_id}-"
+    for entry in os.scandir(cache_dir):
+        if not entry.name.startswith(prefix):
+            continue
+        file_hash = entry.name[len(prefix) :].split(".", 1)[0]
+        if keep_hash and file_hash == keep_hash:
+            continue
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+def _touch(path):
+    """Отмечает файл как недавно использованный (для LRU), если он есть"""
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+class _render_lock:
+    """
+    Блокировка рендера одного файла внутри процесса и между процессами.
+    Объекты блокировок и файлы ``.lock`` не удаляются, пока жив процесс:
+    иначе ждущий поток и пришедший после освобождения взяли бы разные
+    блокировки одного пути и отрендерили бы ревизию дважды.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock_file = None
+        with _path_locks_guard:
+            self.thread_lock = _path_locks.setdefault(str(path), threading.Lock())
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        if fcntl is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.lock_file = open(self.path.with_name(f".{self.path.name}.lock"), "w")
+            fcntl.flock(self.lock_file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.lock_file is not None:
+            fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+            self.lock_file.close()
+        self.thread_lock.release()
+
+
+# ---------- Построение файлов ----------
+def _build(text, format, base_url):
+    if format == "txt":
+        return _build_txt(text)
+    if format == "pdf":
+        return _build_pdf(text, base_url)
+    return _build_epub(text)
+
+
+def _build_txt(text):
+    clean = re.sub(r"<[^>]+>", "", text.content or "")
+    return clean.encode("utf-8")
+
+
+def _build_pdf(text, base_url):
+    from weasyprint import HTML
+
+    if base_url is None:
+        base_url = get_base_url()
+    # Якоря заголовков совпадают с оглавлением; WeasyPrint строит по ним закладки
+    html_str = render_to_string(
+        "materials/reader_pdf.html",
+        {"text": text, "content": add_heading_anchors(text.content)},
+    )
+    pdf_file = io.BytesIO()
+    HTML(string=html_str, base_url=base_url).write_pdf(pdf_file)
+    return pdf_file.getvalue()
+
+
+def _build_epub(text):
+    from ebooklib import epub
+
+    book = epub.EpubBook()
+    book.set_identifier(f"text-{text.id}")
+    book.set_title(text.title)
+    book.set_language("ru")
+    book.add_author(text.author.user.get_full_name() if text.author else "Unknown")
+
+    # Каждый раздел (h1/h2) — отдельная глава EPUB, h3 — подпункты оглавления
+    sections = split_sections(text.content) or [
+        {"title": "", "anchor": "", "content": "", "subheadings": []}
+    ]
+    chapters = []
+    toc = []
+    for index, section in enumerate(sections, start=1):
+        file_name = f"chapter-{index}.xhtml"
+        title = section["title"] or text.title
+        chapter = epub.EpubHtml(title=title, file_name=file_name, lang="ru")
+        chapter.content = section["content"]
+        if index == 1:
+            chapter.content = f"<h1>{escape(text.title)}</h1>{chapter.content}"
+        book.add_item(chapter)
+        chapters.append(chapter)
+
+        href = f"{file_name}#{section['anchor']}" if section["anchor"] else file_name
+        if section["subheadings"]:
+            toc.append(
+                (
+                    epub.Section(title, href=href),
+                    tuple(
+                        epub.Link(f"{file_name}#{anchor}", sub_title, anchor)
+                        for sub_title, anchor in section["subheadings"]
+                    ),
+                )
+            )
+        else:
+            toc.append(epub.Link(href, title, f"chapter-{index}"))
+
+    book.toc = tuple(toc)
+    book.add_item(epub.EpubNcx())
+    book.add_item(epub.EpubNav())
+    book.spine = ["nav", *chapters]
+
+    epub_data = io.BytesIO()
+    epub.write_epub(epub_data, book)
+    return epub_data.getvalue()
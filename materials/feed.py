@@ -0,0 +1,167 @@
+"""Общая лента видео, аудио и статей.
+
+Три таблицы материалов объединяются одним ``UNION ALL`` с общим набором
+колонок; строки ленты — лёгкие ``FeedItem`` без загрузки моделей.
+Страницы листаются по ключу (keyset): курсор хранит сортировочное поле,
+тип и id последней строки, и следующая страница начинается строго после
+неё. Так страница стоит одного запроса без ``OFFSET`` и ``COUNT(*)``,
+сколько бы материалов ни было до неё.
+"""
+
+from datetime import datetime
+from typing import NamedTuple
+
+from django.core.files.storage import default_storage
+from django.db.models import CharField, F, Q, Value
+from django.urls import reverse
+
+from .models import AudioContent, BaseContent, TextContent, VideoContent
+from .pagination import pack_cursor, parse_moment, unpack_cursor
+
+FEED_MODELS = {
+    "video": VideoContent,
+    "audio": AudioContent,
+    "text": TextContent,
+}
+# Колонка, отличающаяся у типов: код вставки видео или путь к аудиофайлу
+MEDIA_FIELDS = {
+    "video": "embed_code",
+    "audio": "audio_file",
+}
+COLUMNS = (
+    "id",
+    "title",
+    "slug",
+    "description",
+    "status",
+    "published_at",
+    "updated_at",
+    "views_count",
+    "author_id",
+    "category_id",
+)
+SORT_FIELDS = ("published_at", "updated_at")
+DETAIL_URLS = {
+    "video": "video_detail",
+    "audio": "audio_detail",
+    "text": "text_reader",
+}
+STATUS_LABELS = dict(BaseContent.STATUS_CHOICES)
+FEED_PAGE_SIZE = 12
+
+
+class FeedItem(NamedTuple):
+    """Строка ленты: общие поля материала и его тип"""
+
+    kind: str
+    id: int
+    title: str
+    slug: str
+    description: str
+    status: str
+    published_at: datetime
+    updated_at: datetime
+    views_count: int
+    author_id: int
+    category_id: int
+    media: str
+
+    def get_absolute_url(self):
+        return reverse(DETAIL_URLS[self.kind], kwargs={"slug": self.slug})
+
+    def get_status_display(self):
+        return STATUS_LABELS.get(self.status, self.status)
+
+    @property
+    def audio_url(self):
+        if self.kind == "audio" and self.media:
+            return default_storage.url(self.media)
+        return ""
+
+    @property
+    def embed_html(self):
+        return self.media if self.kind == "video" else ""
+
+
+class FeedPage(NamedTuple):
+    items: list
+    next_cursor: str
+
+
+def encode_cursor(item, sort_field="published_at"):
+    """Курсор, указывающий на позицию сразу после ``item``"""
+    return pack_cursor(getattr(item, sort_field).isoformat(), item.kind, item.id)
+
+
+def decode_cursor(token):
+    """``(значение сортировки, тип, id)`` или ``None`` для неверного курсора"""
+    parts = unpack_cursor(token, 3)
+    if parts is None:
+        return None
+    moment, kind, pk = parts
+    moment = parse_moment(moment)
+    if moment is None or kind not in FEED_MODELS or not pk.isdigit():
+        return None
+    return moment, kind, int(pk)
+
+
+def _after(kind, sort_field, cursor):
+    """Условие «строго после курсора» для таблицы одного типа"""
+    moment, cursor_kind, pk = cursor
+    # При равном значении сортировки порядок: тип, затем id — по убыванию
+    if kind < cursor_kind:
+        return Q(**{f"{sort_field}__lte": moment})
+    if kind > cursor_kind:
+        return Q(**{f"{sort_field}__lt": moment})
+    return Q(**{f"{sort_field}__lt": moment}) | Q(**{sort_field: moment, "pk__lt": pk})
+
+
+def feed_queryset(
+    kinds=None, sort_field="published_at", cursor=None, status="published", **filters
+):
+    """
+    ``UNION ALL`` по таблицам ``kinds`` (по умолчанию — все три),
+    отсортированный по убыванию ``sort_field``. ``filters`` применяются к
+    каждой таблице (``author=...``, ``category=...``); ``status=None``
+    снимает фильтр по статусу.
+    """
+    if sort_field not in SORT_FIELDS:
+        raise ValueError(f"Unsupported feed ordering: {sort_field}")
+    if status is not None:
+        filters["status"] = status
+
+    parts = []
+    for kind in kinds or FEED_MODELS:
+        queryset = FEED_MODELS[kind].objects.filter(
+            **filters, **{f"{sort_field}__isnull": False}
+        )
+        if cursor is not None:
+            queryset = queryset.filter(_after(kind, sort_field, cursor))
+        media = MEDIA_FIELDS.get(kind)
+        parts.append(
+            queryset.order_by()
+            .annotate(
+                kind=Value(kind, output_field=CharField()),
+                media=F(media) if media else Value("", output_field=CharField()),
+            )
+            .values(*COLUMNS, "kind", "media")
+        )
+
+    union = parts[0].union(*parts[1:], all=True) if len(parts) > 1 else parts[0]
+    return union.order_by(f"-{sort_field}", "-kind", "-id")
+
+
+def get_feed_page(limit=12, after=None, sort_field="published_at", **options):
+    """
+    Страница ленты после курсора ``after`` (строка из ``next_cursor``
+    предыдущей страницы). ``next_cursor`` пуст на последней странице.
+    """
+    cursor = decode_cursor(after)
+    rows = list(
+        feed_queryset(sort_field=sort_field, cursor=cursor, **options)[: limit + 1]
+    )
+    items = [FeedItem(**row) for row in rows[:limit]]
+    next_cursor = ""
+    if len(rows) > limit:
+        next_cursor = encode_cursor(items[-1], sort_field)
+    return FeedPage(items, next_cursor)
@@ -0,0 +1,182 @@
+"""Отложенный подсчёт просмотров и прослушиваний.
+
+``record_hit`` ничего не пишет в БД: он увеличивает счётчик в памяти
+процесса, если этот посетитель (пользователь, сессия или IP) не открывал
+материал последние ``HIT_DEDUPE_WINDOW`` секунд. Фоновый поток раз в
+``HIT_FLUSH_INTERVAL`` секунд (или при накоплении ``HIT_FLUSH_SIZE``
+материалов) применяет накопленное одним ``UPDATE ... SET views_count =
+views_count + CASE id WHEN ... END`` на таблицу, переносит просмотры в
+счётчики авторов (``materials.counters.add_views``) и в статистику по
+интервалам (``materials.stats``).
+
+Непереданные приросты теряются при аварийном завершении процесса —
+для статистики просмотров это допустимо; при штатной остановке буфер
+сбрасывается (``atexit``).
+"""
+
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, transaction
+from django.db.models import Case, F, Value, When
+
+from .counters import add_views
+from .stats import record_hits
+
+logger = logging.getLogger(__name__)
+
+# Сколько материалов обновлять одним запросом (лимит параметров SQLite)
+UPDATE_CHUNK_SIZE = 400
+
+_pending = defaultdict(Counter)  # (модель, поле) -> {pk: прирост}
+_seen = {}  # (метка модели, поле, pk, посетитель) -> когда забыть
+_lock = threading.Lock()
+_timer = None
+
+
+def get_flush_interval():
+    return getattr(settings, "HIT_FLUSH_INTERVAL", 10.0)
+
+
+def get_flush_size():
+    return getattr(settings, "HIT_FLUSH_SIZE", 500)
+
+
+def get_dedupe_window():
+    return getattr(settings, "HIT_DEDUPE_WINDOW", 30 * 60)
+
+
+def get_seen_limit():
+    return getattr(settings, "HIT_DEDUPE_MAX_ENTRIES", 100_000)
+
+
+def get_client_ip_header():
+    return getattr(settings, "CLIENT_IP_HEADER", None)
+
+
+def client_ip(request):
+    """
+    Адрес посетителя: из ``CLIENT_IP_HEADER`` (его ставит обратный прокси;
+    в ``X-Forwarded-For`` берётся последний адрес — добавленный нашим
+    прокси), иначе ``REMOTE_ADDR``.
+    """
+    header = get_client_ip_header()
+    if header:
+        value = request.META.get(header, "").split(",")[-1].strip()
+        if value:
+            return value
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def visitor_key(request):
+    """Кто смотрит: пользователь, иначе сессия, иначе IP-адрес"""
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return f"u{user.pk}"
+    session = getattr(request, "session", None)
+    if session is not None and session.session_key:
+        return f"s{session.session_key}"
+    return f"ip{client_ip(request)}"
+
+
+def record_hit(request, obj, field="views_count"):
+    """
+    Учитывает просмотр (или прослушивание — ``field="listens_count"``)
+    материала ``obj``. Возвращает ``False`` для повторного обращения того
+    же посетителя в пределах окна.
+    """
+    model = type(obj)
+    key = (model._meta.label, field, obj.pk, visitor_key(request))
+    now = time.monotonic()
+    with _lock:
+        expires = _seen.get(key)
+        if expires is not None and expires > now:
+            return False
+        _seen[key] = now + get_dedupe_window()
+        _pending[(model, field)][obj.pk] += 1
+        pending = sum(len(counts) for counts in _pending.values())
+        _schedule(0 if pending >= get_flush_size() else get_flush_interval())
+    return True
+
+
+def _schedule(delay):
+    """Планирует сброс буфера; вызывается под ``_lock``"""
+    global _timer
+    if _timer is not None:
+        if delay or _timer.interval == 0:
+            return
+        _timer.cancel()
+    _timer = threading.Timer(delay, _flush_in_background)
+    _timer.daemon = True
+    _timer.start()
+
+
+def _flush_in_background():
+    global _timer
+    with _lock:
+        _timer = None
+    try:
+        flush()
+    except DatabaseError:
+        logger.exception("Failed to flush content hits")
+    finally:
+        close_old_connections()
+
+
+def flush():
+    """Записывает накопленные приросты. Возвращает число обновлённых материалов"""
+    global _pending
+    with _lock:
+        pending, _pending = _pending, defaultdict(Counter)
+        _forget_expired()
+    if not pending:
+        return 0
+
+    updated = 0
+    groups = list(pending.items())
+    for index, ((model, field), counts) in enumerate(groups):
+        try:
+            with transaction.atomic():
+                _apply(model, field, counts)
+        except DatabaseError:
+            # Возвращаем неприменённые приросты в буфер и пробуем позже
+            with _lock:
+                for key, rest in groups[index:]:
+                    _pending[key].update(rest)
+                _schedule(get_flush_interval())
+            raise
+        updated += len(counts)
+    return updated
+
+
+def _apply(model, field, counts):
+    items = list(counts.items())
+    for start in range(0, len(items), UPDATE_CHUNK_SIZE):
+        chunk = items[start : start + UPDATE_CHUNK_SIZE]
+        increment = Case(
+            *(When(pk=pk, then=Value(delta)) for pk, delta in chunk),
+            default=Value(0),
+        )
+        model.objects.filter(pk__in=[pk for pk, _delta in chunk]).update(
+            **{field: F(field) + increment}
+        )
+    if field == "views_count":
+        add_views(model, counts)
+    record_hits(model, field, counts)
+
+
+def _forget_expired():
+    """Чистит окно дедупликации; вызывается под ``_lock``"""
+    now = time.monotonic()
+    for key in [key for key, expires in _seen.items() if expires <= now]:
+        del _seen[key]
+    if len(_seen) > get_seen_limit():
+        # Слишком много посетителей — лучше посчитать повтор, чем исчерпать память
+        _seen.clear()
+
+
+atexit.register(flush)
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from materials.stats import compact
+
+
+class Command(BaseCommand):
+    help = (
+        "Удаляет устаревшую почасовую статистику и сворачивает устаревшую "
+        "дневную в недельную и месячную (запускать раз в сутки)"
+    )
+
+    def handle(self, *args, **options):
+        deleted = compact()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Removed {deleted['hour']} hourly rows, "
+                f"rolled up {deleted['day']} daily rows"
+            )
+        )
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from materials.counters import recount_authors, recount_categories, recount_courses
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает счётчики авторов (материалы, публикации, просмотры), "
+        "категорий и курсов по фактическим данным"
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            authors = recount_authors()
+            categories = recount_categories()
+            courses = recount_courses()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Recounted {authors} authors, {categories} categories, "
+                f"{courses} courses"
+            )
+        )
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from materials.export_worker import get_concurrency, run_worker
+
+
+class Command(BaseCommand):
+    help = "Запускает фоновый воркер, рендерящий PDF/EPUB опубликованных статей"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=None,
+            help="Число процессов рендера (по умолчанию EXPORT_WORKER_CONCURRENCY)",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=5,
+            help="Пауза между опросами пустой очереди, секунд",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Обработать текущую очередь и завершиться",
+        )
+
+    def handle(self, *args, **options):
+        concurrency = options["concurrency"] or get_concurrency()
+        self.stdout.write(f"Export worker started ({concurrency} processes)")
+        run_worker(
+            concurrency=concurrency,
+            poll_interval=options["poll_interval"],
+            once=options["once"],
+        )
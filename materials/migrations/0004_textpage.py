@@ -0,0 +1,50 @@
+# Generated by Django 5.2.8 on 2026-10-17 01:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_pages(apps, schema_editor):
+    # Страницы — производные данные: их строит текущий materials.reader
+    from materials.reader import build_structure
+
+    TextContent = apps.get_model("materials", "TextContent")
+    TextPage = apps.get_model("materials", "TextPage")
+    for text in TextContent.objects.iterator():
+        pages, _headings = build_structure(text.content)
+        TextPage.objects.bulk_create(
+            TextPage(text=text, number=number, content=content)
+            for number, content in enumerate(pages, start=1)
+        )
+        TextContent.objects.filter(pk=text.pk).update(page_count=len(pages))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0003_exportjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='textcontent',
+            name='page_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Страниц в читалке'),
+        ),
+        migrations.CreateModel(
+            name='TextPage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField(verbose_name='Номер страницы')),
+                ('content', models.TextField(verbose_name='HTML страницы')),
+                ('text', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pages', to='materials.textcontent', verbose_name='Статья')),
+            ],
+            options={
+                'verbose_name': 'Страница статьи',
+                'verbose_name_plural': 'Страницы статей',
+                'ordering': ['text', 'number'],
+                'unique_together': {('text', 'number')},
+            },
+        ),
+        migrations.RunPython(build_pages, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.8 on 2026-10-17 01:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def rebuild_reader_structure(apps, schema_editor):
+    # Как в 0004: структура статьи строится текущим разбором
+    from materials.reader import build_structure
+
+    TextContent = apps.get_model("materials", "TextContent")
+    TextPage = apps.get_model("materials", "TextPage")
+    TextHeading = apps.get_model("materials", "TextHeading")
+    for text in TextContent.objects.iterator():
+        pages, headings = build_structure(text.content)
+        TextPage.objects.filter(text=text).delete()
+        TextPage.objects.bulk_create(
+            TextPage(text=text, number=number, content=content)
+            for number, content in enumerate(pages, start=1)
+        )
+        TextHeading.objects.bulk_create(
+            TextHeading(text=text, position=position, **heading)
+            for position, heading in enumerate(headings, start=1)
+        )
+        TextContent.objects.filter(pk=text.pk).update(page_count=len(pages))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0004_textpage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TextHeading',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField(verbose_name='Порядковый номер')),
+                ('level', models.PositiveSmallIntegerField(verbose_name='Уровень')),
+                ('title', models.CharField(max_length=300, verbose_name='Заголовок')),
+                ('anchor', models.CharField(max_length=100, verbose_name='Якорь')),
+                ('offset', models.PositiveIntegerField(verbose_name='Позиция в тексте')),
+                ('page_number', models.PositiveIntegerField(verbose_name='Страница')),
+                ('text', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='headings', to='materials.textcontent', verbose_name='Статья')),
+            ],
+            options={
+                'verbose_name': 'Заголовок статьи',
+                'verbose_name_plural': 'Оглавление статей',
+                'ordering': ['text', 'position'],
+                'unique_together': {('text', 'position')},
+            },
+        ),
+        migrations.RunPython(rebuild_reader_structure, migrations.RunPython.noop),
+    ]
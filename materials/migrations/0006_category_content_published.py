@@ -0,0 +1,72 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:05
+
+from collections import Counter, defaultdict
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def fill_counters(apps, schema_editor):
+    Authors = apps.get_model("accounts", "Authors")
+    Category = apps.get_model("materials", "Category")
+    Course = apps.get_model("courses", "Course")
+    Lesson = apps.get_model("courses", "Lesson")
+
+    authors = defaultdict(Counter)
+    categories = Counter()
+    for prefix, model_name in (
+        ("videos", "VideoContent"),
+        ("audios", "AudioContent"),
+        ("texts", "TextContent"),
+    ):
+        model = apps.get_model("materials", model_name)
+        rows = (
+            model.objects.filter(author__isnull=False)
+            .values("author")
+            .annotate(
+                total=Count("pk"),
+                published=Count("pk", filter=Q(status="published")),
+                views=Sum("views_count"),
+            )
+            .order_by()
+        )
+        for row in rows:
+            counters = authors[row["author"]]
+            counters[f"{prefix}_count"] = row["total"]
+            counters[f"{prefix}_published"] = row["published"]
+            counters["content_published"] += row["published"]
+            counters["total_views"] += row["views"] or 0
+        rows = (
+            model.objects.filter(category__isnull=False, status="published")
+            .values("category")
+            .annotate(total=Count("pk"))
+            .order_by()
+        )
+        for row in rows:
+            categories[row["category"]] += row["total"]
+
+    for author_id, counters in authors.items():
+        Authors.objects.filter(pk=author_id).update(**counters)
+    for category_id, total in categories.items():
+        Category.objects.filter(pk=category_id).update(content_published=total)
+    rows = Lesson.objects.values("course").annotate(total=Count("pk")).order_by()
+    for row in rows:
+        Course.objects.filter(pk=row["course"]).update(lessons_count=row["total"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_authors_content_counters'),
+        ('courses', '0002_course_lessons_count'),
+        ('materials', '0005_textheading'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='content_published',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Опубликованных материалов'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_authors_content_counters'),
+        ('materials', '0006_category_content_published'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_type', models.CharField(choices=[('video', 'Видео'), ('audio', 'Аудио'), ('text', 'Статья'), ('all', 'Все материалы автора')], max_length=10, verbose_name='Тип материала')),
+                ('object_id', models.PositiveIntegerField(verbose_name='ID материала')),
+                ('metric', models.CharField(choices=[('views', 'Просмотры'), ('listens', 'Прослушивания')], max_length=10, verbose_name='Показатель')),
+                ('period', models.CharField(choices=[('hour', 'Час'), ('day', 'День'), ('week', 'Неделя'), ('month', 'Месяц')], max_length=10, verbose_name='Интервал')),
+                ('bucket', models.DateTimeField(verbose_name='Начало интервала')),
+                ('value', models.PositiveIntegerField(default=0, verbose_name='Значение')),
+                ('author', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='content_stats', to='accounts.authors', verbose_name='Автор')),
+            ],
+            options={
+                'verbose_name': 'Статистика материала',
+                'verbose_name_plural': 'Статистика материалов',
+                'ordering': ['bucket'],
+                'indexes': [models.Index(fields=['author', 'metric', 'period', 'bucket'], name='materials_c_author__0dab67_idx'), models.Index(fields=['period', 'bucket'], name='materials_c_period_da0305_idx')],
+                'constraints': [models.UniqueConstraint(fields=('content_type', 'object_id', 'metric', 'period', 'bucket'), name='unique_content_stat_bucket')],
+            },
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_authors_content_counters'),
+        ('materials', '0007_contentstat'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='audiocontent',
+            index=models.Index(fields=['status', '-published_at', '-id'], name='audio_status_pub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='audiocontent',
+            index=models.Index(condition=models.Q(('status', 'published')), fields=['category', '-published_at', '-id'], name='audio_category_pub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='audiocontent',
+            index=models.Index(condition=models.Q(('status', 'published')), fields=['author', '-published_at', '-id'], name='audio_author_pub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='audiocontent',
+            index=models.Index(fields=['author', '-updated_at', '-id'], name='audio_author_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='textcontent',
+            index=models.Index(fields=['status', '-published_at', '-id'], name='text_status_pub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='textcontent',
+            index=models.Index(condition=models.Q(('status', 'published')), fields=['category', '-published_at', '-id'], name='text_category_pub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='textcontent',
+            index=models.Index(condition=models.Q(('status', 'published')), fields=['author', '-published_at', '-id'], name='text_author_pub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='textcontent',
+            index=models.Index(fields=['author', '-updated_at', '-id'], name='text_author_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='videocontent',
+            index=models.Index(fields=['status', '-published_at', '-id'], name='video_status_pub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='videocontent',
+            index=models.Index(condition=models.Q(('status', 'published')), fields=['category', '-published_at', '-id'], name='video_category_pub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='videocontent',
+            index=models.Index(condition=models.Q(('status', 'published')), fields=['author', '-published_at', '-id'], name='video_author_pub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='videocontent',
+            index=models.Index(fields=['author', '-updated_at', '-id'], name='video_author_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:47
+
+from django.db import migrations
+from django.db.models import F
+
+
+def rekey_author_totals(apps, schema_editor):
+    # Итоги автора хранились с object_id=0 и общим для всех авторов ключом;
+    # теперь object_id — id автора
+    ContentStat = apps.get_model("materials", "ContentStat")
+    ContentStat.objects.filter(
+        content_type="all", object_id=0, author__isnull=False
+    ).update(object_id=F("author_id"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0009_scheduled_status'),
+    ]
+
+    operations = [
+        migrations.RunPython(rekey_author_totals, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,9 @@
 import pytils.translit
 
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.text import slugify
 from accounts.models import Authors
 from jamig_site import settings
@@ -13,6 +15,9 @@ class Category(models.Model):
     description = models.TextField(blank=True, verbose_name="Описание")
     order = models.PositiveIntegerField(default=0, verbose_name="Порядок сортировки")
     is_active = models.BooleanField(default=True, verbose_name="Активная")
+    content_published = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Опубликованных материалов"
+    )
 
     class Meta:
         verbose_name = "Категория"
@@ -23,11 +28,40 @@ class Category(models.Model):
         return self.title
 
 
+def content_indexes(prefix):
+    """
+    Индексы таблицы материалов под её запросы: публичные списки и ленты
+    (опубликованные по дате публикации, в том числе внутри категории и
+    автора) и списки студии (материалы автора по дате изменения).
+    """
+    published = models.Q(status="published")
+    return [
+        # Не частичный: по нему же считается COUNT(*) опубликованных
+        models.Index(
+            fields=["status", "-published_at", "-id"], name=f"{prefix}_status_pub_idx"
+        ),
+        models.Index(
+            fields=["category", "-published_at", "-id"],
+            condition=published,
+            name=f"{prefix}_category_pub_idx",
+        ),
+        models.Index(
+            fields=["author", "-published_at", "-id"],
+            condition=published,
+            name=f"{prefix}_author_pub_idx",
+        ),
+        models.Index(
+            fields=["author", "-updated_at", "-id"], name=f"{prefix}_author_updated_idx"
+        ),
+    ]
+
+
 class BaseContent(models.Model):
     """Абстрактная базовая модель для всего контента"""
 
     STATUS_CHOICES = [
         ("draft", "Черновик"),
+        ("scheduled", "Запланировано"),
         ("published", "Опубликовано"),
         ("archived", "В архиве"),
     ]
@@ -57,10 +91,34 @@ class BaseContent(models.Model):
         null=True, blank=True, verbose_name="Дата публикации"
     )
 
+    # Поля, от которых зависят счётчики автора и категории (materials.counters)
+    COUNTER_FIELDS = ("status", "author_id", "category_id", "views_count")
+    # Счётчики обращений: их меняет только materials.hits (UPDATE ... + F()),
+    # поэтому сохранение существующего материала их не перезаписывает
+    HIT_FIELDS = ("views_count",)
+    # Значения COUNTER_FIELDS на момент загрузки из БД
+    _loaded_state = None
+
     class Meta:
         abstract = True
         ordering = ["-published_at", "-created_at"]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        loaded = instance.__dict__
+        if all(field in loaded for field in cls.COUNTER_FIELDS):
+            instance._loaded_state = {
+                field: loaded[field] for field in cls.COUNTER_FIELDS
+            }
+        return instance
+
+    def clean(self):
+        super().clean()
+        if self.status == "scheduled" and not self.published_at:
+            raise ValidationError(
+                {"published_at": "Укажите дату, на которую запланирована публикация."}
+            )
 
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -76,12 +134,32 @@ class BaseContent(models.Model):
 
                 self.slug = f"bez-nazvaniya-{get_random_string(6)}"
 
-        if self.status == "published" and not self.published_at:
+        if self.status == "published":
             from django.utils import timezone
 
-            self.published_at = timezone.now()
-
-        super().save(*args, **kwargs)
+            if not self.published_at:
+                self.published_at = timezone.now()
+            elif self.published_at > timezone.now():
+                # Дата в будущем — опубликует manage.py publish_scheduled
+                self.status = "scheduled"
+
+        if (
+            not self._state.adding
+            and not args
+            and kwargs.get("update_fields") is None
+            and not kwargs.get("force_insert")
+        ):
+            # В памяти значение счётчика могло устареть, пока копились
+            # и применялись просмотры
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.HIT_FIELDS
+            ]
+
+        # Счётчики обновляются сигналами в той же транзакции
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
 
 
 class VideoContent(BaseContent):
@@ -125,6 +203,7 @@ class VideoContent(BaseContent):
     class Meta:
         verbose_name = "Видео"
         verbose_name_plural = "Видео"
+        indexes = content_indexes("video")
 
 
 class AudioContent(BaseContent):
@@ -148,6 +227,8 @@ class AudioContent(BaseContent):
         default=0, verbose_name="Количество прослушиваний"
     )
 
+    HIT_FIELDS = ("views_count", "listens_count")
+
     def get_absolute_url(self):
         return reverse("audio_detail", kwargs={"slug": self.slug})
 
@@ -172,6 +253,7 @@ class AudioContent(BaseContent):
     class Meta:
         verbose_name = "Аудио"
         verbose_name_plural = "Аудио"
+        indexes = content_indexes("audio")
 
 
 class TextContent(BaseContent):
@@ -188,6 +270,19 @@ class TextContent(BaseContent):
         verbose_name="Время чтения (минуты)",
         help_text="Примерное время чтения статьи в минутах",
     )
+    page_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Страниц в читалке"
+    )
+
+    # Содержимое на момент загрузки из БД: страницы пересобираются,
+    # только если оно изменилось
+    _loaded_content = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_content = instance.__dict__.get("content")
+        return instance
 
     def save(self, *args, **kwargs):
         # Автоматически рассчитываем время чтения если не указано
@@ -196,8 +291,48 @@ class TextContent(BaseContent):
             word_count = len(self.content.split())
             self.reading_time = max(1, word_count // 200)
 
+        from .reader import build_structure
+
+        pages = None
+        if self._state.adding or self.content != self._loaded_content:
+            pages, headings = build_structure(self.content)
+            self.page_count = len(pages)
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "page_count"}
+
         super().save(*args, **kwargs)
 
+        if pages is not None:
+            self.pages.all().delete()
+            TextPage.objects.bulk_create(
+                TextPage(text=self, number=number, content=content)
+                for number, content in enumerate(pages, start=1)
+            )
+            self.headings.all().delete()
+            TextHeading.objects.bulk_create(
+                TextHeading(text=self, position=position, **heading)
+                for position, heading in enumerate(headings, start=1)
+            )
+            self._loaded_content = self.content
+
+        # Файлы экспорта прошлых ревизий больше не понадобятся
+        from .exports import purge_stale_exports
+
+        purge_stale_exports(self)
+
+        # Опубликованную ревизию заранее рендерит фоновый воркер
+        if self.status == "published":
+            ExportJob.enqueue(self)
+
+    def delete(self, *args, **kwargs):
+        from .exports import purge_exports
+
+        text_id = self.pk
+        result = super().delete(*args, **kwargs)
+        purge_exports(text_id)
+        return result
+
     def get_absolute_url(self):
         return reverse(
             "text_reader", kwargs={"slug": self.slug}
@@ -206,6 +341,55 @@ class TextContent(BaseContent):
     class Meta:
         verbose_name = "Текстовая статья"
         verbose_name_plural = "Текстовые статьи"
+        indexes = content_indexes("text")
+
+
+class TextPage(models.Model):
+    """Страница статьи для читалки (см. materials.reader)"""
+
+    text = models.ForeignKey(
+        TextContent,
+        on_delete=models.CASCADE,
+        related_name="pages",
+        verbose_name="Статья",
+    )
+    number = models.PositiveIntegerField(verbose_name="Номер страницы")
+    content = models.TextField(verbose_name="HTML страницы")
+
+    class Meta:
+        verbose_name = "Страница статьи"
+        verbose_name_plural = "Страницы статей"
+        ordering = ["text", "number"]
+        unique_together = ("text", "number")
+
+    def __str__(self):
+        return f"{self.text.title} — стр. {self.number}"
+
+
+class TextHeading(models.Model):
+    """Заголовок статьи в оглавлении (см. materials.reader)"""
+
+    text = models.ForeignKey(
+        TextContent,
+        on_delete=models.CASCADE,
+        related_name="headings",
+        verbose_name="Статья",
+    )
+    position = models.PositiveIntegerField(verbose_name="Порядковый номер")
+    level = models.PositiveSmallIntegerField(verbose_name="Уровень")
+    title = models.CharField(max_length=300, verbose_name="Заголовок")
+    anchor = models.CharField(max_length=100, verbose_name="Якорь")
+    offset = models.PositiveIntegerField(verbose_name="Позиция в тексте")
+    page_number = models.PositiveIntegerField(verbose_name="Страница")
+
+    class Meta:
+        verbose_name = "Заголовок статьи"
+        verbose_name_plural = "Оглавление статей"
+        ordering = ["text", "position"]
+        unique_together = ("text", "position")
+
+    def __str__(self):
+        return f"{self.text.title} — {self.title}"
 
 
 class ReadingProgress(models.Model):
@@ -229,3 +413,124 @@ class ReadingProgress(models.Model):
 
     def __str__(self):
         return f"{self.user} — {self.text.title} (стр. {self.page_number})"
+
+
+class ExportJob(models.Model):
+    """Задание фоновому воркеру на подготовку файлов экспорта статьи"""
+
+    STATUS_CHOICES = [
+        ("pending", "В очереди"),
+        ("running", "Выполняется"),
+        ("done", "Готово"),
+        ("failed", "Ошибка"),
+    ]
+
+    text = models.ForeignKey(
+        TextContent,
+        on_delete=models.CASCADE,
+        related_name="export_jobs",
+        verbose_name="Статья",
+    )
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default="pending", verbose_name="Статус"
+    )
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Попыток")
+    last_error = models.TextField(blank=True, verbose_name="Последняя ошибка")
+    run_after = models.DateTimeField(default=timezone.now, verbose_name="Не раньше чем")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
+
+    class Meta:
+        verbose_name = "Задание экспорта"
+        verbose_name_plural = "Задания экспорта"
+        ordering = ["run_after"]
+        indexes = [models.Index(fields=["status", "run_after"])]
+
+    def __str__(self):
+        return f"{self.text.title} — {self.get_status_display()}"
+
+    @classmethod
+    def enqueue(cls, text):
+        """Ставит статью в очередь, если для неё ещё нет ожидающего задания"""
+        job = cls.objects.filter(text=text, status="pending").first()
+        if job is None:
+            job = cls.objects.create(text=text)
+        return job
+
+    @classmethod
+    def enqueue_many(cls, text_ids):
+        """``enqueue`` для многих статей: один запрос проверки и одна вставка"""
+        text_ids = set(text_ids)
+        queued = cls.objects.filter(text_id__in=text_ids, status="pending").values_list(
+            "text_id", flat=True
+        )
+        missing = text_ids.difference(queued)
+        return cls.objects.bulk_create(cls(text_id=pk) for pk in sorted(missing))
+
+
+class ContentStat(models.Model):
+    """
+    Число просмотров или прослушиваний за интервал времени.
+
+    Строки с ``content_type="all"`` — итог по всем материалам автора
+    (``object_id`` — id автора); из них строится график в студии.
+    """
+
+    CONTENT_TYPE_CHOICES = [
+        ("video", "Видео"),
+        ("audio", "Аудио"),
+        ("text", "Статья"),
+        ("all", "Все материалы автора"),
+    ]
+    METRIC_CHOICES = [
+        ("views", "Просмотры"),
+        ("listens", "Прослушивания"),
+    ]
+    PERIOD_CHOICES = [
+        ("hour", "Час"),
+        ("day", "День"),
+        ("week", "Неделя"),
+        ("month", "Месяц"),
+    ]
+
+    author = models.ForeignKey(
+        Authors,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="content_stats",
+        verbose_name="Автор",
+    )
+    content_type = models.CharField(
+        max_length=10, choices=CONTENT_TYPE_CHOICES, verbose_name="Тип материала"
+    )
+    object_id = models.PositiveIntegerField(verbose_name="ID материала")
+    metric = models.CharField(
+        max_length=10, choices=METRIC_CHOICES, verbose_name="Показатель"
+    )
+    period = models.CharField(
+        max_length=10, choices=PERIOD_CHOICES, verbose_name="Интервал"
+    )
+    bucket = models.DateTimeField(verbose_name="Начало интервала")
+    value = models.PositiveIntegerField(default=0, verbose_name="Значение")
+
+    class Meta:
+        verbose_name = "Статистика материала"
+        verbose_name_plural = "Статистика материалов"
+        ordering = ["bucket"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["content_type", "object_id", "metric", "period", "bucket"],
+                name="unique_content_stat_bucket",
+            )
+        ]
+        indexes = [
+            models.Index(fields=["author", "metric", "period", "bucket"]),
+            models.Index(fields=["period", "bucket"]),
+        ]
+
+    def __str__(self):
+        return (
+            f"{self.get_content_type_display()} #{self.object_id} — "
+            f"{self.get_metric_display()} за {self.bucket:%Y-%m-%d %H:%M}: {self.value}"
+        )
@@ -0,0 +1,136 @@
+"""Постраничный вывод по ключу (keyset) вместо ``OFFSET``.
+
+Страница выбирается условием «строго после последней строки предыдущей
+страницы» по паре ``(поле сортировки, id)``, которую хранит курсор в
+адресе (``?after=...``). Запрос одинаково дёшев для первой и тысячной
+страницы и опирается на составной индекс ``(..., поле, id)``. Точное
+число строк не нужно для навигации; если его показывают, оно берётся из
+кэша (``cached_count``).
+"""
+
+import base64
+import hashlib
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+COUNT_KEY = "count:{digest}"
+
+
+def get_count_timeout():
+    return getattr(settings, "PAGINATION_COUNT_TIMEOUT", 300)
+
+
+def pack_cursor(*parts):
+    raw = "|".join(str(part) for part in parts)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def unpack_cursor(token, size):
+    """Части курсора или ``None``, если курсор испорчен"""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+    except (ValueError, UnicodeDecodeError):
+        return None
+    parts = raw.split("|")
+    return parts if len(parts) == size else None
+
+
+def parse_moment(value):
+    """Момент времени из курсора; ``None`` для неверного значения"""
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    return moment if moment.tzinfo is not None else None
+
+
+class CursorPage:
+    """Страница: строки, курсор следующей страницы и признак первой"""
+
+    def __init__(self, object_list, next_cursor, is_first, total=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.is_first = is_first
+        self.total = total
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return bool(self.next_cursor)
+
+    def has_other_pages(self):
+        return self.has_next() or not self.is_first
+
+
+def cursor_paginate(queryset, after, per_page, field="published_at"):
+    """
+    Страница ``queryset`` по убыванию ``(field, id)`` после курсора ``after``.
+    Строки с пустым ``field`` в выдачу не попадают.
+    """
+    queryset = queryset.filter(**{f"{field}__isnull": False}).order_by(
+        f"-{field}", "-pk"
+    )
+    cursor = unpack_cursor(after, 2)
+    moment = parse_moment(cursor[0]) if cursor else None
+    is_first = True
+    if moment is not None and cursor[1].isdigit():
+        queryset = queryset.filter(
+            Q(**{f"{field}__lt": moment}) | Q(**{field: moment, "pk__lt": cursor[1]})
+        )
+        is_first = False
+
+    rows = list(queryset[: per_page + 1])
+    object_list = rows[:per_page]
+    next_cursor = ""
+    if len(rows) > per_page:
+        last = object_list[-1]
+        next_cursor = pack_cursor(getattr(last, field).isoformat(), last.pk)
+    return CursorPage(object_list, next_cursor, is_first)
+
+
+def cached_count(queryset, timeout=None):
+    """
+    Число строк ``queryset``, сохранённое в кэше на ``timeout`` секунд
+    (по умолчанию ``PAGINATION_COUNT_TIMEOUT``): приблизительно, зато
+    ``COUNT(*)`` выполняется не на каждой странице.
+    """
+    sql, params = queryset.order_by().query.sql_with_params()
+    digest = hashlib.sha1(f"{sql}{params}".encode("utf-8")).hexdigest()
+    key = COUNT_KEY.format(digest=digest)
+    total = cache.get(key)
+    if total is None:
+        total = queryset.count()
+        cache.set(key, total, get_count_timeout() if timeout is None else timeout)
+    return total
+
+
+class CursorPaginationMixin:
+    """
+    Для ``ListView``: вместо ``Paginator`` страница по курсору ``?after=``.
+    В контексте ``page_obj`` — ``CursorPage``; ``paginator`` — ``None``.
+    ``count_total = True`` добавляет ``page_obj.total`` из кэша.
+    """
+
+    cursor_field = "published_at"
+    cursor_param = "after"
+    count_total = False
+
+    def paginate_queryset(self, queryset, page_size):
+        page = cursor_paginate(
+            queryset,
+            self.request.GET.get(self.cursor_param),
+            page_size,
+            self.cursor_field,
+        )
+        if self.count_total:
+            page.total = cached_count(queryset)
+        return None, page, page.object_list, page.has_other_pages()
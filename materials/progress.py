@@ -0,0 +1,184 @@
+"""Отложенная пакетная запись прогресса чтения.
+
+Каждый перелистнутый лист раньше означал отдельную транзакцию с
+``update_or_create``. Теперь ``record_progress`` только кладёт номер страницы
+в буфер процесса (последнее значение для пары пользователь/статья побеждает),
+а фоновый поток раз в ``READING_PROGRESS_FLUSH_INTERVAL`` секунд или при
+накоплении ``READING_PROGRESS_FLUSH_SIZE`` записей сохраняет всё одним
+``bulk_create(update_conflicts=True)``. Запросов к БД из потока запроса нет.
+
+Прогресс, накопленный офлайн, приходит пачкой через ``merge_offline_progress``:
+записи с меткой времени клиента применяются одним ``INSERT ... ON CONFLICT``,
+который обновляет строку, только если запись новее ``updated_at``.
+"""
+
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection
+from django.utils import timezone
+
+from .models import ReadingProgress, TextContent
+
+logger = logging.getLogger(__name__)
+
+_buffer = {}  # (user_id, text_id) -> (page_number, время записи)
+_lock = threading.Lock()
+_timer = None
+
+
+def get_flush_interval():
+    return getattr(settings, "READING_PROGRESS_FLUSH_INTERVAL", 2.0)
+
+
+def get_flush_size():
+    return getattr(settings, "READING_PROGRESS_FLUSH_SIZE", 200)
+
+
+def record_progress(user_id, text_id, page_number):
+    """Запоминает прогресс; запись в БД произойдёт в фоновом потоке"""
+    with _lock:
+        _buffer[(user_id, text_id)] = (page_number, timezone.now())
+        immediate = len(_buffer) >= get_flush_size()
+        _schedule(0 if immediate else get_flush_interval())
+
+
+def pending_page(user_id, text_id):
+    """Номер страницы, ещё не сохранённый в БД, или ``None``"""
+    with _lock:
+        entry = _buffer.get((user_id, text_id))
+    return entry[0] if entry else None
+
+
+def _schedule(delay):
+    """Планирует сброс буфера; вызывается под ``_lock``"""
+    global _timer
+    if _timer is not None:
+        if delay or _timer.interval == 0:
+            return
+        _timer.cancel()
+    _timer = threading.Timer(delay, _flush_in_background)
+    _timer.daemon = True
+    _timer.start()
+
+
+def _flush_in_background():
+    global _timer
+    with _lock:
+        _timer = None
+    try:
+        flush()
+    except DatabaseError:
+        logger.exception("Failed to flush reading progress")
+    finally:
+        close_old_connections()
+
+
+def flush():
+    """Сохраняет накопленный прогресс одним запросом. Возвращает число записей"""
+    global _buffer
+    with _lock:
+        items, _buffer = _buffer, {}
+    if not items:
+        return 0
+
+    # Статья могла быть удалена, пока запись лежала в буфере
+    text_ids = {text_id for _user_id, text_id in items}
+    existing = set(
+        TextContent.objects.filter(pk__in=text_ids).values_list("pk", flat=True)
+    )
+    objs = [
+        ReadingProgress(user_id=user_id, text_id=text_id, page_number=page_number)
+        for (user_id, text_id), (page_number, _recorded_at) in items.items()
+        if text_id in existing
+    ]
+    try:
+        ReadingProgress.objects.bulk_create(
+            objs,
+            update_conflicts=True,
+            unique_fields=["user", "text"],
+            update_fields=["page_number", "updated_at"],
+        )
+    except DatabaseError:
+        # Возвращаем записи в буфер, не затирая пришедшие за это время
+        with _lock:
+            for key, entry in items.items():
+                _buffer.setdefault(key, entry)
+            _schedule(get_flush_interval())
+        raise
+    return len(objs)
+
+
+def merge_offline_progress(user_id, records):
+    """
+    Применяет офлайн-прогресс пользователя одним upsert.
+
+    ``records`` — кортежи ``(text_id, page_number, client_time)``. Для каждой
+    статьи берётся самая поздняя запись; строка в БД обновляется, только если
+    она старше. Возвращает число записей, отправленных в БД.
+    """
+    latest = {}
+    for text_id, page_number, client_time in records:
+        if text_id not in latest or client_time > latest[text_id][1]:
+            latest[text_id] = (page_number, client_time)
+
+    # Несохранённая запись из буфера новее — офлайн-запись не нужна;
+    # офлайн-запись новее — буфер не должен её затереть
+    with _lock:
+        for text_id in list(latest):
+            buffered = _buffer.get((user_id, text_id))
+            if buffered is None:
+                continue
+            if buffered[1] >= latest[text_id][1]:
+                del latest[text_id]
+            else:
+                del _buffer[(user_id, text_id)]
+
+    existing = set(
+        TextContent.objects.filter(pk__in=latest).values_list("pk", flat=True)
+    )
+    rows = [
+        (user_id, text_id, page_number, client_time)
+        for text_id, (page_number, client_time) in latest.items()
+        if text_id in existing
+    ]
+    if rows:
+        _upsert_if_newer(rows)
+    return len(rows)
+
+
+def _upsert_if_newer(rows):
+    opts = ReadingProgress._meta
+    qn = connection.ops.quote_name
+    table = qn(opts.db_table)
+    user_col = qn(opts.get_field("user").column)
+    text_col = qn(opts.get_field("text").column)
+    page_col = qn(opts.get_field("page_number").column)
+    updated_field = opts.get_field("updated_at")
+    updated_col = qn(updated_field.column)
+
+    placeholders = ", ".join(["(%s, %s, %s, %s)"] * len(rows))
+    params = []
+    for user_id, text_id, page_number, client_time in rows:
+        params.extend(
+            [
+                user_id,
+                text_id,
+                page_number,
+                updated_field.get_db_prep_value(client_time, connection),
+            ]
+        )
+    sql = (
+        f"INSERT INTO {table} ({user_col}, {text_col}, {page_col}, {updated_col}) "
+        f"VALUES {placeholders} "
+        f"ON CONFLICT ({user_col}, {text_col}) DO UPDATE SET "
+        f"{page_col} = excluded.{page_col}, {updated_col} = excluded.{updated_col} "
+        f"WHERE excluded.{updated_col} > {table}.{updated_col}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+atexit.register(flush)
@@ -0,0 +1,87 @@
+"""Массовая смена статуса материалов: публикация и архивирование.
+
+Сохранение материала через ``save()`` — это пересчёт slug, сигналы
+счётчиков, кэша страниц и поиска и отдельная запись в БД (на SQLite —
+ещё и отдельная блокировка записи). ``set_status`` меняет статус всех
+выбранных материалов одним ``UPDATE`` на таблицу, счётчики авторов и
+категорий — одним ``UPDATE`` на строку, ставит опубликованные статьи в
+очередь экспорта одной вставкой, а затем посылает один сигнал
+``status_changed`` обо всех изменениях сразу. На него подписаны кэш
+страниц (``main.signals``) и поиск (``search.signals``).
+"""
+
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .counters import CONTENT_COUNTERS, STATE_FIELDS, apply_content_changes
+from .models import BaseContent, ExportJob, TextContent
+
+# Аргументы: ``changes`` — ``{модель: [строка, ...]}`` со значениями
+# ``ROW_FIELDS`` до изменения, ``status`` — новый статус, ``now`` — время
+# изменения (им заполнен пустой ``published_at`` при публикации)
+status_changed = Signal()
+
+ROW_FIELDS = ("pk", "title", "slug", *STATE_FIELDS)
+STATUSES = dict(BaseContent.STATUS_CHOICES)
+
+
+def set_status(targets, status, now=None):
+    """
+    Переводит материалы в статус ``status``. ``targets`` —
+    ``{модель: первичные ключи или QuerySet}``; материалы, уже имеющие
+    этот статус, не трогаются. Возвращает число изменённых материалов.
+    """
+    if status not in STATUSES:
+        raise ValueError(f"Unknown content status: {status}")
+    now = now or timezone.now()
+    updates = {"status": status, "updated_at": now}
+    if status == "published":
+        updates["published_at"] = Coalesce("published_at", Value(now))
+
+    changes = {}
+    with transaction.atomic():
+        for model, pks in targets.items():
+            if model not in CONTENT_COUNTERS:
+                raise ValueError(f"Not a content model: {model.__name__}")
+            rows = list(
+                model.objects.select_for_update()
+                .filter(pk__in=pks)
+                .exclude(status=status)
+                .values(*ROW_FIELDS)
+            )
+            if not rows:
+                continue
+            model.objects.filter(pk__in=[row["pk"] for row in rows]).update(**updates)
+            apply_content_changes(
+                model,
+                [(_state(row), {**_state(row), "status": status}) for row in rows],
+            )
+            changes[model] = rows
+            if model is TextContent and status == "published":
+                # Как и TextContent.save: опубликованное рендерит воркер экспорта
+                ExportJob.enqueue_many(row["pk"] for row in rows)
+        if changes:
+            status_changed.send(
+                sender=set_status, changes=changes, status=status, now=now
+            )
+    return sum(len(rows) for rows in changes.values())
+
+
+def publish(materials, now=None):
+    """Публикует материалы (объекты любых типов контента) разом"""
+    targets = defaultdict(list)
+    for material in materials:
+        if material is not None and material.status != "published":
+            targets[type(material)].append(material.pk)
+    if not targets:
+        return 0
+    return set_status(targets, "published", now)
+
+
+def _state(row):
+    return {field: row[field] for field in STATE_FIELDS}
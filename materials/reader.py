@@ -0,0 +1,237 @@
+"""Разбиение HTML статьи на страницы и оглавление для читалки.
+
+Статья (HTML из редактора Quill или простой текст) режется по блокам
+верхнего уровня: абзацам, заголовкам, спискам, цитатам. Страница набирается
+из целых блоков, пока объём видимого текста не превысит ``READER_PAGE_CHARS``;
+заголовки h1/h2 начинают новую страницу. Страницы хранятся в ``TextPage``,
+и читалка загружает их по одной, не получая всю статью сразу.
+
+Заголовкам h1–h3 при разбиении присваиваются якоря (атрибут ``id``), а сами
+заголовки с позицией в тексте и номером страницы попадают в ``TextHeading``.
+Это оглавление используют читалка и экспорт в EPUB/PDF.
+
+Модуль не импортирует модели, и миграции данных (0004, 0005) заполняют
+страницы и оглавление им же, а не замороженной копией: это производные
+данные, и после изменения разбора их пересобирает новая миграция или
+пересохранение статей.
+"""
+
+import re
+from html import unescape
+
+import pytils.translit
+from django.conf import settings
+
+VOID_TAGS = {
+    "area",
+    "base",
+    "br",
+    "col",
+    "embed",
+    "hr",
+    "img",
+    "input",
+    "link",
+    "meta",
+    "source",
+    "track",
+    "wbr",
+}
+# Вес «невидимых» элементов при подсчёте объёма страницы
+IMAGE_WEIGHT = 600
+# Заголовки, попадающие в оглавление
+TOC_LEVELS = (1, 2, 3)
+# Длина поля TextHeading.anchor: более длинный id заголовка заменяется
+ANCHOR_MAX_LENGTH = 100
+
+_tag_re = re.compile(r"<(/?)([a-zA-Z][a-zA-Z0-9]*)\b[^>]*?(/?)>|<!--.*?-->", re.S)
+_strip_re = re.compile(r"<[^>]+>")
+_heading_re = re.compile(r"^(\s*<h([1-6]))([\s>])", re.I)
+_id_attr_re = re.compile(r"""^\s*<h[1-6][^>]*?\sid\s*=\s*["']?([^"'\s>]+)""", re.I)
+
+
+def get_page_chars():
+    return getattr(settings, "READER_PAGE_CHARS", 2500)
+
+
+def iter_blocks(html):
+    """
+    Делит HTML на блоки верхнего уровня, сохраняя исходную разметку.
+    Возвращает пары ``(смещение в html, блок)``.
+    """
+    depth = 0
+    block_start = 0
+    pos = 0
+    for match in _tag_re.finditer(html):
+        if depth == 0 and match.start() > pos:
+            yield from _split_text(html, pos, match.start())
+        closing, name, self_closing = match.group(1), match.group(2), match.group(3)
+        if name is None:  # комментарий
+            pos = match.end()
+            if depth == 0:
+                block_start = pos
+            continue
+        name = name.lower()
+        if closing and depth == 0:
+            # Лишний закрывающий тег вне блоков
+            pos = match.end()
+            block_start = pos
+            continue
+        if depth == 0:
+            block_start = match.start()
+        if closing:
+            depth = max(depth - 1, 0)
+        elif not self_closing and name not in VOID_TAGS:
+            depth += 1
+        pos = match.end()
+        if depth == 0:
+            yield block_start, html[block_start:pos]
+    if pos < len(html):
+        if depth == 0:
+            yield from _split_text(html, pos, len(html))
+        else:
+            # Незакрытый тег: остаток статьи одним блоком
+            yield block_start, html[block_start:]
+
+
+def split_blocks(html):
+    return [block for _offset, block in iter_blocks(html)]
+
+
+def _split_text(html, start, end):
+    """Текст вне тегов делится по пустым строкам"""
+    offset = start
+    for part in re.split(r"(\n\s*\n)", html[start:end]):
+        if part.strip():
+            yield offset, part
+        offset += len(part)
+
+
+def strip_tags(html):
+    return unescape(_strip_re.sub("", html)).strip()
+
+
+def block_weight(block):
+    visible = len(strip_tags(block))
+    images = block.lower().count("<img")
+    return visible + images * IMAGE_WEIGHT
+
+
+def heading_level(block):
+    match = _heading_re.match(block)
+    return int(match.group(2)) if match else None
+
+
+class _Anchors:
+    """Уникальные якоря заголовков в пределах одной статьи"""
+
+    def __init__(self):
+        self.used = set()
+
+    def apply(self, block, title):
+        """Возвращает блок с атрибутом ``id`` и сам якорь"""
+        existing = _id_attr_re.match(block)
+        if existing and len(existing.group(1)) <= ANCHOR_MAX_LENGTH:
+            anchor = existing.group(1)
+            self.used.add(anchor)
+            return block, anchor
+        base = pytils.translit.slugify(title)[:60] or "section"
+        anchor = base
+        suffix = 2
+        while anchor in self.used:
+            anchor = f"{base}-{suffix}"
+            suffix += 1
+        self.used.add(anchor)
+        if existing:
+            start, end = existing.span(1)
+            block = block[:start] + anchor + block[end:]
+        else:
+            block = _heading_re.sub(rf'\1 id="{anchor}"\3', block, count=1)
+        return block, anchor
+
+
+def _iter_marked_blocks(html):
+    """Блоки статьи с якорями у заголовков: ``(offset, block, level, title, anchor)``"""
+    anchors = _Anchors()
+    for offset, block in iter_blocks(html or ""):
+        level = heading_level(block)
+        title = strip_tags(block) if level in TOC_LEVELS else ""
+        anchor = ""
+        if title:
+            block, anchor = anchors.apply(block, title)
+        yield offset, block, level, title, anchor
+
+
+def build_structure(html, page_chars=None):
+    """
+    Разбивает статью на страницы и собирает оглавление.
+
+    Возвращает ``(pages, headings)``: список HTML-строк по одной на страницу
+    и список словарей ``level``, ``title``, ``anchor``, ``offset``
+    (позиция заголовка в исходном тексте), ``page_number``.
+    """
+    page_chars = page_chars or get_page_chars()
+    pages = []
+    headings = []
+    current = []
+    size = 0
+    only_heading = False
+    for offset, block, level, title, anchor in _iter_marked_blocks(html):
+        weight = block_weight(block)
+        # Заголовок не остаётся в конце страницы отдельно от своего текста
+        overflow = size + weight > page_chars and not only_heading
+        if current and ((level is not None and level <= 2) or overflow):
+            pages.append("".join(current))
+            current, size = [], 0
+        only_heading = level is not None and not current
+        if title:
+            headings.append(
+                {
+                    "level": level,
+                    "title": title[:300],
+                    "anchor": anchor,
+                    "offset": offset,
+                    "page_number": len(pages) + 1,
+                }
+            )
+        current.append(block)
+        size += weight
+    if current:
+        pages.append("".join(current))
+    return pages or [""], headings
+
+
+def split_pages(html, page_chars=None):
+    """Возвращает список HTML-строк, по одной на страницу"""
+    return build_structure(html, page_chars)[0]
+
+
+def add_heading_anchors(html):
+    """HTML статьи с теми же якорями у заголовков, что и в оглавлении"""
+    return "".join(block for _o, block, _l, _t, _a in _iter_marked_blocks(html))
+
+
+def split_sections(html):
+    """
+    Делит статью на разделы по заголовкам h1/h2 (главы EPUB).
+
+    Возвращает список словарей ``title``, ``anchor``, ``content`` и
+    ``subheadings`` — пар ``(title, anchor)`` для h3 внутри раздела.
+    Текст до первого заголовка попадает в раздел без названия.
+    """
+    sections = []
+    current = None
+    for _offset, block, level, title, anchor in _iter_marked_blocks(html):
+        if title and level <= 2:
+            current = {"title": title, "anchor": anchor, "parts": [], "subheadings": []}
+            sections.append(current)
+        elif current is None:
+            current = {"title": "", "anchor": "", "parts": [], "subheadings": []}
+            sections.append(current)
+        elif title:
+            current["subheadings"].append((title, anchor))
+        current["parts"].append(block)
+
+    for section in sections:
+        section["content"] = "".join(section.pop("parts"))
+    return sections
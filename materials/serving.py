@@ -0,0 +1,221 @@
+"""Отдача файлов с диска без чтения их целиком в память.
+
+Файл либо передаётся фронт-серверу (``X-Accel-Redirect`` для nginx,
+``X-Sendfile`` для Apache/lighttpd), либо отдаётся через ``FileResponse``,
+который читает его блоками и под WSGI использует ``wsgi.file_wrapper``
+(sendfile). Режим задаётся настройкой ``MEDIA_SENDFILE_BACKEND``.
+
+Запросы с заголовком ``Range`` получают ``206 Partial Content`` (один
+диапазон) или ``multipart/byteranges`` (несколько), что позволяет плееру
+перематывать длинные записи без повторной загрузки файла.
+"""
+
+import mimetypes
+import os
+import re
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.crypto import get_random_string
+from django.utils.http import (
+    content_disposition_header,
+    http_date,
+    parse_http_date_safe,
+)
+
+CHUNK_SIZE = 64 * 1024
+MAX_RANGES = 16
+
+_range_spec_re = re.compile(r"^\s*(\d*)\s*-\s*(\d*)\s*$")
+
+
+def file_etag(stat):
+    """
+    Сильный ETag файла по времени изменения и размеру — годится для
+    ``If-Range``, поэтому докачка диапазонов сверяется с ним.
+    """
+    return f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+
+
+def serve_file(request, path, content_type=None, filename=None, as_attachment=False):
+    """
+    Возвращает ответ с содержимым файла ``path``. Поддерживает
+    ``If-None-Match``/``If-Modified-Since`` (ответ 304).
+    """
+    path = Path(path)
+    stat = path.stat()
+    etag = file_etag(stat)
+    last_modified = int(stat.st_mtime)
+
+    not_modified = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if not_modified is not None:
+        return not_modified
+
+    if content_type is None:
+        content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+
+    response = _offload_response(path)
+    if response is not None:
+        # Диапазоны фронт-сервер обрабатывает сам
+        response["Content-Type"] = content_type
+    else:
+        ranges = None
+        if _if_range_matches(request, etag, last_modified):
+            ranges = parse_range_header(request.META.get("HTTP_RANGE"), stat.st_size)
+        if ranges == []:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{stat.st_size}"
+        elif ranges:
+            response = _range_response(path, ranges, stat.st_size, content_type)
+        else:
+            response = FileResponse(open(path, "rb"), content_type=content_type)
+        response["Accept-Ranges"] = "bytes"
+
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    disposition = content_disposition_header(as_attachment, filename or path.name)
+    if disposition:
+        response["Content-Disposition"] = disposition
+    return response
+
+
+def _offload_response(path):
+    """Ответ-заглушка, по которому фронт-сервер сам отдаст файл"""
+    backend = getattr(settings, "MEDIA_SENDFILE_BACKEND", None)
+    if backend == "nginx":
+        try:
+            relative = path.resolve().relative_to(Path(settings.MEDIA_ROOT).resolve())
+        except ValueError:
+            return None
+        prefix = getattr(settings, "MEDIA_SENDFILE_PREFIX", "/protected-media/")
+        response = HttpResponse()
+        # Заголовок — ASCII: иначе Django закодирует кириллицу по RFC 2047,
+        # и фронт-сервер не найдёт файл
+        response["X-Accel-Redirect"] = quote(
+            prefix.rstrip("/") + "/" + relative.as_posix()
+        )
+        return response
+    if backend in ("apache", "lighttpd"):
+        response = HttpResponse()
+        response["X-Sendfile"] = quote(os.fspath(path.resolve()))
+        return response
+    return None
+
+
+def parse_range_header(header, size):
+    """
+    Разбирает ``Range: bytes=...`` для файла размера ``size``.
+
+    Возвращает ``None``, если заголовка нет или он некорректен (отдаётся
+    весь файл), пустой список, если ни один диапазон не выполним (416),
+    иначе список пар ``(start, end)`` включительно, упорядоченных и слитых.
+    """
+    if not header:
+        return None
+    unit, _, specs = header.partition("=")
+    if unit.strip().lower() != "bytes" or not specs:
+        return None
+
+    ranges = []
+    for spec in specs.split(","):
+        match = _range_spec_re.match(spec)
+        if not match:
+            return None
+        first, last = match.groups()
+        if not first and not last:
+            return None
+        if not first:
+            # Суффикс: последние N байт
+            length = int(last)
+            if length == 0:
+                continue
+            start, end = max(size - length, 0), size - 1
+        else:
+            start = int(first)
+            end = int(last) if last else size - 1
+            if last and end < start:
+                return None
+            if start >= size:
+                continue
+            end = min(end, size - 1)
+        ranges.append((start, end))
+
+    if len(ranges) > MAX_RANGES:
+        return None
+    ranges.sort()
+    merged = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _if_range_matches(request, etag, last_modified):
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if not if_range:
+        return True
+    if if_range.startswith(('"', "W/")):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def _read_range(fh, start, end):
+    fh.seek(start)
+    remaining = end - start + 1
+    while remaining > 0:
+        chunk = fh.read(min(CHUNK_SIZE, remaining))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+        yield chunk
+
+
+def _range_response(path, ranges, size, content_type):
+    fh = open(path, "rb")
+
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        response = StreamingHttpResponse(
+            _read_range(fh, start, end), status=206, content_type=content_type
+        )
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = str(end - start + 1)
+        response._resource_closers.append(fh.close)
+        return response
+
+    boundary = get_random_string(24)
+    headers = [
+        (
+            f"--{boundary}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+        ).encode("ascii")
+        for start, end in ranges
+    ]
+    closing = f"\r\n--{boundary}--\r\n".encode("ascii")
+    length = sum(len(h) for h in headers) + len(closing)
+    length += sum(end - start + 1 for start, end in ranges)
+    length += 2 * (len(ranges) - 1)  # CRLF перед каждым следующим разделителем
+
+    def parts():
+        for index, ((start, end), header) in enumerate(zip(ranges, headers)):
+            if index:
+                yield b"\r\n"
+            yield header
+            yield from _read_range(fh, start, end)
+        yield closing
+
+    response = StreamingHttpResponse(
+        parts(),
+        status=206,
+        content_type=f"multipart/byteranges; boundary={boundary}",
+    )
+    response["Content-Length"] = str(length)
+    response._resource_closers.append(fh.close)
+    return response
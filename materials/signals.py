@@ -0,0 +1,58 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .categories import invalidate_categories
+from .counters import STATE_FIELDS, apply_content_change, content_state
+from .models import AudioContent, Category, ContentStat, TextContent, VideoContent
+from .stats import CONTENT_TYPES
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def reset_category_cache(sender, **kwargs):
+    """Меню и фильтры списков должны увидеть изменённую категорию"""
+    invalidate_categories()
+
+
+@receiver(pre_save, sender=VideoContent)
+@receiver(pre_save, sender=AudioContent)
+@receiver(pre_save, sender=TextContent)
+def remember_counter_state(sender, instance, raw=False, **kwargs):
+    """Состояние материала в БД до сохранения — от него считается разница"""
+    if raw:
+        return
+    previous = instance._loaded_state
+    if previous is None and instance.pk is not None:
+        # Объект создан не загрузкой из БД или загружен не полностью
+        previous = sender.objects.filter(pk=instance.pk).values(*STATE_FIELDS).first()
+    instance._counter_previous = previous
+
+
+@receiver(post_save, sender=VideoContent)
+@receiver(post_save, sender=AudioContent)
+@receiver(post_save, sender=TextContent)
+def update_counters_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    current = content_state(instance)
+    apply_content_change(sender, getattr(instance, "_counter_previous", None), current)
+    instance._loaded_state = current
+
+
+@receiver(post_delete, sender=VideoContent)
+@receiver(post_delete, sender=AudioContent)
+@receiver(post_delete, sender=TextContent)
+def update_counters_on_delete(sender, instance, **kwargs):
+    apply_content_change(
+        sender, instance._loaded_state or content_state(instance), None
+    )
+
+
+@receiver(post_delete, sender=VideoContent)
+@receiver(post_delete, sender=AudioContent)
+@receiver(post_delete, sender=TextContent)
+def delete_content_stats(sender, instance, **kwargs):
+    """Итоги автора остаются, строки самого материала больше не нужны"""
+    ContentStat.objects.filter(
+        content_type=CONTENT_TYPES[sender], object_id=instance.pk
+    ).delete()
@@ -0,0 +1,232 @@
+"""Статистика просмотров и прослушиваний по интервалам времени.
+
+Сброс буфера ``materials.hits`` прибавляет накопленное к строкам
+``ContentStat`` текущего часа и дня — для каждого материала и для итога
+по автору (``content_type="all"``, ``object_id`` — id автора, чтобы итоги
+разных авторов не попадали в одну строку). Приросты применяются одним
+``INSERT ... ON CONFLICT DO UPDATE SET value = value + excluded.value``,
+поэтому строк в таблице столько, сколько интервалов, а не событий.
+
+``manage.py compact_stats`` (раз в сутки) удаляет почасовые строки старше
+``STATS_HOURLY_RETENTION`` дней, а дневные старше ``STATS_DAILY_RETENTION``
+дней переносит в недельные и месячные. ``get_trend`` складывает свёрнутые
+строки с ещё не свёрнутыми дневными, так что график не зависит от того,
+когда запускалась свёртка.
+"""
+
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import AudioContent, ContentStat, TextContent, VideoContent
+
+CONTENT_TYPES = {
+    VideoContent: "video",
+    AudioContent: "audio",
+    TextContent: "text",
+}
+# Поле-счётчик материала -> показатель статистики
+METRICS = {
+    "views_count": "views",
+    "listens_count": "listens",
+}
+AUTHOR_TOTAL = "all"
+# Строк в одном INSERT (по 7 параметров на строку)
+UPSERT_CHUNK_SIZE = 100
+KEY_FIELDS = ("content_type", "object_id", "metric", "period", "bucket")
+
+
+def get_hourly_enabled():
+    return getattr(settings, "STATS_HOURLY", True)
+
+
+def get_hourly_retention():
+    return getattr(settings, "STATS_HOURLY_RETENTION", 7)
+
+
+def get_daily_retention():
+    return getattr(settings, "STATS_DAILY_RETENTION", 90)
+
+
+def truncate(moment, period):
+    """Начало интервала ``period``, в который попадает ``moment``"""
+    moment = timezone.localtime(moment).replace(minute=0, second=0, microsecond=0)
+    if period == "hour":
+        return moment
+    moment = moment.replace(hour=0)
+    if period == "week":
+        moment -= timedelta(days=moment.weekday())
+    elif period == "month":
+        moment = moment.replace(day=1)
+    return moment
+
+
+def previous_bucket(bucket, period):
+    """Начало интервала, предшествующего ``bucket``"""
+    if period == "hour":
+        return bucket - timedelta(hours=1)
+    if period == "day":
+        return truncate(bucket - timedelta(hours=12), "day")
+    if period == "week":
+        return truncate(bucket - timedelta(days=4), "week")
+    return truncate(bucket - timedelta(days=1), "month")
+
+
+def record_hits(model, field, counts, moment=None):
+    """
+    Прибавляет ``counts`` (``{pk материала: прирост}``) к статистике
+    текущего часа и дня.
+    """
+    metric = METRICS[field]
+    content_type = CONTENT_TYPES[model]
+    moment = moment or timezone.now()
+    periods = ("hour", "day") if get_hourly_enabled() else ("day",)
+
+    authors = dict(model.objects.filter(pk__in=counts).values_list("pk", "author_id"))
+    rows = Counter()
+    for pk, delta in counts.items():
+        if pk not in authors:
+            continue
+        author_id = authors[pk]
+        for period in periods:
+            bucket = truncate(moment, period)
+            rows[(author_id, content_type, pk, metric, period, bucket)] += delta
+            if author_id:
+                total = (author_id, AUTHOR_TOTAL, author_id, metric, period, bucket)
+                rows[total] += delta
+    upsert(rows)
+
+
+def upsert(rows):
+    """
+    Прибавляет значения к строкам статистики, создавая недостающие.
+    ``rows`` — ``{(author_id, content_type, object_id, metric, period,
+    bucket): прирост}``.
+    """
+    # Одна строка на ключ KEY_FIELDS: PostgreSQL не даёт одному INSERT ... ON
+    # CONFLICT обновить строку дважды (свёрнутые дни материала, сменившего
+    # автора, приходят с разными author_id)
+    merged = {}
+    for (author_id, *key), value in rows.items():
+        if value:
+            _author_id, total = merged.get(tuple(key), (None, 0))
+            merged[tuple(key)] = (author_id, total + value)
+    items = [((author_id, *key), value) for key, (author_id, value) in merged.items()]
+    if connection.vendor not in ("sqlite", "postgresql"):
+        _upsert_generic(items)
+        return
+
+    quote = connection.ops.quote_name
+    table = quote(ContentStat._meta.db_table)
+    columns = ("author_id", *KEY_FIELDS, "value")
+    placeholders = "(%s)" % ", ".join(["%s"] * len(columns))
+    for start in range(0, len(items), UPSERT_CHUNK_SIZE):
+        chunk = items[start : start + UPSERT_CHUNK_SIZE]
+        params = []
+        for key, value in chunk:
+            *fields, bucket = key
+            params += [*fields, connection.ops.adapt_datetimefield_value(bucket), value]
+        sql = (
+            f"INSERT INTO {table} ({', '.join(quote(c) for c in columns)}) "
+            f"VALUES {', '.join([placeholders] * len(chunk))} "
+            f"ON CONFLICT ({', '.join(quote(c) for c in KEY_FIELDS)}) DO UPDATE SET "
+            f"{quote('value')} = {table}.{quote('value')} + excluded.{quote('value')}, "
+            f"{quote('author_id')} = excluded.{quote('author_id')}"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+
+
+def _upsert_generic(items):
+    """Для бэкендов без ON CONFLICT: по запросу на строку"""
+    for (author_id, *key), value in items:
+        lookup = dict(zip(KEY_FIELDS, key))
+        updated = ContentStat.objects.filter(**lookup).update(
+            value=F("value") + value, author_id=author_id
+        )
+        if not updated:
+            ContentStat.objects.create(author_id=author_id, value=value, **lookup)
+
+
+def compact(now=None):
+    """
+    Удаляет устаревшие почасовые строки и сворачивает устаревшие дневные
+    в недельные и месячные. Возвращает число удалённых строк по интервалам.
+    """
+    now = now or timezone.now()
+    hourly_cutoff = truncate(now - timedelta(days=get_hourly_retention()), "day")
+    daily_cutoff = truncate(now - timedelta(days=get_daily_retention()), "day")
+
+    with transaction.atomic():
+        hours, _ = ContentStat.objects.filter(
+            period="hour", bucket__lt=hourly_cutoff
+        ).delete()
+
+        days = ContentStat.objects.filter(period="day", bucket__lt=daily_cutoff)
+        for period, trunc in (("week", TruncWeek), ("month", TruncMonth)):
+            totals = (
+                days.order_by()
+                .annotate(rollup=trunc("bucket"))
+                .values("author_id", "content_type", "object_id", "metric", "rollup")
+                .annotate(total=Sum("value"))
+            )
+            upsert(
+                {
+                    (
+                        row["author_id"],
+                        row["content_type"],
+                        row["object_id"],
+                        row["metric"],
+                        period,
+                        row["rollup"],
+                    ): row["total"]
+                    for row in totals
+                }
+            )
+        days_deleted, _ = days.delete()
+    return {"hour": hours, "day": days_deleted}
+
+
+def get_trend(author, metric="views", period="day", count=30, now=None):
+    """
+    Значения итоговых строк автора за последние ``count`` интервалов:
+    список ``(начало интервала, значение)`` от старых к новым.
+    """
+    buckets = [truncate(now or timezone.now(), period)]
+    while len(buckets) < count:
+        buckets.append(previous_bucket(buckets[-1], period))
+    buckets.reverse()
+
+    # Недельные и месячные строки содержат только свёрнутые дни,
+    # остальное досчитывается по дневным
+    periods = [period] if period in ("hour", "day") else [period, "day"]
+    rows = ContentStat.objects.filter(
+        author=author,
+        content_type=AUTHOR_TOTAL,
+        metric=metric,
+        period__in=periods,
+        bucket__gte=buckets[0],
+    ).values_list("bucket", "value")
+
+    values = Counter()
+    for bucket, value in rows:
+        values[truncate(bucket, period)] += value
+    return [(bucket, values[bucket]) for bucket in buckets]
+
+
+def chart_bars(trend):
+    """Точки графика с высотой столбца в процентах от максимума"""
+    peak = max((value for _bucket, value in trend), default=0)
+    return [
+        {
+            "bucket": bucket,
+            "value": value,
+            "height": round(value * 100 / peak) if peak else 0,
+        }
+        for bucket, value in trend
+    ]
@@ -1,3 +1,904 @@
-from django.test import TestCase
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest import mock
+from urllib.parse import unquote
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Authors, User
+from courses.models import Course, Lesson
+from search.query import search_ids
+
+from . import categories, export_worker, exports, hits, progress
+from .context_processors import categories_processor
+from .export_worker import finish_job, prune_jobs, render_job, run_worker
+from .feed import decode_cursor, feed_queryset, get_feed_page
+from .models import (
+    AudioContent,
+    Category,
+    ContentStat,
+    ExportJob,
+    ReadingProgress,
+    TextContent,
+    VideoContent,
+)
+from .pagination import cursor_paginate
+from .publishing import set_status, status_changed
+from .reader import ANCHOR_MAX_LENGTH, add_heading_anchors, build_structure
+from .serving import MAX_RANGES, file_etag, parse_range_header, serve_file
+from .stats import compact, get_trend, record_hits, truncate
+
+
+def make_author(email):
+    user = User.objects.create_user(email=email, password="pass", user_type="author")
+    return user.author_profile
+
+
+class StatsTests(TestCase):
+    moment = datetime(2026, 3, 18, 14, 35, tzinfo=dt_timezone.utc)
+
+    def setUp(self):
+        self.first = make_author("first@example.com")
+        self.second = make_author("second@example.com")
+        self.first_video = VideoContent.objects.create(
+            title="Первое", author=self.first, embed_code="<iframe></iframe>"
+        )
+        self.second_video = VideoContent.objects.create(
+            title="Второе", author=self.second, embed_code="<iframe></iframe>"
+        )
+
+    def record(self, counts, moment=None):
+        record_hits(VideoContent, "views_count", counts, moment or self.moment)
+
+    def test_buckets(self):
+        self.assertEqual(
+            truncate(self.moment, "hour"),
+            datetime(2026, 3, 18, 14, tzinfo=dt_timezone.utc),
+        )
+        # 18 марта 2026 — среда, неделя начинается с понедельника
+        self.assertEqual(truncate(self.moment, "week").date().isoformat(), "2026-03-16")
+        self.assertEqual(
+            truncate(self.moment, "month").date().isoformat(), "2026-03-01"
+        )
+
+    def test_hits_are_added_to_the_same_bucket(self):
+        self.record({self.first_video.pk: 2})
+        self.record({self.first_video.pk: 3})
+        row = ContentStat.objects.get(
+            content_type="video", object_id=self.first_video.pk, period="day"
+        )
+        self.assertEqual(row.value, 5)
+
+    def test_author_totals_are_kept_apart(self):
+        self.record({self.first_video.pk: 5, self.second_video.pk: 7})
+
+        totals = ContentStat.objects.filter(content_type="all", period="day")
+        self.assertEqual(
+            sorted(totals.values_list("author_id", "value")),
+            sorted([(self.first.pk, 5), (self.second.pk, 7)]),
+        )
+        self.assertEqual(get_trend(self.first, now=self.moment)[-1][1], 5)
+        self.assertEqual(get_trend(self.second, now=self.moment)[-1][1], 7)
+
+    def test_compact_keeps_author_totals_apart(self):
+        old = datetime(2025, 6, 10, 12, tzinfo=dt_timezone.utc)
+        self.record({self.first_video.pk: 5, self.second_video.pk: 7}, old)
+        self.record(
+            {self.first_video.pk: 1}, datetime(2025, 6, 11, 12, tzinfo=dt_timezone.utc)
+        )
+
+        compact(now=self.moment)
+
+        self.assertFalse(
+            ContentStat.objects.filter(period__in=("hour", "day")).exists()
+        )
+        months = ContentStat.objects.filter(content_type="all", period="month")
+        self.assertEqual(
+            sorted(months.values_list("author_id", "value")),
+            sorted([(self.first.pk, 6), (self.second.pk, 7)]),
+        )
+        trend = get_trend(self.first, period="month", count=12, now=self.moment)
+        self.assertEqual(sum(value for _bucket, value in trend), 6)
+
+
+class ExportCacheTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache_dir = tmp.name
+        settings = override_settings(EXPORT_CACHE_DIR=self.cache_dir)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.text = TextContent(
+            pk=1,
+            title="Статья",
+            content="<p>Текст</p>",
+            updated_at=datetime(2026, 1, 1, tzinfo=dt_timezone.utc),
+        )
+
+    def test_concurrent_requests_render_once(self):
+        calls = []
+
+        def slow_build(text, format, base_url):
+            calls.append(format)
+            time.sleep(0.05)
+            return b"data"
+
+        start = threading.Barrier(8)
+
+        def request():
+            start.wait()
+            exports.get_export(self.text, "txt")
+
+        with mock.patch.object(exports, "_build", slow_build):
+            threads = [threading.Thread(target=request) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            # Повторный запрос той же ревизии отдаётся с диска
+            exports.get_export(self.text, "txt")
+        self.assertEqual(calls, ["txt"])
+
+    @override_settings(DEBUG=False, EXPORT_BASE_URL=None)
+    def test_base_url_is_required_without_debug(self):
+        with self.assertRaises(ImproperlyConfigured):
+            exports.get_base_url()
+
+    def test_eviction_keeps_the_returned_file(self):
+        old = os.path.join(self.cache_dir, "text-2-0000.txt")
+        with open(old, "wb") as fh:
+            fh.write(b"x" * 10)
+        os.utime(old, (0, 0))
+
+        with override_settings(EXPORT_CACHE_MAX_BYTES=1):
+            path = exports.get_export(self.text, "txt")
+
+        self.assertTrue(path.exists())
+        self.assertFalse(os.path.exists(old))
+
+
+class HitsTests(TestCase):
+    def setUp(self):
+        # Окно дедупликации общее на процесс
+        hits._seen.clear()
+        self.author = make_author("author@example.com")
+        self.video = VideoContent.objects.create(
+            title="Видео", author=self.author, embed_code="<iframe></iframe>"
+        )
+
+    def request(self, ip="10.0.0.1", **meta):
+        request = RequestFactory().get("/", REMOTE_ADDR=ip, **meta)
+        request.user = AnonymousUser()
+        return request
+
+    def test_views_survive_a_stale_full_save(self):
+        stale = VideoContent.objects.get(pk=self.video.pk)
+        self.assertTrue(hits.record_hit(self.request(), self.video))
+        self.assertFalse(hits.record_hit(self.request(), self.video))
+        hits.flush()
+
+        stale.title = "Новое название"
+        stale.save()
+
+        self.video.refresh_from_db()
+        self.author.refresh_from_db()
+        self.assertEqual(self.video.title, "Новое название")
+        self.assertEqual(self.video.views_count, 1)
+        self.assertEqual(self.author.total_views, 1)
+
+    @override_settings(CLIENT_IP_HEADER="HTTP_X_FORWARDED_FOR")
+    def test_visitors_behind_proxy_are_told_apart(self):
+        proxy = "192.168.0.1"
+        first = self.request(proxy, HTTP_X_FORWARDED_FOR="1.1.1.1")
+        second = self.request(proxy, HTTP_X_FORWARDED_FOR="6.6.6.6, 2.2.2.2")
+        self.assertEqual(hits.client_ip(second), "2.2.2.2")
+        self.assertTrue(hits.record_hit(first, self.video))
+        self.assertTrue(hits.record_hit(second, self.video))
+        self.assertFalse(hits.record_hit(first, self.video))
+        self.assertEqual(hits.flush(), 1)
+        self.video.refresh_from_db()
+        self.assertEqual(self.video.views_count, 2)
+
+    def test_hit_counters_are_read_only_in_admin(self):
+        # Полное сохранение их не пишет — правка в админке потерялась бы
+        request = RequestFactory().get("/")
+        for model in (VideoContent, AudioContent, TextContent):
+            with self.subTest(model=model.__name__):
+                readonly = admin.site._registry[model].get_readonly_fields(request)
+                self.assertLessEqual(set(model.HIT_FIELDS), set(readonly))
+
+    def test_forwarded_header_is_ignored_by_default(self):
+        request = self.request("3.3.3.3", HTTP_X_FORWARDED_FOR="9.9.9.9")
+        self.assertEqual(hits.client_ip(request), "3.3.3.3")
+
+
+class ExportJobTests(TestCase):
+    def test_prune_removes_only_old_finished_jobs(self):
+        text = TextContent.objects.create(title="Статья", content="<p>Текст</p>")
+        done = ExportJob.objects.create(text=text, status="done")
+        failed = ExportJob.objects.create(text=text, status="failed")
+        pending = ExportJob.objects.create(text=text)
+
+        self.assertEqual(prune_jobs(), 0)
+        with override_settings(EXPORT_JOB_RETENTION=7):
+            self.assertEqual(prune_jobs(timezone.now() + timedelta(days=8)), 1)
+        self.assertEqual(
+            set(ExportJob.objects.values_list("pk", flat=True)),
+            {failed.pk, pending.pk},
+        )
+        self.assertFalse(ExportJob.objects.filter(pk=done.pk).exists())
+
+    def test_job_deleted_with_its_text(self):
+        text = TextContent.objects.create(title="Статья", content="<p>Текст</p>")
+        job = ExportJob.objects.create(text=text, status="running")
+        text.delete()
+        self.assertIsNone(render_job(job.pk))
+        finish_job(job.pk)
+        finish_job(job.pk, "error")
+
+    @override_settings(EXPORT_BASE_URL="http://testserver/")
+    def test_broken_pool_is_replaced(self):
+        text = TextContent.objects.create(title="Статья", content="<p>Текст</p>")
+        for _ in range(3):
+            ExportJob.objects.create(text=text)
+        pools = []
+
+        class FakePool:
+            """Первый пул ломается, следующие выполняют задания"""
+
+            def __init__(self, concurrency):
+                self.broken = not pools
+                pools.append(self)
+
+            def submit(self, fn, job_id):
+                future = Future()
+                if self.broken:
+                    future.set_exception(BrokenProcessPool())
+                else:
+                    future.set_result(None)
+                return future
+
+            def shutdown(self, wait=True):
+                pass
+
+        with mock.patch.object(export_worker, "_new_pool", FakePool):
+            run_worker(concurrency=2, once=True)
+
+        self.assertEqual(len(pools), 2)
+        # Задания из сломанного пула ждут повтора, следующее выполнено
+        self.assertEqual(
+            sorted(ExportJob.objects.values_list("status", flat=True)),
+            ["done", "pending", "pending"],
+        )
+
+
+class ReaderTests(SimpleTestCase):
+    def test_existing_anchor_is_kept(self):
+        _pages, headings = build_structure('<h2 id="intro">Введение</h2><p>Текст</p>')
+        self.assertEqual(headings[0]["anchor"], "intro")
+
+    def test_too_long_anchor_is_replaced(self):
+        html = f'<h2 id="{"x" * 150}">Введение</h2><p>Текст</p>'
+        _pages, headings = build_structure(html)
+        anchor = headings[0]["anchor"]
+        self.assertLessEqual(len(anchor), ANCHOR_MAX_LENGTH)
+        self.assertEqual(anchor, "vvedenie")
+        self.assertIn(f'<h2 id="{anchor}">', add_heading_anchors(html))
+        self.assertNotIn("x" * 150, add_heading_anchors(html))
+
+
+class RangeHeaderTests(SimpleTestCase):
+    def test_single_ranges(self):
+        self.assertIsNone(parse_range_header(None, 1000))
+        self.assertEqual(parse_range_header("bytes=0-99", 1000), [(0, 99)])
+        self.assertEqual(parse_range_header("bytes=900-", 1000), [(900, 999)])
+        self.assertEqual(parse_range_header("bytes=-100", 1000), [(900, 999)])
+        self.assertEqual(parse_range_header("bytes=-5000", 1000), [(0, 999)])
+        self.assertEqual(parse_range_header("bytes=990-2000", 1000), [(990, 999)])
+
+    def test_ranges_are_sorted_and_merged(self):
+        self.assertEqual(
+            parse_range_header("bytes=30-40, 0-10, 5-20", 1000), [(0, 20), (30, 40)]
+        )
+        self.assertEqual(parse_range_header("bytes=0-10,11-20", 1000), [(0, 20)])
+
+    def test_unsatisfiable(self):
+        self.assertEqual(parse_range_header("bytes=1000-", 1000), [])
+        self.assertEqual(parse_range_header("bytes=-0", 1000), [])
+
+    def test_invalid_header_serves_whole_file(self):
+        for header in ("items=0-1", "bytes=", "bytes=5-1", "bytes=a-b", "bytes=-"):
+            with self.subTest(header=header):
+                self.assertIsNone(parse_range_header(header, 1000))
+        specs = ",".join(f"{i * 10}-{i * 10 + 1}" for i in range(MAX_RANGES + 1))
+        self.assertIsNone(parse_range_header(f"bytes={specs}", 1000))
+
+
+@override_settings(MEDIA_SENDFILE_BACKEND=None)
+class ServeFileTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "lecture.mp3")
+        self.data = bytes(range(256)) * 4
+        with open(self.path, "wb") as fh:
+            fh.write(self.data)
+
+    def serve(self, **headers):
+        request = RequestFactory().get("/", **headers)
+        response = serve_file(request, self.path, "audio/mpeg")
+        self.addCleanup(response.close)
+        return response
+
+    def body(self, response):
+        return b"".join(response.streaming_content)
+
+    def test_single_range(self):
+        response = self.serve(HTTP_RANGE="bytes=10-19")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], "bytes 10-19/1024")
+        self.assertEqual(response["Content-Length"], "10")
+        self.assertEqual(self.body(response), self.data[10:20])
+
+    def test_multiple_ranges(self):
+        response = self.serve(HTTP_RANGE="bytes=0-1,-2")
+        self.assertEqual(response.status_code, 206)
+        self.assertTrue(response["Content-Type"].startswith("multipart/byteranges"))
+        body = self.body(response)
+        self.assertEqual(len(body), int(response["Content-Length"]))
+        self.assertIn(b"Content-Range: bytes 0-1/1024", body)
+        self.assertIn(b"Content-Range: bytes 1022-1023/1024", body)
+
+    def test_unsatisfiable_range(self):
+        response = self.serve(HTTP_RANGE="bytes=5000-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], "bytes */1024")
+
+    def test_if_range(self):
+        etag = file_etag(os.stat(self.path))
+        response = self.serve(HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+        # Файл изменился — отдаётся целиком
+        response = self.serve(HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.data)
+
+    def test_not_modified(self):
+        etag = self.serve()["ETag"]
+        self.assertEqual(self.serve(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+class OffloadTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.media_root = tmp.name
+        os.mkdir(os.path.join(self.media_root, "audio"))
+        self.path = os.path.join(self.media_root, "audio", "Тафсир 1.mp3")
+        with open(self.path, "wb") as fh:
+            fh.write(b"data")
+
+    def serve(self, backend):
+        with self.settings(
+            MEDIA_ROOT=self.media_root,
+            MEDIA_SENDFILE_BACKEND=backend,
+            MEDIA_SENDFILE_PREFIX="/protected-media/",
+        ):
+            return serve_file(RequestFactory().get("/"), self.path, "audio/mpeg")
+
+    def test_nginx(self):
+        response = self.serve("nginx")
+        self.assertEqual(
+            response["X-Accel-Redirect"],
+            "/protected-media/audio/%D0%A2%D0%B0%D1%84%D1%81%D0%B8%D1%80%201.mp3",
+        )
+        self.assertEqual(response["Content-Type"], "audio/mpeg")
+        self.assertEqual(response.content, b"")
+
+    def test_sendfile(self):
+        response = self.serve("apache")
+        header = response["X-Sendfile"]
+        self.assertTrue(header.isascii())
+        self.assertEqual(unquote(header), os.path.realpath(self.path))
+        self.assertEqual(response.content, b"")
+
+    def test_file_outside_media_root_is_served_directly(self):
+        with self.settings(MEDIA_ROOT=os.path.join(self.media_root, "audio", "x")):
+            response = serve_file(RequestFactory().get("/"), self.path)
+        self.addCleanup(response.close)
+        self.assertNotIn("X-Accel-Redirect", response)
+        self.assertEqual(b"".join(response.streaming_content), b"data")
+
+
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        self.author = make_author("author@example.com")
+        moment = timezone.now() - timedelta(days=1)
+        for i in range(7):
+            VideoContent.objects.create(
+                title=f"Видео {i}",
+                author=self.author,
+                embed_code="<iframe></iframe>",
+                status="published",
+                # Пары с одинаковым временем различаются по id
+                published_at=moment - timedelta(hours=i // 2),
+            )
+        VideoContent.objects.create(
+            title="Черновик", author=self.author, embed_code="<iframe></iframe>"
+        )
+
+    def test_pages_cover_every_row_once(self):
+        queryset = VideoContent.objects.all()
+        expected = list(
+            queryset.filter(published_at__isnull=False)
+            .order_by("-published_at", "-pk")
+            .values_list("pk", flat=True)
+        )
+        seen = []
+        page = cursor_paginate(queryset, None, 3)
+        self.assertTrue(page.is_first)
+        while True:
+            seen.extend(video.pk for video in page)
+            if not page.has_next():
+                break
+            page = cursor_paginate(queryset, page.next_cursor, 3)
+            self.assertFalse(page.is_first)
+            self.assertTrue(page.has_other_pages())
+        self.assertEqual(seen, expected)
+
+    def test_broken_cursor_starts_from_the_first_page(self):
+        queryset = VideoContent.objects.all()
+        first = cursor_paginate(queryset, None, 3)
+        for after in ("garbage", "bm90LWEtZGF0ZXwx", "!!"):
+            with self.subTest(after=after):
+                page = cursor_paginate(queryset, after, 3)
+                self.assertTrue(page.is_first)
+                self.assertEqual(list(page), list(first))
+
+
+class FeedTests(TestCase):
+    def setUp(self):
+        self.author = make_author("author@example.com")
+        self.other = make_author("other@example.com")
+        moment = timezone.now() - timedelta(days=1)
+        for i in range(4):
+            # Видео, аудио и статья с одним временем публикации
+            published_at = moment - timedelta(hours=i)
+            fields = {"author": self.author, "status": "published"}
+            VideoContent.objects.create(
+                title=f"Видео {i}",
+                embed_code="<iframe></iframe>",
+                published_at=published_at,
+                **fields,
+            )
+            AudioContent.objects.create(
+                title=f"Аудио {i}",
+                audio_file="audio/lecture.mp3",
+                published_at=published_at,
+                **fields,
+            )
+            TextContent.objects.create(
+                title=f"Статья {i}", published_at=published_at, **fields
+            )
+        VideoContent.objects.create(
+            title="Чужое",
+            author=self.other,
+            embed_code="<iframe></iframe>",
+            status="published",
+        )
+        TextContent.objects.create(title="Черновик", author=self.author)
+
+    def test_pages_follow_the_union_order(self):
+        expected = [
+            (row["kind"], row["id"]) for row in feed_queryset(author=self.author)
+        ]
+        self.assertEqual(len(expected), 12)
+        seen = []
+        after = None
+        while True:
+            page = get_feed_page(5, after, author=self.author)
+            seen.extend((item.kind, item.id) for item in page.items)
+            if not page.next_cursor:
+                break
+            after = page.next_cursor
+        self.assertEqual(seen, expected)
+
+    def test_cursor(self):
+        page = get_feed_page(5, author=self.author)
+        moment, kind, pk = decode_cursor(page.next_cursor)
+        last = page.items[-1]
+        self.assertEqual((moment, kind, pk), (last.published_at, last.kind, last.id))
+        self.assertIsNone(decode_cursor("garbage"))
+        self.assertEqual(
+            get_feed_page(5, "garbage", author=self.author).items, page.items
+        )
+
+    def test_status_filter(self):
+        drafts = feed_queryset(kinds=["text"], sort_field="updated_at", status="draft")
+        self.assertEqual([row["title"] for row in drafts], ["Черновик"])
+        with self.assertRaises(ValueError):
+            feed_queryset(sort_field="views_count")
+
+
+class CounterTests(TestCase):
+    def setUp(self):
+        self.author = make_author("author@example.com")
+        self.other = make_author("other@example.com")
+        self.category = Category.objects.create(title="Тафсир", slug="tafsir")
+
+    def assertCounters(self, author, **expected):
+        author.refresh_from_db()
+        self.assertEqual(
+            {field: getattr(author, field) for field in expected}, expected
+        )
+
+    def test_signals_follow_content_changes(self):
+        video = VideoContent.objects.create(
+            title="Видео",
+            author=self.author,
+            category=self.category,
+            embed_code="<iframe></iframe>",
+            status="published",
+            views_count=5,
+        )
+        self.assertCounters(
+            self.author,
+            videos_count=1,
+            videos_published=1,
+            content_published=1,
+            total_views=5,
+        )
+        self.category.refresh_from_db()
+        self.assertEqual(self.category.content_published, 1)
+
+        video.status = "draft"
+        video.save()
+        self.assertCounters(self.author, videos_count=1, videos_published=0)
+        self.category.refresh_from_db()
+        self.assertEqual(self.category.content_published, 0)
+
+        video.author = self.other
+        video.save()
+        self.assertCounters(self.author, videos_count=0, total_views=0)
+        self.assertCounters(self.other, videos_count=1, total_views=5)
+
+        video.delete()
+        self.assertCounters(self.other, videos_count=0, total_views=0)
+
+    def test_recount_fixes_drifted_counters(self):
+        VideoContent.objects.create(
+            title="Видео",
+            author=self.author,
+            category=self.category,
+            embed_code="<iframe></iframe>",
+            status="published",
+        )
+        TextContent.objects.create(title="Статья", author=self.author)
+        course = Course.objects.create(title="Курс", slug="kurs", author=self.author)
+        Lesson.objects.create(course=course, title="Урок", order=1)
+
+        # Правки в обход save() сигналы не видят
+        VideoContent.objects.update(views_count=7)
+        TextContent.objects.update(status="published")
+        Authors.objects.update(videos_count=0, texts_published=3)
+        Course.objects.update(lessons_count=0)
+
+        call_command("recount_counters", stdout=StringIO())
+
+        self.assertCounters(
+            self.author,
+            videos_count=1,
+            videos_published=1,
+            texts_count=1,
+            texts_published=1,
+            content_published=2,
+            total_views=7,
+        )
+        self.assertCounters(self.other, videos_count=0, content_published=0)
+        self.category.refresh_from_db()
+        self.assertEqual(self.category.content_published, 1)
+        course.refresh_from_db()
+        self.assertEqual(course.lessons_count, 1)
+
+
+class ProgressTestCase(TestCase):
+    def setUp(self):
+        # Буфер общий на процесс; фоновый сброс в тестах не запускаем
+        progress._buffer.clear()
+        self.addCleanup(progress._buffer.clear)
+        schedule = mock.patch.object(progress, "_schedule")
+        schedule.start()
+        self.addCleanup(schedule.stop)
+        self.user = User.objects.create_user(email="reader@example.com", password="p")
+        self.text = TextContent.objects.create(title="Статья", content="<p>Текст</p>")
+
+    def saved_page(self):
+        return ReadingProgress.objects.get(user=self.user, text=self.text).page_number
+
+
+class ProgressBufferTests(ProgressTestCase):
+    def test_last_page_wins(self):
+        progress.record_progress(self.user.pk, self.text.pk, 3)
+        progress.record_progress(self.user.pk, self.text.pk, 5)
+        self.assertEqual(progress.pending_page(self.user.pk, self.text.pk), 5)
+        self.assertFalse(ReadingProgress.objects.exists())
+
+        self.assertEqual(progress.flush(), 1)
+        self.assertEqual(self.saved_page(), 5)
+        self.assertIsNone(progress.pending_page(self.user.pk, self.text.pk))
+        self.assertEqual(progress.flush(), 0)
+
+    def test_deleted_text_is_skipped(self):
+        gone = TextContent.objects.create(title="Удалённая")
+        progress.record_progress(self.user.pk, gone.pk, 2)
+        progress.record_progress(self.user.pk, self.text.pk, 4)
+        gone.delete()
+        self.assertEqual(progress.flush(), 1)
+        self.assertEqual(self.saved_page(), 4)
+
+
+class OfflineProgressTests(ProgressTestCase):
+    def test_offline_progress_applies_only_newer_records(self):
+        now = timezone.now()
+        progress.record_progress(self.user.pk, self.text.pk, 4)
+        progress.flush()
+
+        # Из нескольких записей об одной статье берётся самая поздняя
+        records = [
+            (self.text.pk, 9, now - timedelta(hours=1)),
+            (self.text.pk, 2, now - timedelta(hours=2)),
+        ]
+        progress.merge_offline_progress(self.user.pk, records)
+        self.assertEqual(self.saved_page(), 4)
+
+        records = [
+            (self.text.pk, 7, now + timedelta(minutes=1)),
+            (self.text.pk, 6, now - timedelta(hours=1)),
+        ]
+        self.assertEqual(progress.merge_offline_progress(self.user.pk, records), 1)
+        self.assertEqual(self.saved_page(), 7)
+
+    def test_offline_progress_and_buffer(self):
+        now = timezone.now()
+        progress.record_progress(self.user.pk, self.text.pk, 4)
+        # Буфер новее — офлайн-запись отбрасывается
+        older = [(self.text.pk, 2, now - timedelta(hours=1))]
+        self.assertEqual(progress.merge_offline_progress(self.user.pk, older), 0)
+        self.assertEqual(progress.pending_page(self.user.pk, self.text.pk), 4)
+
+        # Офлайн-запись новее — буфер её не затирает
+        newer = [(self.text.pk, 8, now + timedelta(minutes=1))]
+        self.assertEqual(progress.merge_offline_progress(self.user.pk, newer), 1)
+        self.assertIsNone(progress.pending_page(self.user.pk, self.text.pk))
+        progress.flush()
+        self.assertEqual(self.saved_page(), 8)
+
+
+class PublishingTests(TestCase):
+    def setUp(self):
+        self.author = make_author("author@example.com")
+        self.category = Category.objects.create(title="Тафсир", slug="tafsir")
+        self.videos = [
+            VideoContent.objects.create(
+                title=f"Видео {i}",
+                author=self.author,
+                category=self.category,
+                embed_code="<iframe></iframe>",
+            )
+            for i in range(3)
+        ]
+        self.texts = [
+            TextContent.objects.create(
+                title=f"Статья {i}", content="<p>Текст</p>", author=self.author
+            )
+            for i in range(2)
+        ]
+
+    def targets(self, videos, texts):
+        return {
+            VideoContent: [video.pk for video in videos],
+            TextContent: [text.pk for text in texts],
+        }
+
+    def test_publish_in_bulk(self):
+        dated = self.videos[0]
+        dated_at = timezone.now() - timedelta(days=3)
+        VideoContent.objects.filter(pk=dated.pk).update(published_at=dated_at)
+        now = timezone.now()
+        received = []
+
+        def receiver(sender, changes, status, **kwargs):
+            received.append({model: len(rows) for model, rows in changes.items()})
+
+        status_changed.connect(receiver)
+        self.addCleanup(status_changed.disconnect, receiver)
+        with mock.patch("main.signals.invalidate_tags") as invalidate:
+            changed = set_status(
+                self.targets(self.videos, self.texts), "published", now
+            )
+
+        self.assertEqual(changed, 5)
+        self.assertEqual(received, [{VideoContent: 3, TextContent: 2}])
+        # Пустая дата публикации заполняется, заданная остаётся
+        self.assertEqual(
+            dict(VideoContent.objects.values_list("pk", "published_at")),
+            {
+                self.videos[0].pk: dated_at,
+                self.videos[1].pk: now,
+                self.videos[2].pk: now,
+            },
+        )
+        self.assertEqual(invalidate.call_count, 1)
+        tags = set(invalidate.call_args.args)
+        self.assertTrue(
+            {"videos", "texts", f"author:{self.author.pk}", f"video:{dated.pk}"} <= tags
+        )
+
+        self.author.refresh_from_db()
+        self.category.refresh_from_db()
+        self.assertEqual(
+            (self.author.videos_published, self.author.texts_published), (3, 2)
+        )
+        self.assertEqual(self.author.content_published, 5)
+        self.assertEqual(self.category.content_published, 3)
+        self.assertEqual(
+            set(ExportJob.objects.values_list("text_id", flat=True)),
+            {text.pk for text in self.texts},
+        )
+        self.assertEqual(len(search_ids("видео", "video", status="published")), 3)
+
+        # Повторно ничего не меняется
+        self.assertEqual(set_status({VideoContent: [dated.pk]}, "published"), 0)
+        self.assertEqual(len(received), 1)
+
+    def test_queries_do_not_grow_with_selection(self):
+        def count(videos, texts):
+            with CaptureQueriesContext(connection) as queries:
+                set_status(self.targets(videos, texts), "archived")
+            return len(queries)
+
+        self.assertEqual(
+            count(self.videos[:1], self.texts[:1]),
+            count(self.videos[1:], self.texts[1:]),
+        )
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            set_status({VideoContent: [self.videos[0].pk]}, "deleted")
+        with self.assertRaises(ValueError):
+            set_status({Category: [self.category.pk]}, "published")
+
+    def test_admin_actions(self):
+        admin_user = User.objects.create_superuser(
+            email="admin@example.com", password="pass"
+        )
+        self.client.force_login(admin_user)
+        url = reverse("admin:materials_videocontent_changelist")
+        selected = [self.videos[0].pk, self.videos[1].pk]
+
+        response = self.client.post(
+            url, {"action": "publish_selected", "_selected_action": selected}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            set(
+                VideoContent.objects.filter(status="published").values_list(
+                    "pk", flat=True
+                )
+            ),
+            set(selected),
+        )
+
+        self.client.post(
+            url, {"action": "archive_selected", "_selected_action": selected[:1]}
+        )
+        self.assertEqual(VideoContent.objects.get(pk=selected[0]).status, "archived")
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.videos_published, 1)
+
+
+class CategoryCacheTests(TestCase):
+    def setUp(self):
+        # Кэш процесса и общий кэш живут дольше одного теста
+        cache.clear()
+        categories._state.update(version=None, categories=None, checked_at=0.0)
+        self.category = Category.objects.create(title="Тафсир", slug="tafsir")
+        Category.objects.create(title="Скрытая", slug="hidden", is_active=False)
+
+    def titles(self):
+        return [
+            category.title for category in categories_processor(None)["menu_categories"]
+        ]
+
+    def test_menu_is_served_from_cache(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.titles(), ["Тафсир"])
+        with self.assertNumQueries(0):
+            self.titles()
+        # Другой процесс берёт список из общего кэша
+        categories._state.update(version=None, categories=None, checked_at=0.0)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.titles(), ["Тафсир"])
+
+    def test_save_and_delete_bump_the_version(self):
+        self.titles()
+        version = cache.get(categories.VERSION_KEY)
+
+        Category.objects.create(title="Акыда", slug="akyda", order=1)
+        self.assertEqual(cache.get(categories.VERSION_KEY), version + 1)
+        self.assertEqual(sorted(self.titles()), ["Акыда", "Тафсир"])
+
+        self.category.is_active = False
+        self.category.save()
+        self.assertEqual(self.titles(), ["Акыда"])
+
+        Category.objects.get(slug="akyda").delete()
+        self.assertEqual(cache.get(categories.VERSION_KEY), version + 3)
+        self.assertEqual(self.titles(), [])
+
+    def test_change_in_another_process(self):
+        self.titles()
+        # Изменение в другом процессе видно только по версии в общем кэше
+        Category.objects.filter(pk=self.category.pk).update(title="Тафсир Корана")
+        cache.incr(categories.VERSION_KEY)
+        self.assertEqual(self.titles(), ["Тафсир"])
+        with self.settings(CATEGORY_CACHE_CHECK_INTERVAL=0):
+            self.assertEqual(self.titles(), ["Тафсир Корана"])
+
+
+class ReaderPagesTests(TestCase):
+    def setUp(self):
+        paragraphs = "".join(
+            f"<p>Абзац {i} " + "текст " * 80 + "</p>" for i in range(40)
+        )
+        self.text = TextContent.objects.create(
+            title="Длинная статья", content=paragraphs, status="published"
+        )
+        self.url = reverse("text_pages", args=[self.text.slug])
+
+    def pages(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["total"], self.text.page_count)
+        return [page["number"] for page in data["pages"]]
+
+    def test_page_and_neighbours(self):
+        total = self.text.page_count
+        self.assertGreaterEqual(total, 8)
+        self.assertEqual(self.pages(), [1, 2])
+        self.assertEqual(self.pages(page=3), [2, 3, 4])
+        self.assertEqual(self.pages(page=3, around=0), [3])
+        self.assertEqual(self.pages(page=total), [total - 1, total])
+        # Не больше READER_MAX_AROUND с каждой стороны
+        self.assertEqual(self.pages(page=1, around=100), [1, 2, 3, 4, 5, 6])
+
+    def test_out_of_range_and_invalid(self):
+        self.assertEqual(self.pages(page=self.text.page_count + 10), [])
+        self.assertEqual(self.pages(page=-5), [])
+        self.assertEqual(self.pages(page=2, around=-3), [2])
+        for params in ({"page": "abc"}, {"page": "1.5"}, {"around": "x"}):
+            with self.subTest(params=params):
+                response = self.client.get(self.url, params)
+                self.assertEqual(response.status_code, 400)
+
+    def test_unpublished_text(self):
+        self.text.status = "draft"
+        self.text.save()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
@@ -6,13 +6,16 @@ urlpatterns = [
     path("videos/<slug:slug>/", views.VideoDetailView.as_view(), name="video_detail"),
     path("audios/", views.AudioListView.as_view(), name="audio_list"),
     path("audios/<slug:slug>/", views.AudioDetailView.as_view(), name="audio_detail"),
+    path("audios/<slug:slug>/file/", views.audio_file, name="audio_file"),
     path("texts/", views.TextListView.as_view(), name="text_list"),
     path("texts/<slug:slug>/reader/", views.reader_view, name="text_reader"),
+    path("texts/<slug:slug>/pages/", views.reader_pages, name="text_pages"),
     path(
         "texts/<slug:slug>/download/<str:format>/",
         views.download_text,
         name="download_text",
     ),
     path("texts/save-progress/", views.save_progress, name="save_progress"),
+    path("texts/sync-progress/", views.sync_progress, name="sync_progress"),
     path("category/<slug:slug>/", views.category_detail, name="category_detail"),
 ]
@@ -1,26 +1,42 @@
-import io
-import re
+import os
 import json
-import time
+from datetime import datetime, timezone as dt_timezone
 
-from weasyprint import HTML
-
-from django.db import transaction, OperationalError
-from django.http import JsonResponse, HttpResponse, Http404
-from django.shortcuts import get_object_or_404, render
-from django.template.loader import render_to_string
+from django.http import JsonResponse, Http404
+from django.shortcuts import get_object_or_404, redirect, render
+from django.utils import timezone
+from django.utils.decorators import method_decorator
 from django.views.generic import ListView, DetailView
 from django.views.decorators.http import require_POST
 from django.contrib.auth.decorators import login_required
 
-from .models import VideoContent, AudioContent, TextContent, Category, ReadingProgress
-
-
-class VideoListView(ListView):
+from main.cache import anonymous_page_cache, tag_page
+
+from .exports import EXPORT_FORMATS, get_export
+from .feed import FEED_PAGE_SIZE, get_feed_page
+from .models import (
+    VideoContent,
+    AudioContent,
+    TextContent,
+    TextPage,
+    TextHeading,
+    Category,
+    ReadingProgress,
+)
+from .categories import get_active_categories
+from .hits import record_hit
+from .pagination import CursorPaginationMixin
+from .progress import merge_offline_progress, pending_page, record_progress
+from .serving import serve_file
+
+
+@method_decorator(anonymous_page_cache("videos"), name="dispatch")
+class VideoListView(CursorPaginationMixin, ListView):
     model = VideoContent
     template_name = "materials/video_list.html"
     context_object_name = "videos"
     paginate_by = 12
+    count_total = True
 
     def get_queryset(self):
         qs = (
@@ -39,7 +55,7 @@ class VideoListView(ListView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["categories"] = Category.objects.filter(is_active=True)
+        context["categories"] = get_active_categories()
         return context
 
 
@@ -48,12 +64,19 @@ class VideoDetailView(DetailView):
     template_name = "materials/video_detail.html"
     context_object_name = "video"
 
+    def get_object(self, queryset=None):
+        video = super().get_object(queryset)
+        record_hit(self.request, video)
+        return video
+
 
-class AudioListView(ListView):
+@method_decorator(anonymous_page_cache("audios"), name="dispatch")
+class AudioListView(CursorPaginationMixin, ListView):
     model = AudioContent
     template_name = "materials/audio_list.html"
     context_object_name = "audios"
     paginate_by = 12
+    count_total = True
 
     def get_queryset(self):
         qs = (
@@ -72,7 +95,7 @@ class AudioListView(ListView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["categories"] = Category.objects.filter(is_active=True)
+        context["categories"] = get_active_categories()
         return context
 
 
@@ -81,12 +104,42 @@ class AudioDetailView(DetailView):
     template_name = "materials/audio_detail.html"
     context_object_name = "audio"
 
-
-class TextListView(ListView):
+    def get_object(self, queryset=None):
+        audio = super().get_object(queryset)
+        record_hit(self.request, audio)
+        return audio
+
+
+def audio_file(request, slug):
+    """Отдаёт аудиофайл потоком, не загружая его в память"""
+    audio = get_object_or_404(AudioContent, slug=slug, status="published")
+    if not audio.audio_file:
+        raise Http404("Audio file is missing")
+    try:
+        path = audio.audio_file.path
+    except NotImplementedError:
+        # Хранилище без локальных путей — отдаём как есть
+        return redirect(audio.audio_file.url)
+    if not os.path.exists(path):
+        raise Http404("Audio file is missing")
+    response = serve_file(request, path)
+
+    # Прослушиванием считаем запрос начала файла, а не перемотку
+    if request.method == "GET" and (
+        response.status_code == 200
+        or response.get("Content-Range", "").startswith("bytes 0-")
+    ):
+        record_hit(request, audio, field="listens_count")
+    return response
+
+
+@method_decorator(anonymous_page_cache("texts"), name="dispatch")
+class TextListView(CursorPaginationMixin, ListView):
     model = TextContent
     template_name = "materials/text_list.html"
     context_object_name = "texts"
     paginate_by = 12
+    count_total = True
 
     def get_queryset(self):
         qs = (
@@ -105,122 +158,163 @@ class TextListView(ListView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["categories"] = Category.objects.filter(is_active=True)
+        context["categories"] = get_active_categories()
         return context
 
 
 # ================== ЧИТАЛКА ==================
+# Сколько соседних страниц можно запросить за один раз
+READER_MAX_AROUND = 5
+
+
+def _reader_pages(text, page, around=1):
+    return list(
+        TextPage.objects.filter(
+            text=text, number__range=(page - around, page + around)
+        ).values("number", "content")
+    )
+
+
 def reader_view(request, slug):
-    text = get_object_or_404(TextContent, slug=slug, status="published")
-    chapter_content = text.content
+    # Полный текст статьи в читалку не передаётся — только нужные страницы
+    text = get_object_or_404(
+        TextContent.objects.defer("content"), slug=slug, status="published"
+    )
+    record_hit(request, text)
     server_page = None
     if request.user.is_authenticated:
-        progress = ReadingProgress.objects.filter(user=request.user, text=text).first()
-        if progress:
-            server_page = progress.page_number
+        server_page = pending_page(request.user.pk, text.pk)
+        if server_page is None:
+            progress = ReadingProgress.objects.filter(
+                user=request.user, text=text
+            ).first()
+            if progress:
+                server_page = progress.page_number
+    chapters = list(
+        TextHeading.objects.filter(text=text).values(
+            "title", "level", "anchor", "page_number"
+        )
+    )
+
+    # Ссылка вида ?chapter=<якорь> открывает статью сразу на нужной главе
+    chapter = request.GET.get("chapter")
+    chapter_page = next(
+        (c["page_number"] for c in chapters if chapter and c["anchor"] == chapter),
+        None,
+    )
+    if chapter_page:
+        start_page = chapter_page
+    elif server_page and server_page <= text.page_count:
+        start_page = server_page
+    else:
+        start_page = 1
     context = {
         "text": text,
-        "chapter_content": chapter_content,
         "server_page": server_page,
+        "start_page": start_page if chapter_page else None,
+        "start_anchor": chapter if chapter_page else None,
         "text_id": text.id,
+        "total_pages": text.page_count,
+        "initial_pages": _reader_pages(text, start_page),
+        "chapters": chapters,
     }
     return render(request, "materials/reader.html", context)
 
 
+def reader_pages(request, slug):
+    """JSON со страницей ``page`` и ``around`` соседними с каждой стороны"""
+    text = get_object_or_404(
+        TextContent.objects.only("id", "page_count"), slug=slug, status="published"
+    )
+    try:
+        page = int(request.GET.get("page", 1))
+        around = int(request.GET.get("around", 1))
+    except ValueError:
+        return JsonResponse({"error": "Invalid page"}, status=400)
+    around = max(0, min(around, READER_MAX_AROUND))
+    return JsonResponse(
+        {"total": text.page_count, "pages": _reader_pages(text, page, around)}
+    )
+
+
 @login_required
 @require_POST
 def save_progress(request):
-    data = json.loads(request.body)
-    text_id = data.get("text_id")
-    page_number = data.get("page_number", 1)
-    text = get_object_or_404(TextContent, pk=text_id)
-
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            with transaction.atomic():
-                ReadingProgress.objects.update_or_create(
-                    user=request.user,
-                    text=text,
-                    defaults={"page_number": page_number},
-                )
-            break 
-        except OperationalError as e:
-            if "database is locked" in str(e) and attempt < max_retries - 1:
-                time.sleep(0.3 * (attempt + 1)) 
-            else:
-                raise  
-
+    try:
+        data = json.loads(request.body)
+        text_id = int(data.get("text_id"))
+        page_number = max(1, int(data.get("page_number", 1)))
+    except (ValueError, TypeError):
+        return JsonResponse({"status": "error"}, status=400)
+
+    # Запись в БД выполняется пакетно в фоне (см. materials.progress)
+    record_progress(request.user.pk, text_id, page_number)
     return JsonResponse({"status": "ok"})
 
 
+# Сколько записей принимает одна синхронизация офлайн-прогресса
+SYNC_PROGRESS_MAX_RECORDS = 500
+
+
+@login_required
+@require_POST
+def sync_progress(request):
+    """Пакетная синхронизация прогресса, накопленного читалкой офлайн"""
+    try:
+        data = json.loads(request.body)
+        now = timezone.now()
+        records = [
+            (
+                int(record["text_id"]),
+                max(1, int(record["page_number"])),
+                # Время клиента из будущего не должно «застолбить» прогресс
+                min(
+                    datetime.fromtimestamp(
+                        int(record["client_timestamp"]) / 1000, tz=dt_timezone.utc
+                    ),
+                    now,
+                ),
+            )
+            for record in data["records"][:SYNC_PROGRESS_MAX_RECORDS]
+        ]
+    except (ValueError, TypeError, KeyError, OverflowError, OSError):
+        return JsonResponse({"status": "error"}, status=400)
+
+    applied = merge_offline_progress(request.user.pk, records)
+    return JsonResponse({"status": "ok", "applied": applied})
+
+
 def download_text(request, slug, format):
     text = get_object_or_404(TextContent, slug=slug, status="published")
+    if format not in EXPORT_FORMATS:
+        raise Http404("Unsupported format")
 
     # Безопасное имя файла из заголовка
     from django.utils.text import slugify as django_slugify
 
     safe_filename = django_slugify(text.title) or text.slug
 
-    if format == "txt":
-        clean = re.sub(r"<[^>]+>", "", text.content)
-        response = HttpResponse(clean, content_type="text/plain; charset=utf-8")
-        response["Content-Disposition"] = f'attachment; filename="{safe_filename}.txt"'
-        return response
-
-    elif format == "pdf":
-        html_str = render_to_string("materials/reader_pdf.html", {"text": text})
-        pdf_file = io.BytesIO()
-        HTML(string=html_str, base_url=request.build_absolute_uri("/")).write_pdf(
-            pdf_file
-        )
-        pdf_file.seek(0)
-        response = HttpResponse(pdf_file.read(), content_type="application/pdf")
-        response["Content-Disposition"] = f'attachment; filename="{safe_filename}.pdf"'
-        return response
-
-    elif format == "epub":
-        try:
-            from ebooklib import epub
-        except ImportError:
-            raise Http404("EPUB generation is not available. Install ebooklib.")
-
-        book = epub.EpubBook()
-        book.set_identifier(f"text-{text.id}")
-        book.set_title(text.title)
-        book.set_language("ru")
-        book.add_author(text.author.user.get_full_name() if text.author else "Unknown")
-
-        chapter = epub.EpubHtml(title=text.title, file_name="content.xhtml", lang="ru")
-        chapter.content = f"<h1>{text.title}</h1>{text.content}"
-        book.add_item(chapter)
-
-        book.toc = (epub.Link("content.xhtml", text.title, "content"),)
-        book.add_item(epub.EpubNcx())
-        book.add_item(epub.EpubNav())
-        book.spine = ["nav", chapter]
-
-        epub_data = io.BytesIO()
-        epub.write_epub(epub_data, book)
-        epub_data.seek(0)
-
-        response = HttpResponse(epub_data.read(), content_type="application/epub+zip")
-        response["Content-Disposition"] = f'attachment; filename="{safe_filename}.epub"'
-        return response
+    try:
+        path = get_export(text, format, base_url=request.build_absolute_uri("/"))
+    except ImportError:
+        raise Http404(f"{format.upper()} generation is not available.")
 
-    else:
-        raise Http404("Unsupported format")
+    return serve_file(
+        request,
+        path,
+        content_type=EXPORT_FORMATS[format],
+        filename=f"{safe_filename}.{format}",
+        as_attachment=True,
+    )
 
 
+@anonymous_page_cache()
 def category_detail(request, slug):
     category = get_object_or_404(Category, slug=slug, is_active=True)
-    videos = VideoContent.objects.filter(category=category, status="published")
-    audios = AudioContent.objects.filter(category=category, status="published")
-    texts = TextContent.objects.filter(category=category, status="published")
+    tag_page(request, f"category:{category.pk}")
+    feed = get_feed_page(FEED_PAGE_SIZE, request.GET.get("after"), category=category)
     context = {
         "category": category,
-        "videos": videos,
-        "audios": audios,
-        "texts": texts,
+        "feed": feed,
     }
     return render(request, "materials/category_detail.html", context)
@@ -0,0 +1,160 @@
+"""Полнотекстовый поиск по ``SearchDocument`` средствами базы данных.
+
+- ``sqlite`` — таблица FTS5 ``search_fts`` поверх строк основ; её
+  заполняют триггеры на ``search_searchdocument`` (миграция 0002),
+  ранжирование — ``bm25`` с большим весом названия;
+- ``postgresql`` — выражение ``to_tsvector('simple', ...)`` с GIN-индексом
+  (та же миграция), ранжирование — ``ts_rank`` по взвешенному вектору;
+- ``basic`` — ``LIKE`` по строкам основ для прочих баз, без ранжирования.
+
+Бэкенд выбирается настройкой ``SEARCH_BACKEND`` (``"auto"`` — по базе).
+Слова запроса приходят группами альтернативных основ (``text.parse_query``):
+группы соединяются через И, варианты внутри группы — через ИЛИ, каждая
+основа ищется как префикс.
+"""
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+
+from .models import SearchDocument
+
+# Во сколько раз совпадение в названии весомее совпадения в тексте
+TITLE_WEIGHT = 5.0
+FILTER_FIELDS = ("status", "kind", "author_id", "category_id")
+
+
+class BaseBackend:
+    def search(self, groups, limit, offset=0, **filters):
+        """id документов по убыванию релевантности"""
+        raise NotImplementedError
+
+    def count(self, groups, **filters):
+        raise NotImplementedError
+
+    def _filters_sql(self, filters, alias="d"):
+        clauses = []
+        params = []
+        for field, value in filters.items():
+            if field not in FILTER_FIELDS:
+                raise ValueError(f"Unsupported search filter: {field}")
+            if value is None:
+                continue
+            clauses.append(f"{alias}.{connection.ops.quote_name(field)} = %s")
+            params.append(value)
+        return "".join(f" AND {clause}" for clause in clauses), params
+
+
+class SqliteBackend(BaseBackend):
+    """FTS5: ``search_fts`` с колонками ``title_terms`` и ``body_terms``"""
+
+    def _match(self, groups):
+        return " AND ".join(
+            "(" + " OR ".join(f'"{variant}"*' for variant in group) + ")"
+            for group in groups
+        )
+
+    def _from(self, groups, filters):
+        where, params = self._filters_sql(filters)
+        sql = (
+            "FROM search_fts JOIN search_searchdocument d "
+            "ON d.id = search_fts.rowid "
+            f"WHERE search_fts MATCH %s{where}"
+        )
+        return sql, [self._match(groups), *params]
+
+    def search(self, groups, limit, offset=0, **filters):
+        sql, params = self._from(groups, filters)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT d.id {sql} "
+                f"ORDER BY bm25(search_fts, {TITLE_WEIGHT}, 1.0), d.published_at DESC "
+                "LIMIT %s OFFSET %s",
+                [*params, limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def count(self, groups, **filters):
+        sql, params = self._from(groups, filters)
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) {sql}", params)
+            return cursor.fetchone()[0]
+
+
+class PostgresBackend(BaseBackend):
+    """``tsvector`` по основам с конфигурацией ``simple``"""
+
+    VECTOR = "to_tsvector('simple', d.title_terms || ' ' || d.body_terms)"
+    RANK = (
+        "ts_rank(setweight(to_tsvector('simple', d.title_terms), 'A') || "
+        "setweight(to_tsvector('simple', d.body_terms), 'B'), "
+        "to_tsquery('simple', %s))"
+    )
+
+    def _tsquery(self, groups):
+        return " & ".join(
+            "(" + " | ".join(f"{variant}:*" for variant in group) + ")"
+            for group in groups
+        )
+
+    def _from(self, groups, filters):
+        where, params = self._filters_sql(filters)
+        sql = (
+            "FROM search_searchdocument d "
+            f"WHERE {self.VECTOR} @@ to_tsquery('simple', %s){where}"
+        )
+        return sql, [self._tsquery(groups), *params]
+
+    def search(self, groups, limit, offset=0, **filters):
+        sql, params = self._from(groups, filters)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT d.id {sql} "
+                f"ORDER BY {self.RANK} DESC, d.published_at DESC "
+                "LIMIT %s OFFSET %s",
+                [*params, self._tsquery(groups), limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def count(self, groups, **filters):
+        sql, params = self._from(groups, filters)
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) {sql}", params)
+            return cursor.fetchone()[0]
+
+
+class BasicBackend(BaseBackend):
+    """Поиск подстрок в основах: медленно на больших объёмах, но везде работает"""
+
+    def _queryset(self, groups, filters):
+        queryset = SearchDocument.objects.filter(
+            **{field: value for field, value in filters.items() if value is not None}
+        )
+        for group in groups:
+            condition = Q()
+            for variant in group:
+                condition |= Q(title_terms__contains=variant)
+                condition |= Q(body_terms__contains=variant)
+            queryset = queryset.filter(condition)
+        return queryset
+
+    def search(self, groups, limit, offset=0, **filters):
+        queryset = self._queryset(groups, filters).order_by("-published_at", "-id")
+        return list(queryset.values_list("id", flat=True)[offset : offset + limit])
+
+    def count(self, groups, **filters):
+        return self._queryset(groups, filters).count()
+
+
+BACKENDS = {
+    "sqlite": SqliteBackend,
+    "postgresql": PostgresBackend,
+    "basic": BasicBackend,
+}
+
+
+def get_backend():
+    name = getattr(settings, "SEARCH_BACKEND", "auto")
+    if name == "auto":
+        name = connection.vendor if connection.vendor in BACKENDS else "basic"
+    return BACKENDS[name]()
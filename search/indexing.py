@@ -0,0 +1,92 @@
+"""Наполнение поискового индекса из материалов."""
+
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+
+from materials.models import AudioContent, TextContent, VideoContent
+
+from .models import SearchDocument
+from .text import plain_text, terms
+
+SEARCH_MODELS = {
+    VideoContent: "video",
+    AudioContent: "audio",
+    TextContent: "text",
+}
+BATCH_SIZE = 200
+
+
+def build_document(instance):
+    """Несохранённый ``SearchDocument`` для материала"""
+    parts = [getattr(instance, "subtitle", ""), instance.description]
+    if isinstance(instance, TextContent):
+        parts.append(plain_text(instance.content))
+    text = "\n".join(part.strip() for part in parts if part and part.strip())
+    return SearchDocument(
+        kind=SEARCH_MODELS[type(instance)],
+        object_id=instance.pk,
+        title=instance.title,
+        slug=instance.slug,
+        text=text,
+        title_terms=terms(instance.title),
+        body_terms=terms(text),
+        status=instance.status,
+        published_at=instance.published_at,
+        author_id=instance.author_id,
+        category_id=instance.category_id,
+    )
+
+
+def index_object(instance):
+    """Добавляет или обновляет документ материала"""
+    document = build_document(instance)
+    existing = (
+        SearchDocument.objects.filter(kind=document.kind, object_id=document.object_id)
+        .values_list("pk", flat=True)
+        .first()
+    )
+    if existing is not None:
+        document.pk = existing
+    document.save()
+    return document
+
+
+def remove_object(model, pk):
+    SearchDocument.objects.filter(kind=SEARCH_MODELS[model], object_id=pk).delete()
+
+
+def set_documents_status(model, pks, status, now):
+    """Статус документов после массовой смены (``materials.publishing``)"""
+    updates = {"status": status}
+    if status == "published":
+        # Так же, как у самих материалов: пустая дата — время публикации
+        updates["published_at"] = Coalesce("published_at", Value(now))
+    return SearchDocument.objects.filter(
+        kind=SEARCH_MODELS[model], object_id__in=pks
+    ).update(**updates)
+
+
+def index_queryset(queryset):
+    """
+    Создаёт документы для материалов ``queryset`` пачками (у них ещё не
+    должно быть документов). Возвращает число документов.
+    """
+    total = 0
+    batch = []
+    for instance in queryset.order_by("pk").iterator(chunk_size=BATCH_SIZE):
+        batch.append(build_document(instance))
+        if len(batch) >= BATCH_SIZE:
+            SearchDocument.objects.bulk_create(batch)
+            total += len(batch)
+            batch = []
+    SearchDocument.objects.bulk_create(batch)
+    return total + len(batch)
+
+
+def rebuild(models=None):
+    """Перестраивает индекс целиком. Возвращает число документов"""
+    total = 0
+    for model in models or SEARCH_MODELS:
+        SearchDocument.objects.filter(kind=SEARCH_MODELS[model]).delete()
+        total += index_queryset(model.objects.all())
+    return total
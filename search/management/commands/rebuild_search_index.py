@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from search.indexing import SEARCH_MODELS, rebuild
+
+
+class Command(BaseCommand):
+    help = "Перестраивает поисковый индекс по всем видео, аудио и статьям"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--kind",
+            choices=sorted(SEARCH_MODELS.values()),
+            action="append",
+            help="Перестроить только материалы этого типа",
+        )
+
+    def handle(self, *args, **options):
+        models = None
+        if options["kind"]:
+            models = [
+                model
+                for model, kind in SEARCH_MODELS.items()
+                if kind in options["kind"]
+            ]
+        total = rebuild(models)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} documents"))
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('accounts', '0002_authors_content_counters'),
+        ('materials', '0008_content_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('video', 'Видео'), ('audio', 'Аудио'), ('text', 'Статья')], max_length=10, verbose_name='Тип')),
+                ('object_id', models.PositiveIntegerField(verbose_name='ID материала')),
+                ('title', models.CharField(max_length=200, verbose_name='Название')),
+                ('slug', models.SlugField(max_length=200, verbose_name='URL-адрес')),
+                ('text', models.TextField(blank=True, verbose_name='Текст')),
+                ('title_terms', models.TextField(blank=True, verbose_name='Основы слов названия')),
+                ('body_terms', models.TextField(blank=True, verbose_name='Основы слов текста')),
+                ('status', models.CharField(max_length=20, verbose_name='Статус')),
+                ('published_at', models.DateTimeField(blank=True, null=True, verbose_name='Дата публикации')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата индексации')),
+                ('author', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='accounts.authors', verbose_name='Автор')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='materials.category', verbose_name='Категория')),
+            ],
+            options={
+                'verbose_name': 'Поисковый документ',
+                'verbose_name_plural': 'Поисковые документы',
+                'indexes': [models.Index(fields=['status', '-published_at'], name='search_sear_status_f8912b_idx')],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_search_document')],
+            },
+        ),
+    ]
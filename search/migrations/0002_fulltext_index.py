@@ -0,0 +1,114 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:20
+
+from django.db import migrations
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE search_fts USING fts5(
+        title_terms, body_terms,
+        content='search_searchdocument', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER search_fts_insert AFTER INSERT ON search_searchdocument BEGIN
+        INSERT INTO search_fts(rowid, title_terms, body_terms)
+        VALUES (new.id, new.title_terms, new.body_terms);
+    END
+    """,
+    """
+    CREATE TRIGGER search_fts_delete AFTER DELETE ON search_searchdocument BEGIN
+        INSERT INTO search_fts(search_fts, rowid, title_terms, body_terms)
+        VALUES ('delete', old.id, old.title_terms, old.body_terms);
+    END
+    """,
+    """
+    CREATE TRIGGER search_fts_update AFTER UPDATE ON search_searchdocument BEGIN
+        INSERT INTO search_fts(search_fts, rowid, title_terms, body_terms)
+        VALUES ('delete', old.id, old.title_terms, old.body_terms);
+        INSERT INTO search_fts(rowid, title_terms, body_terms)
+        VALUES (new.id, new.title_terms, new.body_terms);
+    END
+    """,
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS search_fts_update",
+    "DROP TRIGGER IF EXISTS search_fts_delete",
+    "DROP TRIGGER IF EXISTS search_fts_insert",
+    "DROP TABLE IF EXISTS search_fts",
+]
+POSTGRES_FORWARD = [
+    """
+    CREATE INDEX search_document_fts ON search_searchdocument
+    USING GIN (to_tsvector('simple', title_terms || ' ' || body_terms))
+    """,
+]
+POSTGRES_BACKWARD = ["DROP INDEX IF EXISTS search_document_fts"]
+
+
+def _execute(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        _execute(schema_editor, SQLITE_FORWARD)
+    elif vendor == "postgresql":
+        _execute(schema_editor, POSTGRES_FORWARD)
+
+
+def drop_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        _execute(schema_editor, SQLITE_BACKWARD)
+    elif vendor == "postgresql":
+        _execute(schema_editor, POSTGRES_BACKWARD)
+
+
+def fill_documents(apps, schema_editor):
+    # Основы слов строит текущий стеммер (см. search.text)
+    from search.text import plain_text, terms
+
+    SearchDocument = apps.get_model("search", "SearchDocument")
+    for kind, model_name in (
+        ("video", "VideoContent"),
+        ("audio", "AudioContent"),
+        ("text", "TextContent"),
+    ):
+        model = apps.get_model("materials", model_name)
+        documents = []
+        for item in model.objects.iterator(chunk_size=200):
+            parts = [getattr(item, "subtitle", ""), item.description]
+            if kind == "text":
+                parts.append(plain_text(item.content))
+            text = "\n".join(part.strip() for part in parts if part and part.strip())
+            documents.append(
+                SearchDocument(
+                    kind=kind,
+                    object_id=item.pk,
+                    title=item.title,
+                    slug=item.slug,
+                    text=text,
+                    title_terms=terms(item.title),
+                    body_terms=terms(text),
+                    status=item.status,
+                    published_at=item.published_at,
+                    author_id=item.author_id,
+                    category_id=item.category_id,
+                )
+            )
+        SearchDocument.objects.bulk_create(documents, batch_size=200)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+        migrations.RunPython(fill_documents, migrations.RunPython.noop),
+    ]
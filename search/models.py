@@ -0,0 +1,53 @@
+from django.db import models
+
+from accounts.models import Authors
+from materials.models import Category
+
+
+class SearchDocument(models.Model):
+    """
+    Поисковая копия материала: исходный текст для отрывков и строки основ
+    слов, по которым строится полнотекстовый индекс (``search.backends``).
+    """
+
+    KIND_CHOICES = [
+        ("video", "Видео"),
+        ("audio", "Аудио"),
+        ("text", "Статья"),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, verbose_name="Тип")
+    object_id = models.PositiveIntegerField(verbose_name="ID материала")
+    title = models.CharField(max_length=200, verbose_name="Название")
+    slug = models.SlugField(max_length=200, verbose_name="URL-адрес")
+    text = models.TextField(blank=True, verbose_name="Текст")
+    title_terms = models.TextField(blank=True, verbose_name="Основы слов названия")
+    body_terms = models.TextField(blank=True, verbose_name="Основы слов текста")
+    status = models.CharField(max_length=20, verbose_name="Статус")
+    published_at = models.DateTimeField(
+        null=True, blank=True, verbose_name="Дата публикации"
+    )
+    author = models.ForeignKey(
+        Authors, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Автор"
+    )
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        verbose_name="Категория",
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата индексации")
+
+    class Meta:
+        verbose_name = "Поисковый документ"
+        verbose_name_plural = "Поисковые документы"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["kind", "object_id"], name="unique_search_document"
+            )
+        ]
+        indexes = [models.Index(fields=["status", "-published_at"])]
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.title}"
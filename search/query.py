@@ -0,0 +1,70 @@
+"""Выполнение поисковых запросов: выдача с подсветкой и постраничностью."""
+
+from django.urls import reverse
+
+from materials.feed import DETAIL_URLS
+
+from .backends import get_backend
+from .models import SearchDocument
+from .text import highlight, parse_query, snippet
+
+
+class SearchResults:
+    """
+    Результаты запроса в виде, понятном ``Paginator``: ``count()`` и срезы.
+    Срез выполняет один запрос к индексу и один — за документами.
+    """
+
+    def __init__(self, query, status="published", **filters):
+        self.groups = parse_query(query)
+        self.filters = {"status": status, **filters}
+        self.backend = get_backend()
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = (
+                self.backend.count(self.groups, **self.filters) if self.groups else 0
+            )
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index : index + 1][0]
+        start = index.start or 0
+        stop = self.count() if index.stop is None else index.stop
+        if not self.groups or stop <= start:
+            return []
+        ids = self.backend.search(
+            self.groups, limit=stop - start, offset=start, **self.filters
+        )
+        documents = SearchDocument.objects.in_bulk(ids)
+        return [self._decorate(documents[pk]) for pk in ids if pk in documents]
+
+    def _decorate(self, document):
+        document.url = reverse(
+            DETAIL_URLS[document.kind], kwargs={"slug": document.slug}
+        )
+        document.title_html = highlight(document.title, self.groups)
+        document.snippet_html = snippet(document.text, self.groups)
+        return document
+
+
+def search_ids(query, kind, status=None, author_id=None, limit=1000):
+    """
+    id материалов типа ``kind``, подходящих под запрос (для админки и
+    студии). Фильтры применяются в поиске, до ограничения ``limit``.
+    """
+    groups = parse_query(query)
+    if not groups:
+        return []
+    backend = get_backend()
+    ids = backend.search(
+        groups, limit=limit, kind=kind, status=status, author_id=author_id
+    )
+    return list(
+        SearchDocument.objects.filter(pk__in=ids).values_list("object_id", flat=True)
+    )
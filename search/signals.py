@@ -0,0 +1,73 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.models import Authors
+from courses.models import Course
+from materials.models import AudioContent, TextContent, VideoContent
+from materials.publishing import status_changed
+
+from . import suggest
+from .indexing import index_object, remove_object, set_documents_status
+
+SUGGEST_KINDS = {
+    VideoContent: "video",
+    AudioContent: "audio",
+    TextContent: "text",
+    Course: "course",
+    Authors: "author",
+}
+
+
+@receiver(post_save, sender=VideoContent)
+@receiver(post_save, sender=AudioContent)
+@receiver(post_save, sender=TextContent)
+def update_search_document(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    index_object(instance)
+
+
+@receiver(post_delete, sender=VideoContent)
+@receiver(post_delete, sender=AudioContent)
+@receiver(post_delete, sender=TextContent)
+def delete_search_document(sender, instance, **kwargs):
+    remove_object(sender, instance.pk)
+
+
+@receiver(post_save, sender=VideoContent)
+@receiver(post_save, sender=AudioContent)
+@receiver(post_save, sender=TextContent)
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Authors)
+def update_suggestion(sender, instance, raw=False, **kwargs):
+    # Профиль автора пересохраняется при каждом сохранении пользователя
+    # (accounts.signals), так что смена имени тоже попадает сюда
+    if raw:
+        return
+    kind = SUGGEST_KINDS[sender]
+    suggest.update(kind, instance.pk, suggest.object_suggestion(kind, instance))
+
+
+@receiver(post_delete, sender=VideoContent)
+@receiver(post_delete, sender=AudioContent)
+@receiver(post_delete, sender=TextContent)
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=Authors)
+def delete_suggestion(sender, instance, **kwargs):
+    suggest.update(SUGGEST_KINDS[sender], instance.pk)
+
+
+@receiver(status_changed)
+def update_status_in_search(sender, changes, status, now, **kwargs):
+    items = []
+    for model, rows in changes.items():
+        set_documents_status(model, [row["pk"] for row in rows], status, now)
+        kind = SUGGEST_KINDS[model]
+        for row in rows:
+            suggestion = None
+            if status == "published":
+                suggestion = suggest.content_suggestion(
+                    kind, row["pk"], row["title"], row["slug"], row["views_count"]
+                )
+            items.append((kind, row["pk"], suggestion))
+    suggest.update_many(items)
@@ -0,0 +1,324 @@
+"""Подсказки при наборе: названия материалов и курсов, имена авторов.
+
+Подсказки отвечают из префиксного дерева в памяти процесса, без запросов
+к БД. Каждое слово названия — путь в дереве; узел хранит
+``SUGGEST_NODE_SIZE`` лучших (по популярности) записей своего поддерева,
+поэтому ответ стоит прохода по буквам префикса.
+
+Дерево строится при первом обращении. Сигналы (``search.signals``) меняют
+его на месте и увеличивают версию в общем кэше. Другие процессы сверяют
+версию не чаще раза в ``SUGGEST_CHECK_INTERVAL`` секунд и при расхождении
+строят дерево заново — так же устроен кэш категорий
+(``materials.categories``).
+"""
+
+import threading
+import time
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import reverse
+from pytils.translit import detranslify
+
+from materials.feed import DETAIL_URLS
+
+from .text import CYRILLIC_RE, WORD_RE
+
+VERSION_KEY = "search:suggest:version"
+KIND_LABELS = {
+    "video": "Видео",
+    "audio": "Аудио",
+    "text": "Статья",
+    "course": "Курс",
+    "author": "Автор",
+}
+
+
+def get_node_size():
+    return getattr(settings, "SUGGEST_NODE_SIZE", 20)
+
+
+def get_check_interval():
+    return getattr(settings, "SUGGEST_CHECK_INTERVAL", 5.0)
+
+
+def normalize(text):
+    return text.lower().replace("ё", "е")
+
+
+class Suggestion(NamedTuple):
+    kind: str
+    object_id: int
+    title: str
+    url: str
+    score: int
+
+    @property
+    def key(self):
+        return (self.kind, self.object_id)
+
+    def as_dict(self):
+        return {
+            "title": self.title,
+            "url": self.url,
+            "kind": self.kind,
+            "kind_label": KIND_LABELS[self.kind],
+        }
+
+
+def _rank(suggestion):
+    return (-suggestion.score, suggestion.title)
+
+
+class _Node:
+    __slots__ = ("children", "top", "ends", "stale")
+
+    def __init__(self):
+        self.children = {}
+        self.top = []  # лучшие записи поддерева, по _rank
+        self.ends = set()  # ключи записей, в названии которых слово кончается здесь
+        self.stale = False  # из полного top удаляли — его надо пересобрать
+
+
+class SuggestTrie:
+    """Префиксное дерево слов с лучшими записями в каждом узле"""
+
+    def __init__(self, node_size=None):
+        self.node_size = node_size or get_node_size()
+        self.root = _Node()
+        self.entries = {}
+
+    def _words(self, suggestion):
+        return set(WORD_RE.findall(normalize(suggestion.title)))
+
+    def add(self, suggestion):
+        self.remove(suggestion.key)
+        self.entries[suggestion.key] = suggestion
+        for word in self._words(suggestion):
+            node = self.root
+            for char in word:
+                node = node.children.setdefault(char, _Node())
+                self._offer(node, suggestion)
+            node.ends.add(suggestion.key)
+
+    def _offer(self, node, suggestion):
+        top = node.top
+        if len(top) >= self.node_size and _rank(suggestion) >= _rank(top[-1]):
+            return
+        top.append(suggestion)
+        top.sort(key=_rank)
+        del top[self.node_size :]
+
+    def remove(self, key):
+        suggestion = self.entries.pop(key, None)
+        if suggestion is None:
+            return
+        for word in self._words(suggestion):
+            node = self.root
+            for char in word:
+                node = node.children.get(char)
+                if node is None:
+                    break
+                if suggestion in node.top:
+                    # Неполный top содержал всё поддерево и остаётся точным
+                    node.stale = node.stale or len(node.top) >= self.node_size
+                    node.top.remove(suggestion)
+            else:
+                node.ends.discard(key)
+
+    def _refill(self, node):
+        """Пересобирает ``top`` узла обходом поддерева (после удалений)"""
+        keys = set()
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            keys.update(current.ends)
+            stack.extend(current.children.values())
+        found = (self.entries[key] for key in keys)
+        node.top = sorted(found, key=_rank)[: self.node_size]
+        node.stale = False
+
+    def lookup(self, query, limit=8):
+        """
+        Лучшие записи, в названии которых есть слова, начинающиеся с каждого
+        слова запроса.
+        """
+        words = WORD_RE.findall(normalize(query))
+        if not words:
+            return []
+        # Кандидатов даёт самое длинное слово — его узел самый узкий
+        longest = max(words, key=len)
+        node = self.root
+        for char in longest:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        if node.stale:
+            self._refill(node)
+
+        others = [word for word in words if word is not longest]
+        results = []
+        for suggestion in node.top:
+            if others:
+                title_words = self._words(suggestion)
+                if not all(
+                    any(title_word.startswith(word) for title_word in title_words)
+                    for word in others
+                ):
+                    continue
+            results.append(suggestion)
+            if len(results) >= limit:
+                break
+        return results
+
+
+# ---------- Источники записей ----------
+def content_suggestion(kind, object_id, title, slug, score):
+    url = reverse(DETAIL_URLS[kind], kwargs={"slug": slug})
+    return Suggestion(kind, object_id, title, url, score or 0)
+
+
+def course_suggestion(object_id, title, slug, score):
+    url = reverse("course_detail", kwargs={"slug": slug})
+    return Suggestion("course", object_id, title, url, score or 0)
+
+
+def author_suggestion(object_id, name, score):
+    url = reverse("author_detail", kwargs={"pk": object_id})
+    return Suggestion("author", object_id, name, url, score or 0)
+
+
+def object_suggestion(kind, instance):
+    """Запись для сохранённого объекта; ``None`` — в подсказках его быть не должно"""
+    if kind == "author":
+        name = instance.user.get_full_name().strip()
+        if not instance.show_in_authors_list or not name:
+            return None
+        return author_suggestion(instance.pk, name, instance.total_views)
+    if instance.status != "published":
+        return None
+    if kind == "course":
+        return course_suggestion(
+            instance.pk, instance.title, instance.slug, instance.lessons_count
+        )
+    return content_suggestion(
+        kind, instance.pk, instance.title, instance.slug, instance.views_count
+    )
+
+
+def iter_suggestions():
+    """Все записи для дерева; по запросу на источник"""
+    from accounts.models import Authors
+    from courses.models import Course
+    from materials.models import AudioContent, TextContent, VideoContent
+
+    for kind, model in (
+        ("video", VideoContent),
+        ("audio", AudioContent),
+        ("text", TextContent),
+    ):
+        rows = model.objects.filter(status="published").values_list(
+            "pk", "title", "slug", "views_count"
+        )
+        for pk, title, slug, views in rows.iterator():
+            yield content_suggestion(kind, pk, title, slug, views)
+
+    rows = Course.objects.filter(status="published").values_list(
+        "pk", "title", "slug", "lessons_count"
+    )
+    for pk, title, slug, lessons in rows.iterator():
+        yield course_suggestion(pk, title, slug, lessons)
+
+    rows = Authors.objects.filter(show_in_authors_list=True).values_list(
+        "pk", "user__first_name", "user__last_name", "total_views"
+    )
+    for pk, first_name, last_name, views in rows.iterator():
+        name = f"{first_name} {last_name}".strip()
+        if name:
+            yield author_suggestion(pk, name, views)
+
+
+# ---------- Состояние процесса ----------
+_state = {"trie": None, "version": None, "checked_at": 0.0}
+_lock = threading.Lock()
+
+
+def _get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def get_trie():
+    """Актуальное дерево процесса; при смене версии строится заново"""
+    now = time.monotonic()
+    with _lock:
+        trie = _state["trie"]
+        if trie is not None and now - _state["checked_at"] < get_check_interval():
+            return trie
+
+    version = _get_version()
+    with _lock:
+        if _state["trie"] is not None and _state["version"] == version:
+            _state["checked_at"] = now
+            return _state["trie"]
+
+    trie = SuggestTrie()
+    for suggestion in iter_suggestions():
+        trie.add(suggestion)
+    with _lock:
+        _state.update(trie=trie, version=version, checked_at=now)
+    return trie
+
+
+def suggest(query, limit=8):
+    trie = get_trie()
+    with _lock:
+        results = trie.lookup(query, limit)
+        if not results and not CYRILLIC_RE.search(normalize(query)):
+            # Набрано латиницей — пробуем прочитать как транслит
+            try:
+                results = trie.lookup(detranslify(query), limit)
+            except ValueError:
+                pass
+    return results
+
+
+def _bump_version():
+    """Новая версия для других процессов; ``True`` — наша была актуальной"""
+    try:
+        version = cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), None)
+        return False
+    with _lock:
+        if _state["version"] == version - 1:
+            _state["version"] = version
+            return True
+    return False
+
+
+def update(kind, object_id, suggestion=None):
+    """
+    Заменяет запись ``(kind, object_id)`` на ``suggestion`` (``None`` —
+    удаляет) в дереве процесса и сообщает об изменении остальным.
+    """
+    update_many([(kind, object_id, suggestion)])
+
+
+def update_many(items):
+    """То же для списка ``(kind, object_id, suggestion)`` с одной сменой версии"""
+    with _lock:
+        trie = _state["trie"]
+        if trie is not None:
+            for kind, object_id, suggestion in items:
+                trie.remove((kind, object_id))
+                if suggestion is not None:
+                    trie.add(suggestion)
+    if not _bump_version():
+        # Пропустили чужое изменение — перестроимся при следующем обращении
+        with _lock:
+            _state["checked_at"] = 0.0
@@ -0,0 +1,207 @@
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from accounts.models import User
+from materials.models import TextContent, VideoContent
+
+from . import suggest
+from .query import SearchResults, search_ids
+from .suggest import Suggestion, SuggestTrie
+from .text import parse_query, stem
+
+
+class StemTests(SimpleTestCase):
+    def test_word_forms_share_a_stem(self):
+        for forms in (
+            ("молитва", "молитвы", "молитве", "молитвой"),
+            ("пророк", "пророка", "пророку", "пророков"),
+            ("читать", "читает", "читающий"),
+        ):
+            with self.subTest(forms=forms):
+                self.assertEqual(len({stem(form) for form in forms}), 1)
+        self.assertEqual(stem("Ёлка"), stem("елка"))
+        self.assertEqual(stem("namaz"), "namaz")
+
+    def test_query_words_have_transliterated_alternatives(self):
+        self.assertEqual(parse_query("!!! — ,"), [])
+        # Однобуквенные слова не ищутся
+        self.assertEqual(len(parse_query("о намазе")), 1)
+        self.assertIn(stem("намаз"), parse_query("namaz")[0])
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        # Страница поиска кэшируется для анонимов
+        cache.clear()
+        user = User.objects.create_user(
+            email="author@example.com", password="pass", user_type="author"
+        )
+        self.author = user.author_profile
+        self.text = TextContent.objects.create(
+            title="Время молитвы",
+            content="<p>О том, как совершать <b>намаз</b> в дороге.</p>",
+            author=self.author,
+            status="published",
+        )
+        self.video = VideoContent.objects.create(
+            title="Урок о молитве",
+            author=self.author,
+            embed_code="<iframe></iframe>",
+            status="published",
+        )
+        self.draft = TextContent.objects.create(
+            title="Черновик о молитве", author=self.author
+        )
+
+    def found(self, query, **filters):
+        return {
+            (document.kind, document.object_id)
+            for document in SearchResults(query, **filters)[:10]
+        }
+
+    def test_other_word_forms_are_found(self):
+        expected = {("text", self.text.pk), ("video", self.video.pk)}
+        self.assertEqual(self.found("молитве"), expected)
+        self.assertEqual(self.found("МОЛИТВЫ"), expected)
+        self.assertEqual(self.found("молитвы", kind="text"), {("text", self.text.pk)})
+        self.assertEqual(self.found("молитвы время"), {("text", self.text.pk)})
+        self.assertEqual(SearchResults("молитва").count(), 2)
+
+    def test_transliterated_query(self):
+        self.assertEqual(self.found("namaz"), {("text", self.text.pk)})
+        self.assertEqual(self.found("намазе"), {("text", self.text.pk)})
+
+    def test_index_follows_changes(self):
+        self.assertEqual(search_ids("молитва", "text", status="draft"), [self.draft.pk])
+        self.text.title = "Время поста"
+        self.text.content = "<p>Другое</p>"
+        self.text.save()
+        self.video.delete()
+        self.assertEqual(self.found("молитва"), set())
+        self.assertEqual(self.found("поста"), {("text", self.text.pk)})
+
+    def test_view(self):
+        response = self.client.get(reverse("search"), {"q": "молитве"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["page_obj"].paginator.count, 2)
+        self.assertContains(response, self.text.get_absolute_url())
+
+        for query in ("!!!", "«»—", "   ", "a"):
+            with self.subTest(query=query):
+                response = self.client.get(reverse("search"), {"q": query})
+                self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(reverse("search"), {"q": "молитве", "type": "x"})
+        self.assertEqual(response.context["kind"], None)
+
+
+def entry(object_id, title, score=0, kind="video"):
+    return Suggestion(kind, object_id, title, f"/{kind}/{object_id}/", score)
+
+
+class SuggestTrieTests(SimpleTestCase):
+    def titles(self, trie, query, limit=8):
+        return [suggestion.title for suggestion in trie.lookup(query, limit)]
+
+    def test_prefix_of_any_word_ranked_by_score(self):
+        trie = SuggestTrie(node_size=5)
+        trie.add(entry(1, "Тафсир суры Ясин", 10))
+        trie.add(entry(2, "Краткий тафсир", 30))
+        trie.add(entry(3, "Таджвид", 20))
+        self.assertEqual(
+            self.titles(trie, "таф"), ["Краткий тафсир", "Тафсир суры Ясин"]
+        )
+        self.assertEqual(
+            self.titles(trie, "та"), ["Краткий тафсир", "Таджвид", "Тафсир суры Ясин"]
+        )
+        self.assertEqual(self.titles(trie, "та", limit=1), ["Краткий тафсир"])
+        self.assertEqual(self.titles(trie, "тафсиры"), [])
+        self.assertEqual(self.titles(trie, "  "), [])
+
+    def test_every_query_word_must_match(self):
+        trie = SuggestTrie(node_size=5)
+        trie.add(entry(1, "Тафсир суры Ясин"))
+        trie.add(entry(2, "Тафсир суры Мульк"))
+        self.assertEqual(self.titles(trie, "тафсир яс"), ["Тафсир суры Ясин"])
+        self.assertEqual(self.titles(trie, "ТАФСИР Ё"), [])
+
+    def test_yo_is_normalized(self):
+        trie = SuggestTrie()
+        trie.add(entry(1, "Её путь"))
+        self.assertEqual(self.titles(trie, "ее"), ["Её путь"])
+
+    def test_removal_refills_full_nodes(self):
+        trie = SuggestTrie(node_size=2)
+        for object_id, score in ((1, 30), (2, 20), (3, 10)):
+            trie.add(entry(object_id, f"Лекция {object_id}", score))
+        self.assertEqual(self.titles(trie, "лек"), ["Лекция 1", "Лекция 2"])
+
+        trie.remove(("video", 1))
+        # Третья запись не помещалась в узел и должна вернуться
+        self.assertEqual(self.titles(trie, "лек"), ["Лекция 2", "Лекция 3"])
+
+    def test_add_replaces_the_same_object(self):
+        trie = SuggestTrie()
+        trie.add(entry(1, "Старое название"))
+        trie.add(entry(1, "Новое название"))
+        self.assertEqual(self.titles(trie, "стар"), [])
+        self.assertEqual(self.titles(trie, "назв"), ["Новое название"])
+
+
+class SuggestTests(TestCase):
+    def setUp(self):
+        # Дерево и его версия общие на процесс
+        cache.clear()
+        suggest._state.update(trie=None, version=None, checked_at=0.0)
+        self.user = User.objects.create_user(
+            email="author@example.com",
+            password="pass",
+            user_type="author",
+            first_name="Ахмад",
+            last_name="Хазрат",
+        )
+        self.author = self.user.author_profile
+        self.video = VideoContent.objects.create(
+            title="Тафсир суры Ясин",
+            author=self.author,
+            embed_code="<iframe></iframe>",
+            status="published",
+        )
+        VideoContent.objects.create(
+            title="Тафсир черновик", author=self.author, embed_code="<iframe></iframe>"
+        )
+
+    def titles(self, query):
+        return [suggestion.title for suggestion in suggest.suggest(query)]
+
+    def test_published_materials_and_authors(self):
+        self.assertEqual(self.titles("тафс"), ["Тафсир суры Ясин"])
+        self.assertEqual(self.titles("ахм"), ["Ахмад Хазрат"])
+        # Набор латиницей читается как транслит
+        self.assertEqual(self.titles("tafsir"), ["Тафсир суры Ясин"])
+
+    def test_signals_update_the_built_trie(self):
+        self.assertEqual(self.titles("тафс"), ["Тафсир суры Ясин"])
+
+        self.video.title = "Тафсир суры Мульк"
+        self.video.save()
+        VideoContent.objects.create(
+            title="Таджвид",
+            author=self.author,
+            embed_code="<iframe></iframe>",
+            status="published",
+        )
+        self.assertEqual(self.titles("мульк"), ["Тафсир суры Мульк"])
+        self.assertEqual(self.titles("ясин"), [])
+        self.assertEqual(self.titles("тадж"), ["Таджвид"])
+
+        self.video.delete()
+        self.assertEqual(self.titles("мульк"), [])
+
+    def test_author_rename_with_update_fields(self):
+        self.assertEqual(self.titles("ахм"), ["Ахмад Хазрат"])
+        self.user.first_name = "Юсуф"
+        self.user.save(update_fields=["first_name"])
+        self.assertEqual(self.titles("ахм"), [])
+        self.assertEqual(self.titles("юсуф"), ["Юсуф Хазрат"])
@@ -0,0 +1,210 @@
+"""Разбор текста для поиска: слова, основы, транслитерация, подсветка.
+
+Индекс хранит не слова, а их основы (``stem``): «молитвы», «молитве» и
+«молитвой» дают одну основу «молитв», поэтому запрос находит все формы
+слова. Основы строятся упрощённым стеммером Портера для русского языка
+(алгоритм Snowball); латинские слова только приводятся к нижнему
+регистру. Слово запроса, набранное не в той раскладке алфавита
+(«namaz» вместо «намаз» и наоборот), дополняется вариантом в другой
+азбуке через ``pytils.translit``.
+
+Как и ``materials.reader``, модуль не зависит от моделей: миграция
+``search.0002`` строит им исходный индекс. После изменения стеммера
+индекс пересобирает ``manage.py rebuild_search_index``.
+"""
+
+import re
+from html import escape, unescape
+
+from pytils.translit import detranslify, translify
+
+WORD_RE = re.compile(r"\w+")
+TAG_RE = re.compile(r"<[^>]+>")
+CYRILLIC_RE = re.compile(r"[а-я]")
+VOWELS = "аеиоуыэюя"
+
+# Окончания по шагам алгоритма. Окончания «первой группы» допустимы только
+# после «а» или «я», которые при этом остаются в основе.
+PERFECTIVE_GERUND = (
+    ("в", "вши", "вшись"),
+    ("ив", "ивши", "ившись", "ыв", "ывши", "ывшись"),
+)
+ADJECTIVE = (
+    (),
+    (
+        "ее", "ие", "ые", "ое", "ими", "ыми", "ей", "ий", "ый", "ой", "ем",
+        "им", "ым", "ом", "его", "ого", "ему", "ому", "их", "ых", "ую", "юю",
+        "ая", "яя", "ою", "ею",
+    ),
+)  # fmt: skip
+PARTICIPLE = (
+    ("ем", "нн", "вш", "ющ", "щ"),
+    ("ивш", "ывш", "ующ"),
+)
+REFLEXIVE = ((), ("ся", "сь"))
+VERB = (
+    (
+        "ла", "на", "ете", "йте", "ли", "й", "л", "ем", "н", "ло", "но", "ет",
+        "ют", "ны", "ть", "ешь", "нно",
+    ),
+    (
+        "ила", "ыла", "ена", "ейте", "уйте", "ите", "или", "ыли", "ей", "уй",
+        "ил", "ыл", "им", "ым", "ен", "ило", "ыло", "ено", "ят", "ует", "уют",
+        "ит", "ыт", "ены", "ить", "ыть", "ишь", "ую", "ю",
+    ),
+)  # fmt: skip
+NOUN = (
+    (),
+    (
+        "а", "ев", "ов", "ие", "ье", "е", "иями", "ями", "ами", "еи", "ии",
+        "и", "ией", "ей", "ой", "ий", "й", "иям", "ям", "ием", "ем", "ам",
+        "ом", "о", "у", "ах", "иях", "ях", "ы", "ь", "ию", "ью", "ю", "ия",
+        "ья", "я",
+    ),
+)  # fmt: skip
+SUPERLATIVE = ((), ("ейше", "ейш"))
+DERIVATIONAL = ((), ("ость", "ост"))
+
+
+def _regions(word):
+    """Начала областей RV и R2 алгоритма Snowball"""
+
+    def after_vowel_consonant(start):
+        for i in range(start + 1, len(word)):
+            if word[i] not in VOWELS and word[i - 1] in VOWELS:
+                return i + 1
+        return len(word)
+
+    rv = next((i + 1 for i, char in enumerate(word) if char in VOWELS), len(word))
+    r1 = after_vowel_consonant(0)
+    return rv, after_vowel_consonant(r1)
+
+
+def _cut(word, start, groups):
+    """
+    Отрезает самое длинное окончание из ``groups``, целиком лежащее после
+    ``start``. ``None`` — окончания нет или оно не после «а»/«я».
+    """
+    preceded, plain = groups
+    best = None
+    for ending in (*preceded, *plain):
+        if word.endswith(ending) and len(word) - len(ending) >= start:
+            if best is None or len(ending) > len(best):
+                best = ending
+    if best is None:
+        return None
+    stem = word[: -len(best)]
+    if best in preceded and best not in plain:
+        if len(stem) <= start or stem[-1] not in "ая":
+            return None
+    return stem
+
+
+def stem(word):
+    """Основа русского слова; прочие слова возвращаются как есть"""
+    word = word.lower().replace("ё", "е")
+    if not CYRILLIC_RE.search(word):
+        return word
+    rv, r2 = _regions(word)
+
+    # Шаг 1: деепричастие, иначе возвратность и прилагательное/глагол/сущ.
+    result = _cut(word, rv, PERFECTIVE_GERUND)
+    if result is None:
+        word = _cut(word, rv, REFLEXIVE) or word
+        result = _cut(word, rv, ADJECTIVE)
+        if result is not None:
+            result = _cut(result, rv, PARTICIPLE) or result
+        else:
+            result = _cut(word, rv, VERB)
+            if result is None:
+                result = _cut(word, rv, NOUN)
+    word = result if result is not None else word
+
+    # Шаг 2
+    if word.endswith("и") and len(word) - 1 >= rv:
+        word = word[:-1]
+    # Шаг 3
+    word = _cut(word, max(r2, rv), DERIVATIONAL) or word
+    # Шаг 4
+    if word.endswith("нн") and len(word) - 2 >= rv:
+        word = word[:-1]
+    else:
+        shorter = _cut(word, rv, SUPERLATIVE)
+        if shorter is not None:
+            word = shorter
+            if word.endswith("нн"):
+                word = word[:-1]
+        elif word.endswith("ь") and len(word) - 1 >= rv:
+            word = word[:-1]
+    return word
+
+
+def plain_text(html):
+    """Текст без тегов; границы тегов становятся пробелами"""
+    return unescape(TAG_RE.sub(" ", html or ""))
+
+
+def words(text):
+    return WORD_RE.findall(text.lower())
+
+
+def terms(text):
+    """Строка основ для индекса"""
+    return " ".join(stem(word) for word in words(text))
+
+
+def alternatives(word):
+    """Основы слова запроса: своя и в другой азбуке"""
+    variants = {stem(word)}
+    try:
+        if CYRILLIC_RE.search(word):
+            variants.add(translify(stem(word)).lower())
+        else:
+            variants.add(stem(detranslify(word)))
+    except ValueError:
+        pass
+    return sorted(variant for variant in variants if WORD_RE.fullmatch(variant))
+
+
+def parse_query(query, max_words=8):
+    """
+    Слова запроса как список групп альтернативных основ. Однобуквенные
+    слова пропускаются: как префикс они совпадают почти со всем.
+    """
+    significant = [word for word in words(query) if len(word) > 1]
+    return [alternatives(word) for word in significant[:max_words]]
+
+
+def _matches(word, groups):
+    word_stem = stem(word)
+    return any(word_stem.startswith(variant) for group in groups for variant in group)
+
+
+def highlight(text, groups):
+    """HTML: ``text`` с найденными словами в ``<mark>``"""
+    parts = []
+    position = 0
+    for match in WORD_RE.finditer(text):
+        if _matches(match.group(), groups):
+            parts.append(escape(text[position : match.start()]))
+            parts.append(f"<mark>{escape(match.group())}</mark>")
+            position = match.end()
+    parts.append(escape(text[position:]))
+    return "".join(parts)
+
+
+def snippet(text, groups, size=30):
+    """Отрывок из ``size`` слов вокруг первого найденного слова, с подсветкой"""
+    found = list(WORD_RE.finditer(text))
+    if not found:
+        return ""
+    first = next(
+        (i for i, match in enumerate(found) if _matches(match.group(), groups)), 0
+    )
+    start = max(first - size // 3, 0)
+    end = min(start + size, len(found))
+    fragment = text[found[start].start() : found[end - 1].end()]
+    fragment = " ".join(fragment.split())
+    prefix = "… " if start > 0 else ""
+    suffix = " …" if end < len(found) else ""
+    return f"{prefix}{highlight(fragment, groups)}{suffix}"
@@ -0,0 +1,49 @@
+from django.core.paginator import Paginator
+from django.http import JsonResponse
+from django.shortcuts import render
+from django.views.decorators.http import require_GET
+
+from main.cache import anonymous_page_cache
+
+from . import suggest as suggestions
+from .models import SearchDocument
+from .query import SearchResults
+
+SEARCH_PAGE_SIZE = 10
+MAX_QUERY_LENGTH = 200
+SUGGEST_LIMIT = 8
+
+
+@anonymous_page_cache("videos", "audios", "texts")
+def search(request):
+    """Поиск по видео, аудио и статьям"""
+    query = request.GET.get("q", "").strip()[:MAX_QUERY_LENGTH]
+    kind = request.GET.get("type")
+    kinds = dict(SearchDocument.KIND_CHOICES)
+    if kind not in kinds:
+        kind = None
+
+    page_obj = None
+    if query:
+        results = SearchResults(query, kind=kind)
+        page_obj = Paginator(results, SEARCH_PAGE_SIZE).get_page(
+            request.GET.get("page")
+        )
+
+    context = {
+        "query": query,
+        "kind": kind,
+        "kinds": kinds,
+        "page_obj": page_obj,
+    }
+    return render(request, "search/results.html", context)
+
+
+@require_GET
+def suggest(request):
+    """Подсказки при наборе: JSON из дерева в памяти, без запросов к БД"""
+    query = request.GET.get("q", "").strip()[:MAX_QUERY_LENGTH]
+    results = suggestions.suggest(query, SUGGEST_LIMIT) if query else []
+    return JsonResponse(
+        {"query": query, "results": [result.as_dict() for result in results]}
+    )
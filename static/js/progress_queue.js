@@ -0,0 +1,100 @@
+// static/js/progress_queue.js
+// Очередь прогресса чтения, накопленного офлайн. Хранится в IndexedDB,
+// поэтому доступна и читалке, и service worker'у (через importScripts).
+
+(function (scope) {
+    const DB_NAME = 'jamig-reader';
+    const DB_VERSION = 1;
+    const SYNC_TAG = 'sync-reading-progress';
+
+    function openDb() {
+        return new Promise((resolve, reject) => {
+            const request = indexedDB.open(DB_NAME, DB_VERSION);
+            request.onupgradeneeded = () => {
+                const db = request.result;
+                if (!db.objectStoreNames.contains('progress')) {
+                    // Одна запись на статью: новая перезаписывает старую
+                    db.createObjectStore('progress', { keyPath: 'text_id' });
+                }
+                if (!db.objectStoreNames.contains('meta')) {
+                    db.createObjectStore('meta');
+                }
+            };
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => reject(request.error);
+        });
+    }
+
+    // Выполняет callback(store) в транзакции; результат запроса — после commit
+    function withStore(name, mode, callback) {
+        return openDb().then(db => new Promise((resolve, reject) => {
+            const tx = db.transaction(name, mode);
+            const result = callback(tx.objectStore(name));
+            tx.oncomplete = () => {
+                db.close();
+                resolve(result instanceof IDBRequest ? result.result : result);
+            };
+            tx.onerror = () => {
+                db.close();
+                reject(tx.error);
+            };
+        }));
+    }
+
+    function enqueue(record) {
+        return withStore('progress', 'readwrite', store => store.put(record));
+    }
+
+    // CSRF-токен и адрес синхронизации нужны service worker'у,
+    // у которого нет доступа к cookie страницы
+    function setMeta(meta) {
+        return withStore('meta', 'readwrite', store => store.put(meta, 'config'));
+    }
+
+    function flush() {
+        return Promise.all([
+            withStore('progress', 'readonly', store => store.getAll()),
+            withStore('meta', 'readonly', store => store.get('config')),
+        ]).then(([records, meta]) => {
+            if (!records.length || !meta) return;
+            return fetch(meta.syncUrl, {
+                method: 'POST',
+                credentials: 'same-origin',
+                // Редирект на логин — не успех: запись останется в очереди
+                redirect: 'manual',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-CSRFToken': meta.csrfToken,
+                },
+                body: JSON.stringify({ records: records }),
+            }).then(response => {
+                if (!response.ok) throw new Error('Progress sync failed: ' + response.status);
+                // Удаляем только то, что не успело обновиться за время запроса
+                return withStore('progress', 'readwrite', store => {
+                    records.forEach(sent => {
+                        const request = store.get(sent.text_id);
+                        request.onsuccess = () => {
+                            const current = request.result;
+                            if (current && current.client_timestamp === sent.client_timestamp) {
+                                store.delete(sent.text_id);
+                            }
+                        };
+                    });
+                });
+            });
+        });
+    }
+
+    // Просит браузер выполнить flush при появлении сети (Background Sync);
+    // без его поддержки — по событию online на странице
+    function requestSync() {
+        if ('serviceWorker' in navigator && 'SyncManager' in scope) {
+            return navigator.serviceWorker.ready
+                .then(registration => registration.sync.register(SYNC_TAG));
+        }
+        scope.addEventListener('online', () => flush().catch(() => { }), { once: true });
+        return Promise.resolve();
+    }
+
+    scope.ProgressQueue = { SYNC_TAG, enqueue, setMeta, flush, requestSync };
+})(self);
@@ -1,14 +1,21 @@
 // static/js/reader.js
 
 class BookReader {
-    constructor(htmlContent, config) {
-        this.pages = [];
-        this.chapters = [];          // { title, startPage }
+    constructor(initialPages, chapters, config) {
+        // Страницы режутся на сервере; здесь только кэш загруженных
+        this.pages = new Map();      // номер страницы -> HTML
+        this.pending = new Map();    // номер страницы -> Promise загрузки
+        this.chapters = [];          // { title, level, anchor, startPage }
         this.currentPage = 1;
-        this.totalPages = 1;
+        this.totalPages = Math.max(1, config.totalPages || 1);
         this.textId = config.textId;
         this.serverPage = config.serverPage;
+        this.startPage = config.startPage;
+        this.startAnchor = config.startAnchor;
+        this.pagesUrl = config.pagesUrl;
         this.saveUrl = config.saveUrl;
+        this.syncUrl = config.syncUrl;
+        this.isAuthenticated = config.isAuthenticated;
         this.saveTimeout = null;
 
         this.viewport = document.getElementById('viewport');
@@ -29,8 +36,15 @@ class BookReader {
         this.lineHeight = this._loadSetting('reader_lineHeight', 1.8);
 
         this.applySettings();
-        this.loadContent(htmlContent);
+        this.storePages(initialPages);
+        this.buildChapters(chapters);
         this.bindEvents();
+        this.goToPage(this.determineStartPage(), this.startAnchor);
+
+        // Досылаем то, что осталось в очереди с прошлого офлайн-чтения
+        if (this.isAuthenticated && navigator.onLine && window.ProgressQueue) {
+            ProgressQueue.flush().catch(() => { });
+        }
     }
 
     _loadSetting(key, defaultValue) {
@@ -52,54 +66,46 @@ class BookReader {
         this.fontSizeDisplay.textContent = Math.round(100 * this.fontSize / 18) + '%';
     }
 
-    loadContent(html) {
-        // Удаляем все HTML-теги, кроме заголовочных (h1-h3), чтобы потом найти главы
-        // Но сохраняем структуру для пагинации.
-        const testDiv = document.createElement('div');
-        testDiv.style.cssText = `
-            position: absolute; visibility: hidden;
-            width: ${this.pageContent.clientWidth}px;
-            font-size: var(--reader-font-size);
-            line-height: var(--reader-line-height);
-            white-space: pre-wrap; word-wrap: break-word;
-        `;
-        document.body.appendChild(testDiv);
-
-        const pageHeight = this.pageContent.clientHeight;
-        let remaining = html;
-        this.pages = [];
-
-        while (remaining.length > 0) {
-            const midDiv = document.createElement('div');
-            midDiv.style.cssText = testDiv.style.cssText;
-            document.body.appendChild(midDiv);
-
-            let low = 0, high = remaining.length, best = 0;
-            while (low <= high) {
-                const mid = Math.floor((low + high) / 2);
-                midDiv.innerHTML = remaining.substring(0, mid);
-                if (midDiv.scrollHeight <= pageHeight) {
-                    best = mid;
-                    low = mid + 1;
-                } else {
-                    high = mid - 1;
+    storePages(pages) {
+        (pages || []).forEach(page => this.pages.set(page.number, page.content));
+    }
+
+    // Загружает страницу вместе с соседними, если её ещё нет в кэше
+    fetchPage(page, around = 2) {
+        if (this.pages.has(page)) return Promise.resolve();
+        if (this.pending.has(page)) return this.pending.get(page);
+
+        const url = `${this.pagesUrl}?page=${page}&around=${around}`;
+        const request = fetch(url, { headers: { 'Accept': 'application/json' } })
+            .then(response => response.json())
+            .then(data => {
+                if (data.total) this.totalPages = data.total;
+                this.storePages(data.pages);
+            })
+            .finally(() => {
+                for (let n = page - around; n <= page + around; n++) {
+                    this.pending.delete(n);
                 }
-            }
-            this.pages.push(remaining.substring(0, best));
-            remaining = remaining.substring(best).trimStart();
-            document.body.removeChild(midDiv);
+            });
+        for (let n = page - around; n <= page + around; n++) {
+            if (!this.pages.has(n)) this.pending.set(n, request);
         }
+        return request;
+    }
 
-        document.body.removeChild(testDiv);
-        if (this.pages.length === 0) this.pages = [''];
-
-        this.totalPages = this.pages.length;
-        this.currentPage = this.determineStartPage();
-        this.buildChapters();       // строим список глав после пагинации
-        this.updatePage();
+    prefetchNeighbours() {
+        [this.currentPage + 1, this.currentPage - 1].forEach(page => {
+            if (page >= 1 && page <= this.totalPages && !this.pages.has(page)) {
+                this.fetchPage(page).catch(() => { });
+            }
+        });
     }
 
     determineStartPage() {
+        // Переход по ссылке на главу важнее сохранённого прогресса
+        if (this.startPage && this.startPage >= 1 && this.startPage <= this.totalPages) {
+            return this.startPage;
+        }
         if (this.serverPage && this.serverPage >= 1 && this.serverPage <= this.totalPages) {
             return this.serverPage;
         }
@@ -112,30 +118,15 @@ class BookReader {
     }
 
     // --- Работа с главами ---
-    buildChapters() {
-        this.chapters = [];
-        // Регулярное выражение для поиска заголовков h1, h2, h3 (открывающий тег)
-        const headingRegex = /<h[123][^>]*>(.*?)<\/h[123]>/i;
-
-        this.pages.forEach((pageContent, index) => {
-            const match = pageContent.match(headingRegex);
-            if (match) {
-                // Извлекаем текст заголовка, убирая возможные HTML-теги внутри
-                const tempDiv = document.createElement('div');
-                tempDiv.innerHTML = match[1];
-                const title = tempDiv.textContent.trim();
-                if (title) {
-                    this.chapters.push({
-                        title: title,
-                        startPage: index + 1   // страницы нумеруются с 1
-                    });
-                }
-            }
-        });
-
-        // Обновляем модальное окно с главами, если оно открыто
+    // Оглавление строится на сервере при сохранении статьи
+    buildChapters(chapters) {
+        this.chapters = (chapters || []).map(chapter => ({
+            title: chapter.title,
+            level: chapter.level,
+            anchor: chapter.anchor,
+            startPage: chapter.page_number,
+        }));
         this.renderChaptersList();
-        // Если мы на какой-то странице, можно подсветить текущую главу (опционально)
     }
 
     renderChaptersList() {
@@ -148,9 +139,10 @@ class BookReader {
         this.chapters.forEach((chapter, idx) => {
             const li = document.createElement('li');
             li.className = 'list-group-item list-group-item-action';
+            li.style.paddingLeft = `${(chapter.level || 1)}rem`;
             li.textContent = chapter.title;
             li.addEventListener('click', () => {
-                this.goToPage(chapter.startPage);
+                this.goToPage(chapter.startPage, chapter.anchor);
                 this.closeChaptersModal();
             });
             // Подсветка текущей главы
@@ -181,7 +173,8 @@ class BookReader {
     // -----------------------
 
     updatePage() {
-        this.pageContent.innerHTML = this.pages[this.currentPage - 1] || '';
+        this.pageContent.innerHTML = this.pages.get(this.currentPage) || '';
+        this.pageContent.scrollTop = 0;
         this.currentPageSpan.textContent = this.currentPage;
         this.totalPagesSpan.textContent = this.totalPages;
         this.prevBtn.disabled = this.currentPage <= 1;
@@ -191,6 +184,7 @@ class BookReader {
         if (this.chaptersModal && this.chaptersModal.style.display === 'block') {
             this.renderChaptersList();
         }
+        this.prefetchNeighbours();
     }
 
     saveProgress() {
@@ -198,39 +192,60 @@ class BookReader {
 
         if (this.saveTimeout) clearTimeout(this.saveTimeout);
         this.saveTimeout = setTimeout(() => {
-            if (this.saveUrl && navigator.onLine) {
-                fetch(this.saveUrl, {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json',
-                        'X-CSRFToken': getCookie('csrftoken'),
-                    },
-                    body: JSON.stringify({
-                        text_id: this.textId,
-                        page_number: this.currentPage,
-                    }),
-                }).catch(() => { });
+            if (!this.saveUrl || !this.isAuthenticated) return;
+            const record = {
+                text_id: this.textId,
+                page_number: this.currentPage,
+                client_timestamp: Date.now(),
+            };
+            if (!navigator.onLine) {
+                this.queueOffline(record);
+                return;
             }
+            fetch(this.saveUrl, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-CSRFToken': getCookie('csrftoken'),
+                },
+                body: JSON.stringify(record),
+            })
+                .then(response => { if (!response.ok) throw new Error(response.status); })
+                .catch(() => this.queueOffline(record));
         }, 800);
     }
 
-    goToPage(page) {
+    // Прогресс без сети уходит в очередь и отправляется одним запросом
+    // при восстановлении соединения (см. progress_queue.js)
+    queueOffline(record) {
+        if (!window.ProgressQueue || !this.syncUrl) return;
+        ProgressQueue.setMeta({ csrfToken: getCookie('csrftoken'), syncUrl: this.syncUrl })
+            .then(() => ProgressQueue.enqueue(record))
+            .then(() => ProgressQueue.requestSync())
+            .catch(() => { });
+    }
+
+    goToPage(page, anchor) {
         if (page < 1 || page > this.totalPages) return;
-        this.currentPage = page;
-        this.updatePage();
+        this.fetchPage(page)
+            .then(() => {
+                this.currentPage = page;
+                this.updatePage();
+                if (anchor) {
+                    const target = document.getElementById(anchor);
+                    if (target) target.scrollIntoView();
+                }
+            })
+            .catch(() => { });
     }
 
     nextPage() { if (this.currentPage < this.totalPages) this.goToPage(this.currentPage + 1); }
     prevPage() { if (this.currentPage > 1) this.goToPage(this.currentPage - 1); }
 
     changeFontSize(delta) {
-        const fraction = (this.currentPage - 1) / (this.totalPages || 1);
         this.fontSize = Math.max(12, Math.min(32, this.fontSize + delta));
         this._saveSetting('reader_fontSize', this.fontSize);
         this.applySettings();
-        const allHtml = this.pages.join(' ');
-        this.loadContent(allHtml);
-        this.goToPage(Math.max(1, Math.round(fraction * this.totalPages)));
     }
 
     bindEvents() {
@@ -272,14 +287,6 @@ class BookReader {
             if (e.key === 'ArrowRight') { e.preventDefault(); this.nextPage(); }
             if (e.key === 'ArrowLeft') { e.preventDefault(); this.prevPage(); }
         });
-
-        // Ресайз
-        window.addEventListener('resize', () => {
-            const fraction = (this.currentPage - 1) / (this.totalPages || 1);
-            const allHtml = this.pages.join(' ');
-            this.loadContent(allHtml);
-            this.goToPage(Math.max(1, Math.round(fraction * this.totalPages)));
-        });
     }
 }
 
@@ -299,7 +306,9 @@ function getCookie(name) {
 }
 
 document.addEventListener('DOMContentLoaded', () => {
-    if (window.READER_CONTENT) {
+    const initialPages = document.getElementById('reader-initial-pages');
+    const chapters = document.getElementById('reader-chapters');
+    if (initialPages && window.READER_CONFIG) {
         const savedTheme = localStorage.getItem('reader_theme') || 'light';
         if (savedTheme !== 'light') {
             document.body.classList.add(savedTheme + '-theme');
@@ -307,6 +316,10 @@ document.addEventListener('DOMContentLoaded', () => {
             if (activeBtn) activeBtn.classList.add('active');
             document.querySelector('.theme-btn[data-theme="light"]')?.classList.remove('active');
         }
-        window.reader = new BookReader(window.READER_CONTENT, window.READER_CONFIG);
+        window.reader = new BookReader(
+            JSON.parse(initialPages.textContent),
+            chapters ? JSON.parse(chapters.textContent) : [],
+            window.READER_CONFIG,
+        );
     }
 });
\ No newline at end of file
@@ -1,9 +1,12 @@
 // static/service-worker.js
 
-const CACHE_NAME = 'jamig-reader-v2';
+importScripts('/static/js/progress_queue.js');
+
+const CACHE_NAME = 'jamig-reader-v3';
 const ASSETS_TO_CACHE = [
     '/static/css/reader.css',
     '/static/js/reader.js',
+    '/static/js/progress_queue.js',
     '/static/css/style.css',
     '/static/css/studio.css',    // если понадобится в офлайне
     // можно добавить другие важные ресурсы
@@ -30,13 +33,22 @@ self.addEventListener('activate', (event) => {
     );
 });
 
+// Background Sync: прогресс, накопленный офлайн, уходит одним запросом
+self.addEventListener('sync', (event) => {
+    if (event.tag === ProgressQueue.SYNC_TAG) {
+        event.waitUntil(ProgressQueue.flush());
+    }
+});
+
 // Стратегия: для HTML‑страниц (читалка) – Network First,
 // для статики – Cache First
 self.addEventListener('fetch', (event) => {
     const url = new URL(event.request.url);
 
-    // Страницы читалки – пытаемся загрузить с сервера, при ошибке отдаём кэш
-    if (event.request.mode === 'navigate' && url.pathname.includes('/texts/')) {
+    // Страницы читалки и подгружаемые ими страницы статьи –
+    // пытаемся загрузить с сервера, при ошибке отдаём кэш
+    const isReaderPage = event.request.mode === 'navigate' || url.pathname.endsWith('/pages/');
+    if (event.request.method === 'GET' && isReaderPage && url.pathname.includes('/texts/')) {
         event.respondWith(
             fetch(event.request)
                 .then(response => {
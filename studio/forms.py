@@ -1,7 +1,15 @@
 from django import forms
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.forms import BaseModelFormSet
+from django.utils.functional import cached_property
+
 from courses.models import Course, Lesson
 from materials.models import VideoContent, AudioContent, TextContent
 
+# Поле урока -> модель материала
+LESSON_MATERIALS = {"video": VideoContent, "audio": AudioContent, "text": TextContent}
+
 
 class VideoContentForm(forms.ModelForm):
     class Meta:
@@ -14,6 +22,7 @@ class VideoContentForm(forms.ModelForm):
             "thumbnail",
             "is_live",
             "status",
+            "published_at",
         ]
         widgets = {
             "title": forms.TextInput(
@@ -29,6 +38,9 @@ class VideoContentForm(forms.ModelForm):
             "thumbnail": forms.ClearableFileInput(attrs={"class": "form-control"}),
             "is_live": forms.CheckboxInput(attrs={"class": "form-check-input"}),
             "status": forms.Select(attrs={"class": "form-select"}),
+            "published_at": forms.DateTimeInput(
+                attrs={"class": "form-control", "type": "datetime-local"}
+            ),
         }
 
 
@@ -42,6 +54,7 @@ class AudioContentForm(forms.ModelForm):
             "category",
             "cover_image",
             "status",
+            "published_at",
         ]
         widgets = {
             "title": forms.TextInput(
@@ -54,6 +67,9 @@ class AudioContentForm(forms.ModelForm):
             "category": forms.Select(attrs={"class": "form-select"}),
             "cover_image": forms.ClearableFileInput(attrs={"class": "form-control"}),
             "status": forms.Select(attrs={"class": "form-select"}),
+            "published_at": forms.DateTimeInput(
+                attrs={"class": "form-control", "type": "datetime-local"}
+            ),
         }
 
 
@@ -68,6 +84,7 @@ class TextContentForm(forms.ModelForm):
             "cover_image",
             "category",
             "status",
+            "published_at",
         ]
         widgets = {
             "title": forms.TextInput(
@@ -87,6 +104,9 @@ class TextContentForm(forms.ModelForm):
             "category": forms.Select(attrs={"class": "form-select"}),
             "cover_image": forms.ClearableFileInput(attrs={"class": "form-control"}),
             "status": forms.Select(attrs={"class": "form-select"}),
+            "published_at": forms.DateTimeInput(
+                attrs={"class": "form-control", "type": "datetime-local"}
+            ),
         }
 
 
@@ -112,10 +132,55 @@ class CourseForm(forms.ModelForm):
         }
 
 
+class MaterialChoiceField(forms.ModelChoiceField):
+    """
+    Материал урока. Если формсет заранее загрузил выбранные материалы
+    (``materials`` — ``{pk: материал}``), значение ищется там, без запроса.
+    """
+
+    materials = None
+
+    def to_python(self, value):
+        if self.materials is None:
+            return super().to_python(value)
+        if value in self.empty_values:
+            return None
+        if isinstance(value, models.Model):
+            value = value.pk
+        try:
+            return self.materials[int(value)]
+        except (KeyError, TypeError, ValueError):
+            raise ValidationError(
+                self.error_messages["invalid_choice"], code="invalid_choice"
+            )
+
+
+class LessonChoiceField(forms.ModelChoiceField):
+    """
+    id урока в формсете уроков: ищется среди уроков курса, которые формсет
+    уже загрузил (``lessons`` — ``{pk: урок}``), а не запросом на форму.
+    """
+
+    lessons = None
+
+    def to_python(self, value):
+        if self.lessons is None:
+            return super().to_python(value)
+        if value in self.empty_values:
+            return None
+        try:
+            return self.lessons[int(value)]
+        except (KeyError, TypeError, ValueError):
+            raise ValidationError(
+                self.error_messages["invalid_choice"], code="invalid_choice"
+            )
+
+
 class LessonForm(forms.ModelForm):
     class Meta:
         model = Lesson
         fields = ["title", "description", "order", "video", "audio", "text"]
+        field_classes = {field: MaterialChoiceField for field in LESSON_MATERIALS}
         widgets = {
             "title": forms.TextInput(
                 attrs={"class": "form-control", "placeholder": "Название урока"}
@@ -138,3 +203,66 @@ class LessonForm(forms.ModelForm):
         self.fields["video"].queryset = VideoContent.objects.none()
         self.fields["audio"].queryset = AudioContent.objects.none()
         self.fields["text"].queryset = TextContent.objects.none()
+
+    def _get_validation_exclusions(self):
+        # Материалы уже проверены полем (только материалы автора); проверка
+        # ForeignKey моделью стоила бы ещё запрос на каждый материал урока
+        exclude = super()._get_validation_exclusions()
+        exclude.update(LESSON_MATERIALS)
+        return exclude
+
+
+class BaseLessonFormSet(BaseModelFormSet):
+    """
+    Уроки курса. Материалы, выбранные во всех уроках, загружаются одним
+    запросом ``IN`` на тип и только среди материалов ``author``.
+    """
+
+    def __init__(self, *args, author=None, **kwargs):
+        self.author = author
+        super().__init__(*args, **kwargs)
+
+    @cached_property
+    def selected_materials(self):
+        """``{поле: {pk: материал}}`` для отправленных значений"""
+        selected = {}
+        for field, model in LESSON_MATERIALS.items():
+            ids = set()
+            for i in range(self.total_form_count()):
+                value = self.data.get(f"{self.add_prefix(i)}-{field}", "")
+                if str(value).isdigit():
+                    ids.add(int(value))
+            materials = {}
+            if ids and self.author is not None:
+                materials = (
+                    model.objects.filter(author=self.author, pk__in=ids)
+                    .only("id", "title", "status")
+                    .in_bulk()
+                )
+            selected[field] = materials
+        return selected
+
+    @cached_property
+    def existing_lessons(self):
+        """``{pk: урок}`` уроков курса из ``queryset`` формсета"""
+        return {lesson.pk: lesson for lesson in self.get_queryset()}
+
+    def _construct_form(self, i, **kwargs):
+        form = super()._construct_form(i, **kwargs)
+        if self.is_bound:
+            for field, materials in self.selected_materials.items():
+                form.fields[field].materials = materials
+        return form
+
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+        if self.is_bound:
+            name = self.model._meta.pk.name
+            field = form.fields[name]
+            form.fields[name] = LessonChoiceField(
+                field.queryset,
+                initial=field.initial,
+                required=False,
+                widget=field.widget,
+            )
+            form.fields[name].lessons = self.existing_lessons
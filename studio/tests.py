@@ -1,3 +1,104 @@
+from datetime import timedelta
+
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from materials.models import TextContent, VideoContent
+from search.query import search_ids
+
+
+def make_author(email):
+    user = User.objects.create_user(email=email, password="pass", user_type="author")
+    return user.author_profile
+
+
+class MaterialPickerTests(TestCase):
+    def setUp(self):
+        self.author = make_author("author@example.com")
+        self.other = make_author("other@example.com")
+        for i in range(5):
+            VideoContent.objects.create(
+                title=f"Тафсир суры {i}",
+                slug=f"other-{i}",
+                author=self.other,
+                embed_code="<iframe></iframe>",
+            )
+        self.own = VideoContent.objects.create(
+            title="Тафсир суры Ясин",
+            slug="own",
+            author=self.author,
+            embed_code="<iframe></iframe>",
+            status="published",
+        )
+        self.client.force_login(self.author.user)
+
+    def test_search_is_limited_to_the_author(self):
+        # Лимит применяется после фильтра по автору
+        self.assertEqual(
+            search_ids("тафсир", "video", author_id=self.author.pk, limit=1),
+            [self.own.pk],
+        )
+        self.assertEqual(
+            search_ids("тафсир", "video", status="draft", author_id=self.author.pk),
+            [],
+        )
+
+    def test_picker_returns_only_own_materials(self):
+        url = reverse("studio_material_picker", args=["video"])
+        response = self.client.get(url, {"q": "тафсир"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [result["id"] for result in response.json()["results"]], [self.own.pk]
+        )
+
+        response = self.client.get(url, {"q": "тафсир", "status": "draft"})
+        self.assertEqual(response.json()["results"], [])
+
+
+class ScheduledStatusFormTests(TestCase):
+    def setUp(self):
+        self.author = make_author("author@example.com")
+        self.client.force_login(self.author.user)
+        self.publish_at = (timezone.now() + timedelta(days=1)).replace(
+            second=0, microsecond=0
+        )
+
+    def post_video(self, **data):
+        return self.client.post(
+            reverse("studio_video_create"),
+            {"title": "Видео", "embed_code": "<iframe></iframe>", **data},
+        )
+
+    def test_scheduled_without_date_is_a_form_error(self):
+        response = self.post_video(status="scheduled")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("published_at", response.context["form"].errors)
+        self.assertFalse(VideoContent.objects.exists())
+
+    def test_scheduled_video(self):
+        local = timezone.localtime(self.publish_at)
+        response = self.post_video(
+            status="scheduled", published_at=local.strftime("%Y-%m-%dT%H:%M")
+        )
+        self.assertRedirects(response, reverse("studio_video_list"))
+        video = VideoContent.objects.get()
+        self.assertEqual(
+            (video.status, video.published_at), ("scheduled", self.publish_at)
+        )
 
-# Create your tests here.
+    def test_published_with_future_date_is_scheduled(self):
+        response = self.client.post(
+            reverse("studio_text_create"),
+            {
+                "title": "Статья",
+                "content": "<p>Текст</p>",
+                "status": "published",
+                "published_at": timezone.localtime(self.publish_at).strftime(
+                    "%Y-%m-%dT%H:%M"
+                ),
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(TextContent.objects.get().status, "scheduled")
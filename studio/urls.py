@@ -30,4 +30,10 @@ urlpatterns = [
     path("courses/create/", views.course_create, name="studio_course_create"),
     path("courses/<int:pk>/edit/", views.course_edit, name="studio_course_edit"),
     path("courses/<int:pk>/delete/", views.course_delete, name="studio_course_delete"),
+    path(
+        "courses/<int:pk>/lessons/order/",
+        views.lesson_reorder,
+        name="studio_lesson_reorder",
+    ),
+    path("materials/<str:kind>/", views.material_picker, name="studio_material_picker"),
 ]
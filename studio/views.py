@@ -1,17 +1,26 @@
+import json
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
-from django.db.models import Q, Sum
-from django.http import JsonResponse, HttpResponseRedirect
+from django.db.models import Q
+from django.http import Http404, JsonResponse, HttpResponseRedirect
 from django.views.decorators.http import require_POST
 from django.forms import modelformset_factory
 from django.urls import reverse
 from urllib.parse import urlencode
 
 from accounts.models import Authors
+from courses.lessons import reorder_lessons, save_lesson_formset
 from courses.models import Course, Lesson
 from materials.models import VideoContent, AudioContent, TextContent
+from materials.feed import get_feed_page
+from materials.pagination import cursor_paginate
+from materials.stats import chart_bars, get_trend
+from search.query import search_ids
 from .forms import (
+    LESSON_MATERIALS,
+    BaseLessonFormSet,
     CourseForm,
     VideoContentForm,
     AudioContentForm,
@@ -19,7 +28,13 @@ from .forms import (
     LessonForm,
 )
 
-LessonFormSet = modelformset_factory(Lesson, form=LessonForm, extra=0, can_delete=True)
+STUDIO_PAGE_SIZE = 25
+PICKER_PAGE_SIZE = 20
+STATUS_FILTERS = ("draft", "scheduled", "published", "archived")
+
+LessonFormSet = modelformset_factory(
+    Lesson, form=LessonForm, formset=BaseLessonFormSet, extra=0, can_delete=True
+)
 
 
 def is_author(user):
@@ -32,61 +47,50 @@ def _get_author(request):
 
 def _status_filter(request, queryset, status_param="status"):
     status = request.GET.get(status_param, "all")
-    if status in ["draft", "published", "archived"]:
+    if status in STATUS_FILTERS:
         queryset = queryset.filter(status=status)
     return queryset, status
 
 
+def _paginate(request, queryset):
+    """Страница списка студии по курсору, последние изменённые первыми"""
+    return cursor_paginate(
+        queryset, request.GET.get("after"), STUDIO_PAGE_SIZE, "updated_at"
+    )
+
+
 @login_required
 @user_passes_test(is_author, login_url="admin:login")
 def dashboard(request):
     author = _get_author(request)
-    total_videos = VideoContent.objects.filter(author=author).count()
-    published_videos = VideoContent.objects.filter(
-        author=author, status="published"
-    ).count()
-    total_audios = AudioContent.objects.filter(author=author).count()
-    published_audios = AudioContent.objects.filter(
-        author=author, status="published"
-    ).count()
-    total_texts = TextContent.objects.filter(author=author).count()
-    published_texts = TextContent.objects.filter(
-        author=author, status="published"
-    ).count()
-
-    video_views = (
-        VideoContent.objects.filter(author=author).aggregate(s=Sum("views_count"))["s"]
-        or 0
-    )
-    audio_views = (
-        AudioContent.objects.filter(author=author).aggregate(s=Sum("views_count"))["s"]
-        or 0
-    )
-    text_views = (
-        TextContent.objects.filter(author=author).aggregate(s=Sum("views_count"))["s"]
-        or 0
-    )
-    total_views = video_views + audio_views + text_views
-
+    # Счётчики поддерживаются materials.counters
     stats = {
-        "total_videos": total_videos,
-        "published_videos": published_videos,
-        "total_audios": total_audios,
-        "published_audios": published_audios,
-        "total_texts": total_texts,
-        "published_texts": published_texts,
-        "total_views": total_views,
+        "total_videos": author.videos_count,
+        "published_videos": author.videos_published,
+        "total_audios": author.audios_count,
+        "published_audios": author.audios_published,
+        "total_texts": author.texts_count,
+        "published_texts": author.texts_published,
+        "total_views": author.total_views,
     }
 
-    recent_videos = VideoContent.objects.filter(author=author).order_by("-updated_at")[
-        :5
-    ]
-    recent_texts = TextContent.objects.filter(author=author).order_by("-updated_at")[:5]
+    # Видео, аудио и статьи одним запросом, последние изменённые первыми
+    recent_items = get_feed_page(
+        10, sort_field="updated_at", status=None, author=author
+    ).items
+
+    # Графики строятся по итоговым строкам автора: не больше строки на интервал
+    daily_views = get_trend(author, "views", "day", 30)
+    monthly_views = get_trend(author, "views", "month", 12)
+    daily_listens = get_trend(author, "listens", "day", 30)
+    stats["views_30d"] = sum(value for _bucket, value in daily_views)
+    stats["listens_30d"] = sum(value for _bucket, value in daily_listens)
 
     context = {
         "stats": stats,
-        "recent_videos": recent_videos,
-        "recent_texts": recent_texts,
+        "daily_views": chart_bars(daily_views),
+        "monthly_views": chart_bars(monthly_views),
+        "recent_items": recent_items,
     }
     return render(request, "studio/dashboard.html", context)
 
@@ -98,7 +102,8 @@ def video_list(request):
     author = _get_author(request)
     qs = VideoContent.objects.filter(author=author).order_by("-updated_at")
     qs, current_filter = _status_filter(request, qs)
-    context = {"videos": qs, "current_filter": current_filter}
+    page = _paginate(request, qs)
+    context = {"videos": page, "page_obj": page, "current_filter": current_filter}
     return render(request, "studio/video_list.html", context)
 
 
@@ -179,7 +184,8 @@ def audio_list(request):
     author = _get_author(request)
     qs = AudioContent.objects.filter(author=author).order_by("-updated_at")
     qs, current_filter = _status_filter(request, qs)
-    context = {"audios": qs, "current_filter": current_filter}
+    page = _paginate(request, qs)
+    context = {"audios": page, "page_obj": page, "current_filter": current_filter}
     return render(request, "studio/audio_list.html", context)
 
 
@@ -259,7 +265,8 @@ def text_list(request):
     author = _get_author(request)
     qs = TextContent.objects.filter(author=author).order_by("-updated_at")
     qs, current_filter = _status_filter(request, qs)
-    context = {"texts": qs, "current_filter": current_filter}
+    page = _paginate(request, qs)
+    context = {"texts": page, "page_obj": page, "current_filter": current_filter}
     return render(request, "studio/text_list.html", context)
 
 
@@ -333,28 +340,9 @@ def text_delete(request, pk):
 
 
 # ---------- КУРСЫ (с уроками) ----------
-def _set_lesson_formset_material_querysets(formset, author):
-    videos = VideoContent.objects.filter(author=author)
-    audios = AudioContent.objects.filter(author=author)
-    texts = TextContent.objects.filter(author=author)
-    for form in formset.forms:
-        form.fields["video"].queryset = videos
-        form.fields["audio"].queryset = audios
-        form.fields["text"].queryset = texts
-
-
 def _publish_course_materials(course):
     """Публикует все материалы, привязанные к урокам курса"""
-    for lesson in course.lessons.all():
-        if lesson.video and lesson.video.status != "published":
-            lesson.video.status = "published"
-            lesson.video.save()
-        if lesson.audio and lesson.audio.status != "published":
-            lesson.audio.status = "published"
-            lesson.audio.save()
-        if lesson.text and lesson.text.status != "published":
-            lesson.text.status = "published"
-            lesson.text.save()
+    course.publish_materials()
 
 
 @login_required
@@ -371,7 +359,12 @@ def course_create(request):
     author = _get_author(request)
     if request.method == "POST":
         course_form = CourseForm(request.POST)
-        formset = LessonFormSet(request.POST, prefix="lessons")
+        formset = LessonFormSet(
+            request.POST,
+            prefix="lessons",
+            queryset=Lesson.objects.none(),
+            author=author,
+        )
         if course_form.is_valid() and formset.is_valid():
             course = course_form.save(commit=False)
             course.author = author
@@ -381,14 +374,7 @@ def course_create(request):
                 course.slug = slugify(course.title)
             course.save()
 
-            lessons = formset.save(commit=False)
-            for i, lesson in enumerate(lessons):
-                lesson.course = course
-                if not lesson.order:
-                    lesson.order = i + 1
-                lesson.save()
-            for obj in formset.deleted_objects:
-                obj.delete()
+            save_lesson_formset(formset, course)
 
             # Автопубликация материалов, если курс опубликован
             if course.status == "published":
@@ -398,18 +384,15 @@ def course_create(request):
             return redirect("studio_course_list")
     else:
         course_form = CourseForm()
-        formset = LessonFormSet(prefix="lessons", queryset=Lesson.objects.none())
-
-    _set_lesson_formset_material_querysets(formset, author)
+        formset = LessonFormSet(
+            prefix="lessons", queryset=Lesson.objects.none(), author=author
+        )
 
-    # Загружаем материалы автора для модальных окон выбора
+    # Материалы для модальных окон выбора подгружает material_picker
     context = {
         "form": course_form,
         "lesson_formset": formset,
         "action": "create",
-        "author_videos": VideoContent.objects.filter(author=author),
-        "author_audios": AudioContent.objects.filter(author=author),
-        "author_texts": TextContent.objects.filter(author=author),
         # Передаём текущий URL для формирования return_url
         "request": request,
     }
@@ -420,22 +403,18 @@ def course_create(request):
 @user_passes_test(is_author)
 def course_edit(request, pk):
     author = _get_author(request)
-    course = get_object_or_404(Course, pk=pk, author=author)
+    course = get_object_or_404(Course.objects.with_tree(), pk=pk, author=author)
     if request.method == "POST":
         course_form = CourseForm(request.POST, instance=course)
         formset = LessonFormSet(
-            request.POST, prefix="lessons", queryset=course.lessons.all()
+            request.POST,
+            prefix="lessons",
+            queryset=course.lessons.all(),
+            author=author,
         )
         if course_form.is_valid() and formset.is_valid():
             course_form.save()
-            lessons = formset.save(commit=False)
-            for i, lesson in enumerate(lessons):
-                lesson.course = course
-                if not lesson.order:
-                    lesson.order = i + 1
-                lesson.save()
-            for obj in formset.deleted_objects:
-                obj.delete()
+            save_lesson_formset(formset, course)
 
             # Автопубликация материалов, если курс теперь опубликован
             if course.status == "published":
@@ -445,22 +424,78 @@ def course_edit(request, pk):
             return redirect("studio_course_list")
     else:
         course_form = CourseForm(instance=course)
-        formset = LessonFormSet(prefix="lessons", queryset=course.lessons.all())
-
-    _set_lesson_formset_material_querysets(formset, author)
+        formset = LessonFormSet(
+            prefix="lessons", queryset=course.lessons.all(), author=author
+        )
 
     context = {
         "form": course_form,
         "lesson_formset": formset,
         "action": "edit",
-        "author_videos": VideoContent.objects.filter(author=author),
-        "author_audios": AudioContent.objects.filter(author=author),
-        "author_texts": TextContent.objects.filter(author=author),
         "request": request,
     }
     return render(request, "studio/course_form.html", context)
 
 
+@require_POST
+@login_required
+@user_passes_test(is_author)
+def lesson_reorder(request, pk):
+    """
+    Новый порядок уроков: JSON ``{"order": [id урока, ...]}`` со всеми
+    уроками курса. Отвечает изменёнными ключами ``{id: order}``.
+    """
+    author = _get_author(request)
+    course = get_object_or_404(Course, pk=pk, author=author)
+    try:
+        order = json.loads(request.body)["order"]
+        changes = reorder_lessons(course, order)
+    except (ValueError, KeyError, TypeError) as error:
+        return JsonResponse({"success": False, "errors": str(error)}, status=400)
+    return JsonResponse({"success": True, "order": changes})
+
+
+@login_required
+@user_passes_test(is_author)
+def material_picker(request, kind):
+    """
+    Материалы автора для окна выбора в редакторе курса (JSON): по
+    ``PICKER_PAGE_SIZE``, с фильтром по статусу и поиском по началу слов.
+    """
+    model = LESSON_MATERIALS.get(kind)
+    if model is None:
+        raise Http404
+    author = _get_author(request)
+    queryset = model.objects.filter(author=author).only(
+        "id", "title", "status", "updated_at"
+    )
+    queryset, status = _status_filter(request, queryset)
+    query = request.GET.get("q", "").strip()[:200]
+    if query:
+        # Поиск только по материалам автора: иначе лимит search_ids могли бы
+        # занять чужие документы
+        found = search_ids(
+            query,
+            kind,
+            status=status if status in STATUS_FILTERS else None,
+            author_id=author.pk,
+        )
+        queryset = queryset.filter(Q(pk__in=found) | Q(title__istartswith=query))
+    page = cursor_paginate(
+        queryset, request.GET.get("after"), PICKER_PAGE_SIZE, "updated_at"
+    )
+    results = [
+        {
+            "id": material.pk,
+            "title": material.title,
+            "status": material.status,
+            "status_display": material.get_status_display(),
+        }
+        for material in page
+    ]
+    return JsonResponse({"results": results, "next": page.next_cursor or None})
+
+
 @login_required
 @user_passes_test(is_author)
 def course_delete(request, pk):